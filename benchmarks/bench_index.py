@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Benchmark for the ``Environment`` modules index.
+
+Run it from the root of the repository::
+
+    python -m benchmarks.bench_index
+
+It prints the time spent by ``get_notmet_dependencies()`` for growing
+environments. With the modules index, the time per module should remain
+roughly constant (linear scaling).
+"""
+
+import sys
+import time
+import shutil
+import tempfile
+
+from candyshop.environment import Environment
+
+from .synthetic import make_bundle
+
+SIZES = [1000, 2500, 5000, 10000]
+
+
+def run(size):
+    """Measure ``get_notmet_dependencies()`` on ``size`` synthetic modules."""
+    root = tempfile.mkdtemp()
+    env = Environment(init=False)
+    try:
+        env.addbundles([make_bundle(root, modules=size, missing=10)])
+        start = time.perf_counter()
+        notmet = list(env.get_notmet_dependencies())
+        elapsed = time.perf_counter() - start
+    finally:
+        env.destroy()
+        shutil.rmtree(root)
+    return elapsed, len(notmet)
+
+
+def main():
+    """Run the benchmark for every size in ``SIZES``."""
+    print('{0:>8} {1:>12} {2:>14} {3:>8}'.format(
+        'modules', 'seconds', 'us/module', 'unmet'))
+    for size in SIZES:
+        elapsed, notmet = run(size)
+        print('{0:>8} {1:>12.4f} {2:>14.2f} {3:>8}'.format(
+            size, elapsed, elapsed / size * 1e6, notmet))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Benchmark suite for bundles, modules and environments.
+
+Run it from the root of the repository::
+
+    python -m benchmarks.suite
+
+Every case is measured on synthetic bundles (see
+``benchmarks.synthetic.make_bundle()``) of growing sizes. The best and
+median times of several rounds are printed, together with the change
+against the last run with the same number of workers stored in the history
+file. The results of this run are then appended to it as a JSON line. Use
+``--help`` to see the options.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+from collections import OrderedDict
+
+from sh import ErrorReturnCode, git
+
+from candyshop.bundle import Bundle
+from candyshop.environment import Environment
+
+from .synthetic import make_bundle
+
+SIZES = [100, 500, 1000]
+ROUNDS = 3
+HISTORY = os.path.join('.benchmarks', 'history.jsonl')
+
+#: Options of ``make_bundle()`` used for every size.
+BUNDLE_OPTIONS = {'fanout': 3, 'missing': 10, 'xmlfiles': 2, 'records': 20,
+                  'missing_records': 25}
+
+
+def make_environment(path, **kwargs):
+    """Create an environment without Odoo that contains the bundle."""
+    env = Environment(init=False, **kwargs)
+    env.addbundles([path])
+    return env
+
+
+def bench_discovery(path, workers=None):
+    """Find the modules of the bundle without reading their manifests."""
+    return len(Bundle(path, lazy=True).modules)
+
+
+def bench_manifests(path, workers=None):
+    """Find the modules of the bundle and read their manifests."""
+    return len(Bundle(path).modules)
+
+
+def bench_records(path, workers=None):
+    """Extract the records of all the XML data files of the bundle."""
+    env = make_environment(path)
+    try:
+        env.extract_records(workers)
+        return sum(len(module.extract_records_fromfile(datafile))
+                   for module in env.get_modules_list()
+                   for _, datafile in module.get_xml_datafiles())
+    finally:
+        env.destroy()
+
+
+def bench_notmet_dependencies(path, workers=None):
+    """Add the bundle to an environment and list the unmet dependencies."""
+    env = make_environment(path)
+    try:
+        return len(list(env.get_notmet_dependencies()))
+    finally:
+        env.destroy()
+
+
+def bench_notmet_record_ids(path, workers=None):
+    """Add the bundle to an environment and list the unmet references."""
+    env = make_environment(path)
+    try:
+        return len(list(env.get_notmet_record_ids(workers)))
+    finally:
+        env.destroy()
+
+
+CASES = OrderedDict([
+    ('discovery', bench_discovery),
+    ('manifests', bench_manifests),
+    ('records', bench_records),
+    ('notmet_dependencies', bench_notmet_dependencies),
+    ('notmet_record_ids', bench_notmet_record_ids),
+])
+
+
+def measure(function, path, rounds=ROUNDS, workers=None):
+    """
+    Run ``function`` several times and measure it.
+
+    :return: (dict) the best and median times in seconds, and the value
+             returned by ``function``.
+    """
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        count = function(path, workers)
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times),
+            'count': count}
+
+
+def run(sizes=None, cases=None, rounds=ROUNDS, workers=None):
+    """
+    Measure every case on synthetic bundles of every size.
+
+    :return: (list) a dictionary with the ``case``, ``size``, ``min``,
+             ``median`` and ``count`` keys for each measurement.
+    """
+    results = []
+    for size in sizes or SIZES:
+        root = tempfile.mkdtemp()
+        try:
+            path = make_bundle(root, modules=size, **BUNDLE_OPTIONS)
+            for case in cases or CASES:
+                result = measure(CASES[case], path, rounds, workers)
+                result.update(case=case, size=size)
+                results.append(result)
+        finally:
+            shutil.rmtree(root)
+    return results
+
+
+def get_commit():
+    """Get the commit of the working tree, or ``None`` outside of git."""
+    try:
+        return str(git('rev-parse', '--short', 'HEAD',
+                       _tty_out=False)).strip()
+    except ErrorReturnCode:
+        return None
+
+
+def read_history(path):
+    """Read the runs stored in the history file, oldest first."""
+    if not os.path.isfile(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path, results, workers=None):
+    """Append a run to the history file and return it."""
+    entry = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+             'commit': get_commit(), 'python': platform.python_version(),
+             'workers': workers, 'options': BUNDLE_OPTIONS,
+             'results': results}
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry, sort_keys=True) + '\n')
+    return entry
+
+
+def get_change(result, previous):
+    """Format the change of ``result`` against the previous run."""
+    for old in previous.get('results', []):
+        if (old['case'], old['size']) == (result['case'], result['size']):
+            return '{0:+.1f}%'.format(
+                (result['min'] / old['min'] - 1) * 100 if old['min'] else 0)
+    return '-'
+
+
+def print_results(results, previous=None):
+    """Print a table with the results and their change."""
+    print('{0:<20} {1:>8} {2:>10} {3:>10} {4:>8} {5:>9}'.format(
+        'case', 'modules', 'min (s)', 'median (s)', 'count', 'change'))
+    for result in results:
+        print('{0:<20} {1:>8} {2:>10.4f} {3:>10.4f} {4:>8} {5:>9}'.format(
+            result['case'], result['size'], result['min'], result['median'],
+            result['count'], get_change(result, previous or {})))
+
+
+def get_parser():
+    """Build the parser of the command line options."""
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.suite',
+        description='Measure candyshop on synthetic bundles.')
+    parser.add_argument('-s', '--sizes', type=int, nargs='+', default=SIZES,
+                        help='Numbers of modules of the bundles.')
+    parser.add_argument('-c', '--cases', nargs='+', choices=list(CASES),
+                        help='Cases to run. Default: all of them.')
+    parser.add_argument('-r', '--rounds', type=int, default=ROUNDS,
+                        help='Times each case is run.')
+    parser.add_argument('-w', '--workers', type=int,
+                        help='Worker processes used to parse XML files.')
+    parser.add_argument('--history', default=HISTORY,
+                        help='File where the results are appended.')
+    parser.add_argument('--no-history', action='store_true',
+                        help='Do not read or update the history file.')
+    return parser
+
+
+def main(argv=None):
+    """Run the suite and update the history file."""
+    args = get_parser().parse_args(argv)
+    history = [] if args.no_history else read_history(args.history)
+    previous = [entry for entry in history
+                if entry.get('workers') == args.workers]
+    results = run(args.sizes, args.cases, args.rounds, args.workers)
+    print_results(results, previous[-1] if previous else None)
+    if not args.no_history:
+        append_history(args.history, results, args.workers)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
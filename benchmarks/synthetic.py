@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Synthetic bundle generator.
+
+This module writes bundles of fake Odoo modules to disk so that ``Bundle``,
+``Module`` and ``Environment`` can be measured at scales that the fixtures in
+``tests/examples`` cannot reach.
+"""
+
+import os
+
+MANIFEST_TEMPLATE = """# -*- coding: utf-8 -*-
+{{
+    'name': '{name}',
+    'version': '0.1',
+    'depends': {depends!r},
+    'data': {data!r},
+}}
+"""
+
+XML_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
+<odoo>
+    <data>
+{records}    </data>
+</odoo>
+"""
+
+RECORD_TEMPLATE = """        <record id="{xml_id}" model="res.partner">
+            <field name="name">{xml_id}</field>
+        </record>
+"""
+
+
+def module_name(index):
+    """
+    Build the name of the synthetic module number ``index``.
+
+    >>> module_name(7)
+    'synthetic_module_00007'
+    """
+    return 'synthetic_module_{0:05d}'.format(index)
+
+
+def make_xmlfile(path, module, index, records=0, missing=0):
+    """
+    Write a synthetic XML data file with ``records`` records.
+
+    Every ``missing``-th record (if ``missing`` is not zero) has an id that
+    refers to a module that does not exist.
+
+    :param path: (string) the path of the file.
+    :param module: (string) the name of the module that owns the file.
+    :param index: (int) the number of the file inside the module.
+    :param records: (int) number of records to generate.
+    :param missing: (int) frequency of records with an unmet reference.
+    """
+    lines = []
+    for i in range(records):
+        owner = module
+        if missing and not i % missing:
+            owner = 'missing_module_{0:05d}'.format(i)
+        lines.append(RECORD_TEMPLATE.format(
+            xml_id='{0}.record_{1:03d}_{2:05d}'.format(owner, index, i)))
+    with open(path, 'w') as f:
+        f.write(XML_TEMPLATE.format(records=''.join(lines)))
+
+
+def make_bundle(root, name='synthetic', modules=100, fanout=3, missing=0,
+                xmlfiles=0, records=0, missing_records=0):
+    """
+    Write a bundle of synthetic modules inside ``root``.
+
+    Each module depends on the ``fanout`` modules generated before it, and
+    every ``missing``-th module (if ``missing`` is not zero) also depends on
+    a module that does not exist. Each module declares ``xmlfiles`` XML data
+    files in its manifest, with ``records`` records each (see
+    ``make_xmlfile()``).
+
+    :param root: (string) directory where the bundle will be created.
+    :param name: (string) name of the bundle directory.
+    :param modules: (int) number of modules to generate.
+    :param fanout: (int) number of dependencies declared by each module.
+    :param missing: (int) frequency of modules with an unmet dependency.
+    :param xmlfiles: (int) number of XML data files of each module.
+    :param records: (int) number of records in each XML data file.
+    :param missing_records: (int) frequency of records with an unmet
+                            reference.
+    :return: (string) the path to the generated bundle.
+    """
+    path = os.path.join(root, name)
+    for i in range(modules):
+        depends = [module_name(d) for d in range(max(0, i - fanout), i)]
+        if missing and not i % missing:
+            depends.append('missing_module_{0:05d}'.format(i))
+        module_dir = os.path.join(path, module_name(i))
+        data = ['data/data_{0:03d}.xml'.format(x) for x in range(xmlfiles)]
+        os.makedirs(os.path.join(module_dir, 'data'))
+        with open(os.path.join(module_dir, '__init__.py'), 'w'):
+            pass
+        with open(os.path.join(module_dir, '__manifest__.py'), 'w') as f:
+            f.write(MANIFEST_TEMPLATE.format(name=module_name(i),
+                                             depends=depends, data=data))
+        for x, datafile in enumerate(data):
+            make_xmlfile(os.path.join(module_dir, datafile), module_name(i),
+                         x, records, missing_records)
+    return path
@@ -23,16 +23,244 @@ This module contains abstraction classes to represent a ``Module`` or a
 you cannot create or modify Bundles or Modules through these abstractions.
 """
 
+import io
 import os
 from ast import literal_eval
 
 from lxml import etree
 
-from .utils import find_files, ModuleProperties, strip_comments_and_blanks
+from .metrics import METRICS, timed
+from .utils import (ModuleEntry, ModuleProperties, RecordRef, is_subpath,
+                    scan_modules, strip_comments_and_blanks)
 
 DEFAULT_MANIFEST_FILE = '__manifest__.py'
 DEFAULT_OCA_USER = 'OCA'
 DEFAULT_OCA_BRANCH = '15.0'
+XML_ROOT_TAGS = ('odoo', 'openerp')
+RESCAN_FILES = (DEFAULT_MANIFEST_FILE, '__init__.py', 'oca_dependencies.txt')
+
+
+def iter_records(xmlfile, module, model=None, content=None):
+    """
+    Extract the ``record`` tags of an Odoo XML file in a single pass.
+
+    The file is streamed with ``lxml.etree.iterparse`` and every element is
+    discarded as soon as it is closed, so memory usage stays flat regardless
+    of the size of the file. Records without an ``id`` are skipped. Records
+    are only produced once the whole file was parsed, so that files with
+    syntax errors are ignored altogether.
+
+    :param xmlfile: (string) a path pointing to an XML file.
+    :param module: (string) the name of the module that owns the file. It is
+                   used as the module of ids that do not specify one.
+    :param model: (string or None) a record model to filter.
+                  If model is None (default) then get all records.
+    :param content: (bytes or None) the contents of the file. If present,
+                    ``xmlfile`` is not read, only reported in the records.
+    :return: a generator that produces tuples of
+             ``(module, xml_id, model, noupdate, file, line)``. If there is
+             a syntax error, no records are produced.
+
+    .. versionadded:: 0.3.0
+    """
+    records = []
+    try:
+        for record, noupdate in _iter_record_elements(xmlfile, content):
+            xml_module, xml_id = split_record_id(record.get('id', ''), module)
+            if not (xml_module and xml_id) or \
+               (model and record.get('model') != model):
+                continue
+            records.append((xml_module, xml_id, record.get('model'),
+                            noupdate, xmlfile, record.sourceline))
+    except etree.XMLSyntaxError:
+        return
+    yield from records
+
+
+def extract_records(xmlfile, module, content=None):
+    """
+    Extract all the records of an Odoo XML file.
+
+    This is a picklable wrapper around ``iter_records()`` meant to be run in
+    worker processes.
+
+    :param xmlfile: (string) a path pointing to an XML file.
+    :param module: (string) the name of the module that owns the file.
+    :param content: (bytes or None) the contents of the file, if they were
+                    not read from ``xmlfile``.
+    :return: a tuple of ``(module, xml_id, model, noupdate, file, line)``
+             tuples.
+
+    .. versionadded:: 0.3.0
+    """
+    return tuple(iter_records(xmlfile, module, content=content))
+
+
+def parse_manifest(content):
+    """
+    Evaluate the contents of a manifest file.
+
+    :param content: (bytes) the contents of the file.
+    :return: (dict) the dictionary declared in the manifest.
+
+    >>> parse_manifest(b"{'name': 'Sale', 'depends': ['base']}")
+    {'name': 'Sale', 'depends': ['base']}
+
+    .. versionadded:: 0.3.0
+    """
+    return literal_eval(content.decode('utf-8'))
+
+
+def extract_content_records(content, module):
+    """
+    Extract all the records of the contents of an Odoo XML file.
+
+    Since the same contents can be found in several files, the ``file`` of
+    the records is empty (see ``set_records_file()``).
+
+    :param content: (bytes) the contents of the file.
+    :param module: (string) the name of the module that owns the file.
+    :return: a tuple of ``(module, xml_id, model, noupdate, '', line)``
+             tuples.
+
+    .. versionadded:: 0.3.0
+    """
+    return extract_records('', module, content)
+
+
+def set_records_file(records, xmlfile):
+    """
+    Set the ``file`` of some records.
+
+    :param records: (tuple) records, as returned by ``extract_records()``.
+    :param xmlfile: (string) the new file of the records.
+    :return: (tuple) the records, with ``xmlfile`` as their file.
+
+    >>> set_records_file([('sale', 'a', 'x', '0', '', 3)], 'a.xml')
+    (('sale', 'a', 'x', '0', 'a.xml', 3),)
+
+    .. versionadded:: 0.3.0
+    """
+    return tuple(record[:4] + (xmlfile,) + record[5:] for record in records)
+
+
+def split_record_id(rid, module):
+    """
+    Split a record id into its module and id parts.
+
+    Only the first dot separates the module from the id, as Odoo does.
+
+    :param rid: (string) a record id, with or without a module prefix.
+    :param module: (string) the module to use if ``rid`` has no prefix.
+    :return: a tuple of ``(module, xml_id)``.
+
+    For example:
+
+    >>> split_record_id('base.main_company', 'sale')
+    ('base', 'main_company')
+    >>> split_record_id('view_order_form', 'sale')
+    ('sale', 'view_order_form')
+    >>> split_record_id('my_module.id.with.dots', 'sale')
+    ('my_module', 'id.with.dots')
+
+    .. versionadded:: 0.3.0
+    """
+    xml_module, dot, xml_id = rid.partition('.')
+    if not dot:
+        return module, xml_module
+    return xml_module, xml_id
+
+
+def _iter_record_elements(xmlfile, content=None):
+    """
+    Stream the ``record`` elements of an Odoo XML file.
+
+    Elements are yielded when they are opened, so only their attributes are
+    available. Parsing stops right away if the root element is not one of
+    ``XML_ROOT_TAGS``.
+
+    :param xmlfile: (string) a path pointing to an XML file.
+    :param content: (bytes or None) the contents of the file, read instead
+                    of ``xmlfile`` if present.
+    :return: a generator that produces tuples of ``(element, noupdate)``,
+             where ``noupdate`` is the value of the ``noupdate`` attribute
+             of the parent element (``'0'`` by default).
+
+    .. versionadded:: 0.3.0
+    """
+    noupdate = []
+    with open(xmlfile, 'rb') if content is None else \
+            io.BytesIO(content) as f:
+        for event, elem in etree.iterparse(f, events=('start', 'end')):
+            if event == 'end':
+                noupdate.pop()
+                _discard_element(elem)
+            elif not noupdate and elem.tag not in XML_ROOT_TAGS:
+                return
+            else:
+                if elem.tag == 'record' and len(noupdate) > 0:
+                    yield elem, noupdate[-1]
+                noupdate.append(elem.get('noupdate', '0'))
+
+
+def parse_oca_dependencies(text):
+    r"""
+    Parse the contents of an ``oca_dependencies.txt`` file.
+
+    Each line contains the name of a repository, optionally followed by its
+    URL and branch, which default to the OCA repository of that name and
+    ``DEFAULT_OCA_BRANCH``.
+
+    :param text: (string) the contents of the file.
+    :return: a generator that produces ``[name, url, branch]`` lists.
+
+    >>> list(parse_oca_dependencies('# Comment\nweb\n'))
+    [['web', 'https://github.com/OCA/web', '15.0']]
+
+    .. versionadded:: 0.3.0
+    """
+    oca = strip_comments_and_blanks(text)
+    for dep in [o.split() for o in oca.split('\n') if o.strip()]:
+        if len(dep) < 2:
+            dep.append('https://github.com/{0}/{1}'.format(
+                DEFAULT_OCA_USER, dep[0]))
+        if len(dep) < 3:
+            dep.append(DEFAULT_OCA_BRANCH)
+        yield dep
+
+
+def get_referenced_modules(refs):
+    """
+    Get the modules referenced by a list of record references.
+
+    :param refs: (list) a list of ``RecordRef`` instances.
+    :return: (list) the sorted names of the modules, without duplicates.
+
+    >>> get_referenced_modules([RecordRef('sale', 'a', '0', 'x', 1),
+    ...                         RecordRef('base', 'b', '0', 'x', 2),
+    ...                         RecordRef('sale', 'c', '0', 'x', 3)])
+    ['base', 'sale']
+
+    .. versionadded:: 0.3.0
+    """
+    return sorted(set(ref.module for ref in refs))
+
+
+def _discard_element(elem):
+    """
+    Free the memory used by an element that has been completely parsed.
+
+    The siblings of the root element (comments and processing instructions)
+    are not part of any parent, so they are left alone.
+
+    .. versionadded:: 0.3.0
+    """
+    elem.clear(keep_tail=True)
+    parent = elem.getparent()
+    if parent is None:
+        return
+    while elem.getprevious() is not None:
+        del parent[0]
 
 
 class Module(object):
@@ -48,7 +276,8 @@ class Module(object):
     `Modules <https://www.odoo.com/documentation/15.0/howtos/backend.html>`_.
     """
 
-    def __init__(self, path, bundle=None):
+    def __init__(self, path, bundle=None, entry=None, manifest_cache=None,
+                 record_cache=None, parse_cache=None):
         """
         Initialize the ``Module`` instance.
 
@@ -56,11 +285,29 @@ class Module(object):
         :param bundle: a ``Bundle`` instance (indicating this module is part of
                        such bundle), or ``None`` (indicating that is a
                        standalone module).
-        :return: a ``Module`` instance.
+        :param entry: a ``ModuleEntry`` produced by ``scan_modules()`` for
+                      ``path``. If present, the filesystem is not queried
+                      again to check ``path`` and locate the manifest.
+        :param manifest_cache: a ``ManifestCache`` instance used to read the
+                               manifest file, or ``None`` (default) to
+                               evaluate it directly.
+        :param record_cache: a ``RecordCache`` instance used to store the
+                             records of XML files, or ``None`` (default) to
+                             parse them directly.
+        :param parse_cache: a ``ParseCache`` instance used to parse files
+                            whose contents were not parsed before, when
+                            ``manifest_cache`` or ``record_cache`` are not
+                            present. Default: ``None``.
+        :return: a ``Module`` instance. Its manifest file is not read until
+                 ``Module.properties`` is accessed (or ``Module.load()`` is
+                 called).
 
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Added the ``entry``, ``manifest_cache``, ``record_cache`` and
+           ``parse_cache`` parameters.
         """
-        assert os.path.isdir(path), \
+        assert entry is not None or os.path.isdir(path), \
             '{0} is not a directory or does not exist.'.format(path)
         assert (isinstance(bundle, Bundle) or not bundle), \
             'Wrong bundle type.'
@@ -75,13 +322,78 @@ class Module(object):
 
         #: Attribute ``Module.manifest`` (string): Refers to the absolute path
         #: to the manifest file of the module (``__manifest__.py``).
-        self.manifest = self.__get_manifest()
+        self.manifest = self.__get_manifest(entry)
+
+        #: Attribute ``Module.manifest_cache`` (``ManifestCache`` or None):
+        #: The cache used to read the manifest file.
+        self.manifest_cache = manifest_cache
+
+        #: Attribute ``Module.record_cache`` (``RecordCache`` or None):
+        #: The cache used to store the records of XML files.
+        self.record_cache = record_cache
+
+        #: Attribute ``Module.parse_cache`` (``ParseCache`` or None): The
+        #: cache of data extracted from the contents of files.
+        self.parse_cache = parse_cache
+
+        #: Attribute ``Module.slug`` (string): The name of the module, that
+        #: is, the name of its root directory.
+        self.slug = os.path.basename(self.path)
+
+        self.__properties = None
+        self.__records = {}
+
+    @property
+    def properties(self):
+        """
+        Object ``Module.properties`` (``ModuleProperties``).
+
+        Placeholder for the module's properties. Access the module's
+        properties as attributes of this object. The manifest file is read
+        the first time this object is accessed.
+
+        .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           The manifest file is read on first access.
+        """
+        return self.load().__properties
+
+    def load(self):
+        """
+        Read the manifest file now instead of on first access.
 
-        #: Object ``Module.properties`` (``ModuleProperties``): Placeholder
-        #: for the module's properties. Access the module's properties as
-        #: attributes of this object.
-        self.properties = ModuleProperties(self.__extract_properties())
-        self.properties.slug = os.path.basename(self.path)
+        :return: the ``Module`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.__properties is None:
+            properties = ModuleProperties(self._read_properties())
+            properties.slug = self.slug
+            self.__properties = properties
+        return self
+
+    def get_package_files(self):
+        """
+        Get the files that define the module.
+
+        :return: (tuple) the absolute paths of the manifest file and the
+                 ``__init__.py`` file at the root of the module.
+
+        .. versionadded:: 0.3.0
+        """
+        return (os.path.join(self.path, DEFAULT_MANIFEST_FILE),
+                os.path.join(self.path, '__init__.py'))
+
+    def has_file(self, path):
+        """
+        Check if a file of the module exists.
+
+        :param path: (string) the absolute path of the file.
+        :return: (boolean) ``True`` if the file exists.
+
+        .. versionadded:: 0.3.0
+        """
+        return os.path.isfile(path)
 
     def __is_python_package(self):
         """
@@ -89,34 +401,51 @@ class Module(object):
 
         .. versionadded:: 0.1.0
         """
-        if find_files(self.path, '__init__.py'):
-            return True
-        return False
+        return os.path.isfile(os.path.join(self.path, '__init__.py'))
 
-    def __get_manifest(self):
+    def __get_manifest(self, entry=None):
         """
         Private method to find the manifest file within the module.
 
         .. versionadded:: 0.1.0
         """
-        assert self.__is_python_package(), \
+        if entry is None:
+            entry = ModuleEntry(self.path,
+                                os.path.join(self.path, DEFAULT_MANIFEST_FILE),
+                                self.__is_python_package())
+            if not os.path.isfile(entry.manifest):
+                entry = entry._replace(manifest=False)
+        assert entry.is_package, \
             'The module is not a python package.'
-        found = find_files(self.path, DEFAULT_MANIFEST_FILE)
-        if not found:
-            return False
-        return found[0]
+        return entry.manifest
 
-    def __extract_properties(self):
+    @timed('manifests')
+    def _read_properties(self):
         """
-        Private method to extract information of the module's manifest file.
+        Read the dictionary declared in the manifest file.
 
-        .. versionadded:: 0.1.0
+        Subclasses that read modules from somewhere else override this
+        method; ``load()`` keeps the result. It is measured as the
+        ``manifests`` phase of ``candyshop.metrics.METRICS``.
+
+        :return: (dict) the dictionary declared in the manifest.
+        :raise IOError: if the manifest cannot be read.
+
+        .. versionadded:: 0.3.0
         """
         assert self.manifest, \
             'The specified path does not contain a manifest file.'
+        METRICS.count_path(self.manifest)
         try:
-            with open(self.manifest) as properties:
-                props = literal_eval(properties.read())
+            if self.manifest_cache is not None:
+                props = self.manifest_cache.get(self.manifest)
+            elif self.parse_cache is not None:
+                with open(self.manifest, 'rb') as properties:
+                    props = self.parse_cache.extract(properties.read(),
+                                                     parse_manifest)
+            else:
+                with open(self.manifest) as properties:
+                    props = literal_eval(properties.read())
         except BaseException:
             raise IOError(('An error ocurred while '
                            'reading {0}.').format(self.manifest))
@@ -133,18 +462,25 @@ class Module(object):
                 xmlfile.replace('{0}/'.format(self.path), '')
                 in self.properties.data)
 
+    @timed('parse_xml')
     def parse_xml_fromfile(self, xmlfile):
         """
         Get XML parsed from an input file.
 
+        It is measured as the ``parse_xml`` phase of
+        ``candyshop.metrics.METRICS``.
+
         :param xmlfile: (string) a path pointing to an XML file.
         :return: Parsed document (``lxml.etree`` object). If there is
                  a syntax error return string error message.
 
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Measure the parsing.
         """
         assert self.__xmlfile_isfrom_module(xmlfile), \
             'The file {0} does not belong to this module.'.format(xmlfile)
+        METRICS.count_path(xmlfile)
         try:
             doc = etree.parse(xmlfile)
         except etree.XMLSyntaxError as e:
@@ -152,10 +488,14 @@ class Module(object):
         else:
             return doc
 
+    @timed('xpath')
     def get_records_fromfile(self, xmlfile, model=None):
         """
         Get ``record`` tags of an Odoo XML file.
 
+        The search is measured as the ``xpath`` phase of
+        ``candyshop.metrics.METRICS``.
+
         :param xmlfile: (string) a path pointing to an XML file.
         :param model: (string or None) a record model to filter.
                       If model is None (default) then get all records.
@@ -163,6 +503,8 @@ class Module(object):
                  is a syntax error return [].
 
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Measure the search.
         """
         model_filter = ''
         if model:
@@ -170,13 +512,199 @@ class Module(object):
         doc = self.parse_xml_fromfile(xmlfile)
         if isinstance(doc, str):
             return []
-        return (doc.xpath('/openerp//record' + model_filter) +
-                doc.xpath('/odoo//record' + model_filter))
+        return doc.xpath('/*[self::openerp or self::odoo]//record' +
+                         model_filter)
+
+    def extract_records_fromfile(self, xmlfile):
+        """
+        Get information about the ``record`` tags of an Odoo XML file.
+
+        The file is parsed only the first time; the result is kept in the
+        module instance for subsequent calls.
+
+        :param xmlfile: (string) a path pointing to an XML file.
+        :return: a tuple of ``(module, xml_id, model, noupdate, file, line)``
+                 tuples, as produced by ``iter_records()``.
+
+        .. versionadded:: 0.3.0
+        """
+        assert self.__xmlfile_isfrom_module(xmlfile), \
+            'The file {0} does not belong to this module.'.format(xmlfile)
+        if xmlfile not in self.__records:
+            self.__records[xmlfile] = tuple(self._read_records(xmlfile))
+        return self.__records[xmlfile]
+
+    @timed('records')
+    def _read_records(self, xmlfile):
+        """
+        Extract the records of an XML data file, using the caches.
+
+        Subclasses that read modules from somewhere else override this
+        method; ``extract_records_fromfile()`` keeps the result. It is
+        measured as the ``records`` phase of ``candyshop.metrics.METRICS``.
+
+        :param xmlfile: (string) the absolute path of the file.
+        :return: an iterable of records, as returned by ``extract_records()``.
+
+        .. versionadded:: 0.3.0
+        """
+        METRICS.count_path(xmlfile)
+        if self.record_cache is not None:
+            return self.record_cache.get(xmlfile, self.slug)
+        if self.parse_cache is not None:
+            return set_records_file(self.parse_cache.extract(
+                self.__read(xmlfile), extract_content_records,
+                self.slug), xmlfile)
+        return extract_records(xmlfile, self.slug)
+
+    def __read(self, path):
+        """
+        Private method to read the contents of a file.
+
+        .. versionadded:: 0.3.0
+        """
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def get_records_key(self, xmlfile):
+        """
+        Get the key of the records of an Odoo XML file in the parse cache.
+
+        The file is read and hashed; the key can then be passed to
+        ``lookup_records_fromfile()`` and ``store_records_fromfile()``.
+
+        :param xmlfile: (string) a path pointing to an XML file.
+        :return: (tuple) the key, or ``None`` if the module has no parse
+                 cache.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.parse_cache is None:
+            return None
+        return self.parse_cache.get_key(self.__read(xmlfile),
+                                        extract_content_records, self.slug)
+
+    def _lookup_records(self, xmlfile, key):
+        """
+        Look for the records of an XML data file in the caches.
+
+        Subclasses whose records are available without parsing the file in
+        a worker process override this method.
+        ``lookup_records_fromfile()`` keeps the result.
+
+        :param xmlfile: (string) the absolute path of the file.
+        :param key: (tuple) the key of the file in the parse cache, or
+                    ``None`` to compute it if needed.
+        :return: a tuple of ``(found, records)``.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.record_cache is not None:
+            return self.record_cache.lookup(xmlfile, self.slug)
+        if self.parse_cache is not None:
+            found, records = self.parse_cache.lookup_key(
+                key or self.get_records_key(xmlfile))
+            return found, set_records_file(records, xmlfile) if found \
+                else None
+        return False, None
+
+    def lookup_records_fromfile(self, xmlfile, key=None):
+        """
+        Load the records of an Odoo XML file from the record or parse cache.
+
+        :param xmlfile: (string) a path pointing to an XML file.
+        :param key: (tuple) the key of the file in the parse cache, as
+                    returned by ``get_records_key()``. Default: computed
+                    from the contents of the file, if needed.
+        :return: (boolean) ``True`` if the records are now available without
+                 parsing the file, ``False`` otherwise.
+
+        .. versionadded:: 0.3.0
+        """
+        if xmlfile in self.__records:
+            return True
+        found, records = self._lookup_records(xmlfile, key)
+        if found:
+            self.__records[xmlfile] = tuple(records)
+        return found
+
+    def store_records_fromfile(self, xmlfile, records, key=None):
+        """
+        Store the records of an Odoo XML file extracted somewhere else.
+
+        Subsequent calls to ``extract_records_fromfile()`` will return
+        ``records`` instead of parsing the file. They are also saved in the
+        record cache or in the parse cache, if any.
+
+        :param xmlfile: (string) a path pointing to an XML file.
+        :param records: a tuple of records, as returned by
+                        ``extract_records()``.
+        :param key: (tuple) the key of the file in the parse cache, as
+                    returned by ``get_records_key()``. Default: computed
+                    from the contents of the file, if needed.
+
+        .. versionadded:: 0.3.0
+        """
+        assert self.__xmlfile_isfrom_module(xmlfile), \
+            'The file {0} does not belong to this module.'.format(xmlfile)
+        self.__records[xmlfile] = tuple(records)
+        if self.record_cache is not None:
+            self.record_cache.store(xmlfile, self.__records[xmlfile],
+                                    self.slug)
+        elif self.parse_cache is not None:
+            self.parse_cache[key or self.get_records_key(xmlfile)] = \
+                set_records_file(records, '')
+
+    def invalidate_records(self, paths=None):
+        """
+        Discard the records kept in memory for some XML files.
+
+        :param paths: (list) absolute paths of the files to discard, or
+                      ``None`` (default) to discard all of them.
+
+        .. versionadded:: 0.3.0
+        """
+        for xmlfile in list(self.__records):
+            if paths is None or xmlfile in paths:
+                del self.__records[xmlfile]
+
+    def get_pending_datafiles(self):
+        """
+        Get the XML data files whose records have not been extracted yet.
+
+        :return: a generator that produces the absolute paths of the files.
+
+        .. versionadded:: 0.3.0
+        """
+        for _, datafile in self.get_xml_datafiles():
+            if datafile not in self.__records:
+                yield datafile
+
+    def get_record_refs_fromfile(self, xmlfile, module=None):
+        """
+        Get references to the `record` tags of an Odoo XML file.
+
+        :param xmlfile: (string) a path pointing to the XML file.
+        :param module: (string or None) a record module to filter.
+                       If module is None (default) then get all modules.
+        :return: a generator that produces an iterable of ``RecordRef``
+                 instances.
+
+        .. versionadded:: 0.3.0
+        """
+        for xml_module, xml_id, model, noupdate, _, line in \
+                self.extract_records_fromfile(xmlfile):
+            if module and xml_module != module:
+                continue
+            yield RecordRef(xml_module, xml_id, noupdate, model, line)
 
     def get_record_ids_fromfile(self, xmlfile, module=None):
         """
         Get ids from `record` tags of an Odoo XML file.
 
+        This is a compatibility wrapper around
+        ``get_record_refs_fromfile()``.
+
         :param xmlfile: (string) a path pointing to the XML file.
         :param module: (string or None) a record module to filter.
                        If module is None (default) then get all modules.
@@ -185,23 +713,51 @@ class Module(object):
 
         .. versionadded:: 0.1.0
         """
-        for record in self.get_records_fromfile(xmlfile):
-            rid = record.get('id', '').split('.')
-            if not rid[0]:
-                continue
-            if len(rid) == 1:
-                xml_module, xml_id = [self.properties.slug, rid[0]]
-            else:
-                xml_module, xml_id = rid
-            if module and xml_module != module:
-                continue
-            noupdate = record.getparent().get('noupdate', '0')
-            yield '{0}.{1}.noupdate={2}'.format(xml_module, xml_id, noupdate)
+        for ref in self.get_record_refs_fromfile(xmlfile, module):
+            yield str(ref)
+
+    def get_xml_datafiles(self):
+        """
+        Get the XML files declared in the ``data`` key of the manifest.
+
+        :return: a generator that produces tuples of ``(data, path)``, where
+                 ``data`` is the path as declared in the manifest and
+                 ``path`` is the absolute path of the file.
+
+        .. versionadded:: 0.3.0
+        """
+        for data in getattr(self.properties, 'data', []):
+            if os.path.splitext(data)[1].lower() == '.xml':
+                yield data, os.path.join(self.path, data)
+
+    def get_record_refs(self):
+        """
+        Get references to all records contained in the module's XML files.
+
+        :return: a generator that returns an iterable of dictionaries
+                 containing a list of ``RecordRef`` instances for each
+                 XML file, like this one::
+
+                     [
+                        {'path/file1.xml': [RecordRef('module_a', 'id_a',
+                                                      '0', 'res.partner',
+                                                      4)]},
+                        {'path/file2.xml': [RecordRef('module_b', 'id_b',
+                                                      '1', 'ir.ui.view',
+                                                      9)]}
+                     ]
+
+        .. versionadded:: 0.3.0
+        """
+        for data, datafile in self.get_xml_datafiles():
+            yield {data: list(self.get_record_refs_fromfile(datafile))}
 
     def get_record_ids(self):
         """
         Get all record ids contained in all of the module's XML files.
 
+        This is a compatibility wrapper around ``get_record_refs()``.
+
         :return: a generator that returns an iterable of dictionaries
                  containing a list of record ids referenced in each
                  XML file, like this one::
@@ -213,13 +769,7 @@ class Module(object):
 
         .. versionadded:: 0.1.0
         """
-        if not hasattr(self.properties, 'data'):
-            return
-            yield
-        for data in self.properties.data:
-            datafile = os.path.join(self.path, data)
-            if os.path.splitext(datafile)[1].lower() != '.xml':
-                continue
+        for data, datafile in self.get_xml_datafiles():
             yield {data: self.get_record_ids_fromfile(datafile)}
 
     def get_record_ids_module_references(self):
@@ -237,12 +787,11 @@ class Module(object):
 
         .. versionadded:: 0.1.0
         """
-        for xmldict in self.get_record_ids():
-            for data, ids in xmldict.items():
-                record_ids = [i.split('.')[0] for i in ids]
-                if not record_ids:
+        for xmldict in self.get_record_refs():
+            for data, refs in xmldict.items():
+                if not refs:
                     continue
-                yield {data: list(set(record_ids))}
+                yield {data: get_referenced_modules(refs)}
 
 
 class Bundle(object):
@@ -256,7 +805,8 @@ class Bundle(object):
     included in the ``Bundle``.
     """
 
-    def __init__(self, path=None, exclude_tests=True):
+    def __init__(self, path=None, exclude_tests=True, manifest_cache=None,
+                 record_cache=None, lazy=False, parse_cache=None, scan=True):
         """
         Initialize a ``Bundle`` instance.
 
@@ -265,11 +815,32 @@ class Bundle(object):
         :param exclude_tests: (boolean) ``True`` (default) to exclude modules
                               that are inside a ``tests`` folder. ``False`` to
                               include such modules.
+        :param manifest_cache: a ``ManifestCache`` instance used to read the
+                               manifest files of the modules, or ``None``
+                               (default) to evaluate them directly.
+        :param record_cache: a ``RecordCache`` instance used to store the
+                             records of the XML files of the modules, or
+                             ``None`` (default) to parse them directly.
+        :param lazy: (boolean) ``False`` (default) to read the manifest of
+                     every module right away, excluding modules with broken
+                     manifests. ``True`` to only discover the modules; their
+                     manifests will be read on first access, and broken ones
+                     will raise an ``IOError`` at that point.
+        :param parse_cache: a ``ParseCache`` instance used to parse the files
+                            of the modules whose contents were not parsed
+                            before. Default: ``None``.
+        :param scan: (boolean) ``True`` (default) to find the modules and the
+                     OCA dependencies inside ``path``. ``False`` to leave
+                     them empty, for subclasses that read them elsewhere
+                     (``path`` is not checked either).
         :return: a ``Bundle`` instance.
 
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Added the ``manifest_cache``, ``record_cache``, ``lazy``,
+           ``parse_cache`` and ``scan`` parameters.
         """
-        assert os.path.isdir(path), \
+        assert not scan or os.path.isdir(path), \
             '{0} is not a directory or does not exist.'.format(path)
 
         #: Attribute ``Bundle.path`` (string): Refers to the absolute path
@@ -280,9 +851,43 @@ class Bundle(object):
         #: inside a ``tests`` folder will be excluded. False otherwise.
         self.exclude_tests = exclude_tests
 
+        #: Attribute ``Bundle.manifest_cache`` (``ManifestCache`` or None):
+        #: The cache used to read the manifest files of the modules.
+        self.manifest_cache = manifest_cache
+
+        #: Attribute ``Bundle.record_cache`` (``RecordCache`` or None):
+        #: The cache used to store the records of the XML files.
+        self.record_cache = record_cache
+
+        #: Attribute ``Bundle.lazy`` (boolean): True if the manifests of the
+        #: modules are read on first access. False otherwise.
+        self.lazy = lazy
+
+        #: Attribute ``Bundle.parse_cache`` (``ParseCache`` or None): The
+        #: cache of data extracted from the contents of files.
+        self.parse_cache = parse_cache
+
+        #: Attribute ``Bundle.name`` (string): The name of the bundle.
+        self.name = os.path.basename(self.path)
+
+        #: Attribute ``Bundle.modules`` (list): A list containing
+        #: instances of ``Module`` for each module inside the bundle.
+        self.modules = []
+
+        #: Attribute ``Bundle.oca_dependencies`` (list): A list containing
+        #: the ``[name, url, branch]`` of each OCA dependency.
+        self.oca_dependencies = []
+
+        if scan:
+            self.__scan()
+
+    def __scan(self):
+        """
+        Private method to find the modules and OCA dependencies of the bundle.
+
+        .. versionadded:: 0.3.0
+        """
         try:
-            #: Attribute ``Bundle.modules`` (list): A list containing
-            #: instances of ``Module`` for each module inside the bundle.
             self.modules = list(self.__get_modules())
         except BaseException:
             print('The specified path contains broken Odoo Modules.')
@@ -290,29 +895,76 @@ class Bundle(object):
         else:
             assert self.modules, \
                 'The specified path does not contain valid Odoo modules.'
-
-            #: Attribute ``Bundle.name`` (string): The name of the bundle.
-            self.name = os.path.basename(self.path)
-
-            #: Attribute ``Bundle.oca_dependencies`` (dict): A dictionary
-            #: containing key-values of the names and repositories of
-            #: OCA dependencies.
             self.oca_dependencies = list(self.__parse_oca_dependencies())
 
-    def __get_modules(self):
+    def __get_modules(self, keep=None):
         """
         Private method to find and instance all valid modules inside a bundle.
 
+        The search is measured as the ``discovery`` phase of
+        ``candyshop.metrics.METRICS``.
+
+        :param keep: (dict) a dictionary mapping module paths to ``Module``
+                     instances that will be reused if found again.
+
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Added the ``keep`` parameter.
         """
-        for mods in find_files(self.path, DEFAULT_MANIFEST_FILE):
-            if ((self.exclude_tests and 'tests' not in mods.split(os.sep)) or
-               not self.exclude_tests):
+        keep = keep or {}
+        with METRICS.phase('discovery'):
+            for entry in scan_modules(self.path, DEFAULT_MANIFEST_FILE,
+                                      self.exclude_tests):
+                METRICS.count(files=1)
+                if entry.path in keep:
+                    yield keep[entry.path]
+                    continue
                 try:
-                    yield Module(os.path.dirname(mods), bundle=self)
+                    module = Module(entry.path, bundle=self, entry=entry,
+                                    manifest_cache=self.manifest_cache,
+                                    record_cache=self.record_cache,
+                                    parse_cache=self.parse_cache)
+                    yield module if self.lazy else module.load()
                 except BaseException:
                     pass
 
+    def update(self, paths=None):
+        """
+        Update the bundle after some of its files were changed.
+
+        Records kept in memory for the changed files are discarded. If a
+        manifest, an ``__init__.py`` or the ``oca_dependencies.txt`` file
+        changed, or if a path is not inside a known module (for example, a
+        new module was created), the bundle is scanned again: modules are
+        instanced again only if their manifest or ``__init__.py`` changed.
+
+        :param paths: (list) paths of created, modified or deleted files.
+        :return: (list) the ``Module`` instances containing changed files.
+
+        .. versionadded:: 0.3.0
+        """
+        changed = set(map(os.path.abspath, paths or []))
+        if self.__needs_rescan(changed):
+            keep = dict((m.path, m) for m in self.modules
+                        if not changed & set(m.get_package_files()))
+            self.modules = list(self.__get_modules(keep))
+            self.oca_dependencies = list(self.__parse_oca_dependencies())
+        affected = [m for m in self.modules
+                    if any(is_subpath(p, m.path) for p in changed)]
+        for module in affected:
+            module.invalidate_records(changed)
+        return affected
+
+    def __needs_rescan(self, changed):
+        """
+        Private method to determine if changes require scanning the bundle.
+
+        .. versionadded:: 0.3.0
+        """
+        return any(os.path.basename(p) in RESCAN_FILES or
+                   not any(is_subpath(p, m.path) for m in self.modules)
+                   for p in changed)
+
     def __get_oca_dependencies_file(self):
         """
         Private method to find (if any) the oca_dependencies.txt file.
@@ -335,11 +987,4 @@ class Bundle(object):
             return
             yield
         with open(self.oca_dependencies_file) as f:
-            oca = strip_comments_and_blanks(f.read())
-        for dep in [o.split() for o in oca.split('\n')]:
-            if len(dep) < 2:
-                dep.append('https://github.com/{0}/{1}'.format(
-                    DEFAULT_OCA_USER, dep[0]))
-            if len(dep) < 3:
-                dep.append(DEFAULT_OCA_BRANCH)
-            yield dep
+            yield from parse_oca_dependencies(f.read())
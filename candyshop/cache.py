@@ -0,0 +1,1007 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+``candyshop.cache`` is a module for caching data between environments.
+
+This module implements a persistent clone cache that keeps shallow bare
+mirrors of git repositories, so that several ``Environment`` instances (or
+several runs of the same CI job) do not need to clone the same repository
+over and over again. It also implements sparse clones, which only
+materialize the files needed to analyze a bundle, persistent caches of
+parsed manifest files and XML records, and a content-addressed cache that
+parses identical files only once.
+
+These caches can be managed from the command line::
+
+    python -m candyshop.cache warm path/to/bundle [path/to/other/bundle]
+    python -m candyshop.cache inspect
+    python -m candyshop.cache invalidate [path/to/bundle]
+"""
+
+import os
+import re
+import sys
+import fcntl
+import shutil
+import marshal
+import sqlite3
+import hashlib
+import argparse
+import threading
+from ast import literal_eval
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from sh import git
+
+from .bundle import Module, extract_records
+from .metrics import METRICS
+from .utils import scan_modules
+
+DEFAULT_CACHE_DATABASE = os.path.join('~', '.cache', 'candyshop',
+                                      'cache.sqlite')
+
+#: The default maximum number of entries kept in memory by a ``ParseCache``.
+DEFAULT_PARSE_CACHE_SIZE = 10000
+
+#: The patterns of the files materialized first by sparse checkouts: enough
+#: to find the modules of a bundle and read their manifests and the OCA
+#: dependencies of the bundle.
+SPARSE_PATTERNS = ('/oca_dependencies.txt', '__manifest__.py', '__init__.py')
+
+
+class CloneCache(object):
+    """
+    This class represents a directory of cached git repositories.
+
+    Each ``(url, branch)`` pair is stored as a shallow bare mirror. Checkouts
+    are materialized as detached git worktrees of the mirror, which share its
+    object database instead of downloading it again. When ``max_size`` is
+    set, the least recently used mirrors are evicted after each checkout.
+
+    For example::
+
+        cache = CloneCache('~/.cache/candyshop', max_size=2 * 1024 ** 3)
+        env = Environment(cache=cache)
+    """
+
+    def __init__(self, path, max_size=None, refresh=True):
+        """
+        Initialize the ``CloneCache`` instance.
+
+        :param path: (string) a path pointing to the cache directory. It will
+                     be created if it does not exist.
+        :param max_size: (int) the maximum size of the cache in bytes, or
+                         ``None`` (default) for no limit.
+        :param refresh: (boolean) ``True`` (default) to ``git fetch`` cached
+                        mirrors before using them.
+        :return: a ``CloneCache`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        #: Attribute ``CloneCache.path`` (string): The absolute path of
+        #: the cache directory.
+        self.path = os.path.abspath(os.path.expanduser(path))
+
+        #: Attribute ``CloneCache.max_size`` (int or None): The maximum size
+        #: in bytes of the cache.
+        self.max_size = max_size
+
+        #: Attribute ``CloneCache.refresh`` (boolean): True if mirrors are
+        #: fetched before each checkout.
+        self.refresh = refresh
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def get_mirror_path(self, url, branch):
+        """
+        Get the path of the mirror that caches ``url`` and ``branch``.
+
+        :param url: (string) the URL of the git repository.
+        :param branch: (string) the cached branch.
+        :return: (string) the path of the bare mirror.
+
+        .. versionadded:: 0.3.0
+        """
+        key = hashlib.sha1('{0}\0{1}'.format(url, branch).encode('utf-8'))
+        return os.path.join(self.path, '{0}.git'.format(key.hexdigest()))
+
+    @contextmanager
+    def __lock(self, mirror, blocking=True):
+        """
+        Private context manager that locks a mirror.
+
+        The lock is shared between threads and processes. If ``blocking`` is
+        ``False`` and the mirror is locked, the context yields ``False``.
+
+        .. versionadded:: 0.3.0
+        """
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        with open('{0}.lock'.format(mirror), 'w') as lock:
+            try:
+                fcntl.flock(lock, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def __update_mirror(self, url, branch, mirror):
+        """
+        Private method to create or refresh a mirror.
+
+        .. versionadded:: 0.3.0
+        """
+        if not os.path.isdir(mirror):
+            git.clone(url, mirror, quiet=True, bare=True, depth=1,
+                      single_branch=True, branch=branch)
+        elif self.refresh:
+            git('-C', mirror, 'fetch', '--quiet', '--depth=1', url,
+                '+{0}:{0}'.format(branch))
+        os.utime(mirror)
+
+    def checkout(self, url, branch, path, sparse=False):
+        """
+        Materialize ``branch`` of ``url`` into ``path``.
+
+        The repository is cloned into the cache (or refreshed if it is
+        already there) and then checked out into ``path`` as a detached
+        worktree.
+
+        :param url: (string) the URL of the git repository.
+        :param branch: (string) the branch to checkout.
+        :param path: (string) the destination directory.
+        :param sparse: (boolean) ``True`` to only checkout the files needed
+                       to analyze the bundle (see ``sparse_checkout()``).
+                       Default: False.
+
+        .. versionadded:: 0.3.0
+        """
+        mirror = self.get_mirror_path(url, branch)
+        with self.__lock(mirror):
+            self.__update_mirror(url, branch, mirror)
+            git('-C', mirror, 'worktree', 'prune')
+            git('-C', mirror, 'worktree', 'add', '--quiet', '--detach',
+                '--no-checkout' if sparse else '--checkout',
+                os.path.abspath(path), branch)
+        if sparse:
+            sparse_checkout(path)
+        self.evict(keep=[mirror])
+
+    def get_mirrors(self):
+        """
+        List the mirrors stored in the cache.
+
+        :return: (list) a list of ``(path, last_used, size)`` tuples, from
+                 the least to the most recently used mirror.
+
+        .. versionadded:: 0.3.0
+        """
+        mirrors = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.git') and entry.is_dir():
+                mirrors.append((entry.path, entry.stat().st_mtime,
+                                get_directory_size(entry.path)))
+        return sorted(mirrors, key=lambda m: m[1])
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used mirrors until the cache fits ``max_size``.
+
+        Mirrors that are currently locked by another checkout are skipped.
+
+        :param keep: (list) paths of mirrors that must not be evicted.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.max_size is None:
+            return
+        keep = keep or []
+        mirrors = self.get_mirrors()
+        excess = sum(m[2] for m in mirrors) - self.max_size
+        for mirror, _, mirror_size in mirrors:
+            if excess > 0 and mirror not in keep and \
+               self.__remove(mirror, blocking=False):
+                excess -= mirror_size
+
+    def __remove(self, mirror, blocking=True):
+        """
+        Private method to remove a mirror from the cache.
+
+        :return: (boolean) ``True`` if the mirror was removed, ``False`` if
+                 it was locked and ``blocking`` is ``False``.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock(mirror, blocking) as locked:
+            if locked:
+                shutil.rmtree(mirror)
+            return locked
+
+    def clear(self):
+        """
+        Remove every mirror from the cache.
+
+        .. versionadded:: 0.3.0
+        """
+        for mirror, _, _ in self.get_mirrors():
+            self.__remove(mirror)
+
+
+class FileCache(object):
+    """
+    This class represents a persistent cache of data extracted from files.
+
+    Extracted data is stored in a table of a SQLite database, keyed on the
+    path of the file. An entry is valid while the modification time and size
+    of the file are unchanged; otherwise the file is read again and the
+    entry is still reused if its content hash did not change. Only when the
+    content differs, the data is extracted again.
+
+    Entries can also carry a ``key`` (for example, the name of the module
+    that owns the file); an entry stored with a different key is not valid.
+
+    Subclasses must set the ``table`` attribute and implement ``extract()``.
+    Several subclasses can share the same database file.
+    """
+
+    #: Attribute ``FileCache.table`` (string): The name of the table where
+    #: the entries of this cache are stored.
+    table = None
+
+    def __init__(self, path=DEFAULT_CACHE_DATABASE):
+        """
+        Initialize the ``FileCache`` instance.
+
+        :param path: (string) a path pointing to the database file. It will
+                     be created (including its directory) if it does not
+                     exist.
+        :return: a ``FileCache`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        #: Attribute ``FileCache.path`` (string): The absolute path of
+        #: the database file.
+        self.path = os.path.abspath(os.path.expanduser(path))
+
+        #: Attribute ``FileCache.hits`` (int): The number of entries
+        #: served from the cache by this instance.
+        self.hits = 0
+
+        #: Attribute ``FileCache.misses`` (int): The number of entries
+        #: that had to be extracted again by this instance.
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(self.path, isolation_level=None,
+                                    check_same_thread=False)
+        self.__db.execute('PRAGMA journal_mode=WAL')
+        self.__db.execute('PRAGMA synchronous=NORMAL')
+        self.__db.execute('CREATE TABLE IF NOT EXISTS {0} ('
+                          'path TEXT PRIMARY KEY, key TEXT, mtime INTEGER, '
+                          'size INTEGER, hash TEXT, data BLOB)'
+                          ''.format(self.table))
+
+    def __query(self, sql, *args):
+        """
+        Private method to run a query while holding the instance lock.
+
+        The ``{table}`` placeholder of ``sql`` is replaced by ``table``.
+
+        :return: (list) the rows returned by the query.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            return self.__db.execute(sql.format(table=self.table),
+                                     *args).fetchall()
+
+    def __update(self, sql, *args):
+        """
+        Private method to run a statement while holding the instance lock.
+
+        The ``{table}`` placeholder of ``sql`` is replaced by ``table``.
+
+        :return: (int) the number of modified rows.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            return self.__db.execute(sql.format(table=self.table),
+                                     *args).rowcount
+
+    def extract(self, path, key=''):
+        """
+        Extract the data of a file. Must be implemented by subclasses.
+
+        :param path: (string) the absolute path of the file.
+        :param key: (string) the key of the entry.
+        :return: the extracted data. It must be serializable by ``marshal``.
+
+        .. versionadded:: 0.3.0
+        """
+        raise NotImplementedError
+
+    def get(self, path, key=''):
+        """
+        Get the data of a file, extracting it if it is not in the cache.
+
+        :param path: (string) a path pointing to a file.
+        :param key: (string) the key of the entry.
+        :return: the data extracted from the file.
+
+        .. versionadded:: 0.3.0
+        """
+        path = os.path.abspath(path)
+        found, data = self.lookup(path, key)
+        if not found:
+            data = self.extract(path, key)
+            self.store(path, data, key)
+        return data
+
+    def lookup(self, path, key=''):
+        """
+        Look for a valid entry of a file in the cache.
+
+        :param path: (string) a path pointing to a file.
+        :param key: (string) the key of the entry.
+        :return: a tuple of ``(found, data)``. If ``found`` is ``False``,
+                 ``data`` is ``None``.
+
+        .. versionadded:: 0.3.0
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        rows = self.__query('SELECT key, mtime, size, hash, data '
+                            'FROM {table} WHERE path = ?', (path,))
+        row = rows[0] if rows else (None, None, None, None, None)
+        if row[0] != key:
+            return self.__miss()
+        if row[1:3] != (stat.st_mtime_ns, stat.st_size):
+            if row[3] != get_file_hash(path):
+                return self.__miss()
+            self.__update('UPDATE {table} SET mtime = ?, size = ? '
+                          'WHERE path = ?',
+                          (stat.st_mtime_ns, stat.st_size, path))
+        return self.__load(row[4], path)
+
+    def __miss(self):
+        """
+        Private method to count and report a missing entry.
+
+        .. versionadded:: 0.3.0
+        """
+        self.misses += 1
+        METRICS.count(misses=1)
+        return False, None
+
+    def __load(self, data, path):
+        """
+        Private method to deserialize a cached entry.
+
+        Entries written by an incompatible Python version are invalidated.
+
+        .. versionadded:: 0.3.0
+        """
+        try:
+            data = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            self.invalidate([path])
+            return self.__miss()
+        self.hits += 1
+        METRICS.count(hits=1)
+        return True, data
+
+    def store(self, path, data, key=''):
+        """
+        Store the data of a file in the cache.
+
+        :param path: (string) a path pointing to a file.
+        :param data: the data extracted from the file.
+        :param key: (string) the key of the entry.
+
+        .. versionadded:: 0.3.0
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        self.__update('INSERT OR REPLACE INTO {table} VALUES '
+                      '(?, ?, ?, ?, ?, ?)',
+                      (path, key, stat.st_mtime_ns, stat.st_size,
+                       get_file_hash(path), marshal.dumps(data)))
+
+    def get_entries(self):
+        """
+        List the files stored in the cache.
+
+        :return: (list) a list of ``(path, mtime, size, hash)`` tuples,
+                 sorted by path. ``mtime`` is expressed in nanoseconds.
+
+        .. versionadded:: 0.3.0
+        """
+        return self.__query('SELECT path, mtime, size, hash '
+                            'FROM {table} ORDER BY path')
+
+    def invalidate(self, paths=None):
+        """
+        Remove files from the cache.
+
+        :param paths: (list) a list of paths pointing to files or to
+                      directories containing them. If ``None`` (default),
+                      the whole cache is emptied.
+        :return: (int) the number of removed entries.
+
+        .. versionadded:: 0.3.0
+        """
+        if paths is None:
+            return self.__update('DELETE FROM {table}')
+        removed = 0
+        for path in map(os.path.abspath, paths):
+            removed += self.__update(
+                'DELETE FROM {table} '
+                'WHERE path = ? OR substr(path, 1, ?) = ?',
+                (path, len(path) + 1, path + os.sep))
+        return removed
+
+    def close(self):
+        """
+        Close the database connection.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            self.__db.close()
+
+
+class ManifestCache(FileCache):
+    """
+    This class represents a persistent cache of parsed manifest files.
+
+    See ``FileCache`` for details about how entries are validated.
+    """
+
+    table = 'manifests'
+
+    def extract(self, path, key=''):
+        """
+        Evaluate a manifest file.
+
+        :param path: (string) the absolute path of the manifest file.
+        :param key: (string) unused.
+        :return: (dict) the dictionary declared in the manifest.
+
+        .. versionadded:: 0.3.0
+        """
+        with open(path, 'rb') as f:
+            return literal_eval(f.read().decode('utf-8'))
+
+    def warm(self, paths=None):
+        """
+        Parse and store the manifests of all modules below some paths.
+
+        :param paths: (list) a list of paths pointing to bundles or modules.
+        :return: (int) the number of manifests found.
+
+        .. versionadded:: 0.3.0
+        """
+        return len(list(iter_modules(paths, self)))
+
+
+class RecordCache(FileCache):
+    """
+    This class represents a persistent cache of records of XML files.
+
+    Each entry holds the tuple returned by ``extract_records()`` for an
+    XML file, and its key is the name of the module that owns the file. See
+    ``FileCache`` for details about how entries are validated.
+    """
+
+    table = 'records'
+
+    def extract(self, path, key=''):
+        """
+        Extract the records of an XML file.
+
+        :param path: (string) the absolute path of the XML file.
+        :param key: (string) the name of the module that owns the file.
+        :return: (tuple) the records, as returned by ``extract_records()``.
+
+        .. versionadded:: 0.3.0
+        """
+        return extract_records(path, key)
+
+    def warm(self, paths=None, manifest_cache=None):
+        """
+        Parse and store the XML data files of all modules below some paths.
+
+        :param paths: (list) a list of paths pointing to bundles or modules.
+        :param manifest_cache: a ``ManifestCache`` instance used to read the
+                               manifests of the modules.
+        :return: (int) the number of XML files found.
+
+        .. versionadded:: 0.3.0
+        """
+        count = 0
+        for module in iter_modules(paths, manifest_cache):
+            for _, datafile in module.get_xml_datafiles():
+                if os.path.isfile(datafile):
+                    self.get(datafile, module.slug)
+                    count += 1
+        return count
+
+
+class ParseCache(object):
+    """
+    This class represents a content-addressed cache of parsed files.
+
+    Entries are keyed by the hash of the contents of a file (the hash of the
+    git object it would be stored in), the name of the function that parsed
+    it and its arguments. So, files that are identical across bundles,
+    repositories or branches are parsed only once, wherever they are. The
+    most recently used entries are kept in memory; if a database file is
+    given, every entry is also stored there, to be reused by other
+    instances or runs.
+
+    For example::
+
+        cache = ParseCache('~/.cache/candyshop/cache.sqlite')
+        env = Environment(parse_cache=cache)
+        ...
+        cache.get_stats()
+    """
+
+    def __init__(self, path=None, max_size=DEFAULT_PARSE_CACHE_SIZE):
+        """
+        Initialize a ``ParseCache`` instance.
+
+        :param path: (string) a path pointing to a database file, or
+                     ``None`` (default) to keep entries in memory only.
+        :param max_size: (int) the maximum number of entries kept in memory.
+        :return: a ``ParseCache`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        #: Attribute ``ParseCache.path`` (string or None): The absolute path
+        #: of the database file.
+        self.path = path and os.path.abspath(os.path.expanduser(path))
+
+        #: Attribute ``ParseCache.max_size`` (int): The maximum number of
+        #: entries kept in memory.
+        self.max_size = max_size
+
+        #: Attribute ``ParseCache.hits`` (int): The number of entries
+        #: served from memory.
+        self.hits = 0
+
+        #: Attribute ``ParseCache.disk_hits`` (int): The number of entries
+        #: served from the database file.
+        self.disk_hits = 0
+
+        #: Attribute ``ParseCache.misses`` (int): The number of entries
+        #: that were not found.
+        self.misses = 0
+
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__db = None
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.__db = sqlite3.connect(self.path, isolation_level=None,
+                                        check_same_thread=False)
+            self.__db.execute('PRAGMA journal_mode=WAL')
+            self.__db.execute('CREATE TABLE IF NOT EXISTS objects ('
+                              'key TEXT PRIMARY KEY, data BLOB)')
+
+    def __len__(self):
+        """
+        Get the number of entries kept in memory.
+
+        .. versionadded:: 0.3.0
+        """
+        return len(self.__entries)
+
+    def __getitem__(self, key):
+        """
+        Get an entry, from memory or from the database file.
+
+        :param key: (tuple) a ``(hash, function, args...)`` tuple.
+        :return: the data of the entry.
+        :raise KeyError: if the entry is not found.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                METRICS.count(hits=1)
+                return self.__entries[key]
+            found, data = self.__load(key)
+            if not found:
+                self.misses += 1
+                METRICS.count(misses=1)
+                raise KeyError(key)
+            self.disk_hits += 1
+            METRICS.count(hits=1)
+            self.__remember(key, data)
+            return data
+
+    def __setitem__(self, key, data):
+        """
+        Store an entry, in memory and in the database file.
+
+        :param key: (tuple) a ``(hash, function, args...)`` tuple.
+        :param data: the data. It must be serializable by ``marshal``.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            self.__remember(key, data)
+            if self.__db is not None:
+                self.__db.execute('INSERT OR REPLACE INTO objects '
+                                  'VALUES (?, ?)', (get_object_key(key),
+                                                    marshal.dumps(data)))
+
+    def __remember(self, key, data):
+        """
+        Private method to keep an entry in memory.
+
+        The least recently used entries are evicted if needed.
+
+        .. versionadded:: 0.3.0
+        """
+        self.__entries[key] = data
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.max_size:
+            self.__entries.popitem(last=False)
+
+    def __load(self, key):
+        """
+        Private method to read an entry from the database file.
+
+        Entries written by an incompatible Python version are not found.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.__db is None:
+            return False, None
+        rows = self.__db.execute('SELECT data FROM objects WHERE key = ?',
+                                 (get_object_key(key),)).fetchall()
+        if not rows:
+            return False, None
+        try:
+            return True, marshal.loads(rows[0][0])
+        except (EOFError, ValueError, TypeError):
+            return False, None
+
+    def lookup(self, content, function, *args):
+        """
+        Look for the data extracted from some contents.
+
+        :param content: (bytes) the contents of a file.
+        :param function: (function) the function that extracts the data.
+        :param args: other arguments of ``function``.
+        :return: a tuple of ``(found, data)``. If ``found`` is ``False``,
+                 ``data`` is ``None``.
+
+        .. versionadded:: 0.3.0
+        """
+        return self.lookup_key(get_content_key(content, function, *args))
+
+    def lookup_key(self, key):
+        """
+        Look for the data stored under a key.
+
+        :param key: (tuple) a key, as returned by ``get_key()``.
+        :return: a tuple of ``(found, data)``. If ``found`` is ``False``,
+                 ``data`` is ``None``.
+
+        .. versionadded:: 0.3.0
+        """
+        try:
+            return True, self[key]
+        except KeyError:
+            return False, None
+
+    def store(self, content, data, function, *args):
+        """
+        Store the data extracted from some contents somewhere else.
+
+        :param content: (bytes) the contents of a file.
+        :param data: the data returned by ``function``.
+        :param function: (function) the function that extracts the data.
+        :param args: other arguments of ``function``.
+
+        .. versionadded:: 0.3.0
+        """
+        self[get_content_key(content, function, *args)] = data
+
+    def get_key(self, content, function, *args):
+        """
+        Get the key of the data extracted from some contents.
+
+        It can be computed once and passed to ``lookup_key()`` and
+        ``__setitem__()``, instead of hashing the contents on each call.
+        See ``get_content_key()``.
+
+        .. versionadded:: 0.3.0
+        """
+        return get_content_key(content, function, *args)
+
+    def extract(self, content, function, *args):
+        """
+        Extract data from some contents, unless it was already extracted.
+
+        :param content: (bytes) the contents of a file.
+        :param function: (function) a function that receives ``content`` and
+                         ``args``, and returns the data.
+        :param args: other arguments of ``function``.
+        :return: the data returned by ``function``.
+
+        .. versionadded:: 0.3.0
+        """
+        found, data = self.lookup(content, function, *args)
+        if not found:
+            data = function(content, *args)
+            self.store(content, data, function, *args)
+        return data
+
+    def get_stats(self):
+        """
+        Get the counters of the cache.
+
+        :return: (dict) the number of ``entries`` in memory, of ``hits``,
+                 ``disk_hits`` and ``misses``, and the ``hit_rate``
+                 (the fraction of lookups served from memory or disk).
+
+        .. versionadded:: 0.3.0
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {'entries': len(self), 'hits': self.hits,
+                'disk_hits': self.disk_hits, 'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups
+                if lookups else 0.0}
+
+    def clear(self):
+        """
+        Remove every entry, from memory and from the database file.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            self.__entries.clear()
+            if self.__db is not None:
+                self.__db.execute('DELETE FROM objects')
+
+    def close(self):
+        """
+        Close the database connection, if any.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            if self.__db is not None:
+                self.__db.close()
+                self.__db = None
+
+
+def get_content_key(content, function, *args):
+    """
+    Get the key of the data extracted from some contents.
+
+    :param content: (bytes) the contents of a file.
+    :param function: (function) the function that extracts the data.
+    :param args: other arguments of ``function``.
+    :return: (tuple) a ``(hash, function name, args...)`` tuple, where
+             ``hash`` is the hash of the git object of ``content``.
+
+    >>> get_content_key(b'', len)
+    ('e69de29bb2d1d6434b8b29ae775ad8c2e48c5391', 'len')
+
+    .. versionadded:: 0.3.0
+    """
+    digest = hashlib.sha1(b'blob ' + str(len(content)).encode('ascii') +
+                          b'\0' + content)
+    return (digest.hexdigest(), function.__name__) + args
+
+
+def get_object_key(key):
+    """
+    Get the representation of a key in a database file.
+
+    >>> get_object_key(('e69de29b', 'parse_manifest'))
+    'e69de29b parse_manifest'
+
+    .. versionadded:: 0.3.0
+    """
+    return ' '.join(map(str, key))
+
+
+def sparse_clone(url, branch, path):
+    """
+    Clone a git repository, only fetching the files needed to analyze it.
+
+    The repository is cloned without history and without file contents
+    (``--filter=blob:none``, which the server must allow; otherwise, git
+    fetches every file) and then checked out with ``sparse_checkout()``:
+    git fetches the contents of the checked out files only.
+
+    :param url: (string) the URL of the git repository.
+    :param branch: (string) the branch to clone.
+    :param path: (string) the destination directory.
+
+    .. versionadded:: 0.3.0
+    """
+    git.clone(url, path, quiet=True, depth=1, branch=branch,
+              filter='blob:none', no_checkout=True)
+    sparse_checkout(path)
+
+
+def sparse_checkout(path):
+    """
+    Checkout the files of a repository needed to analyze its bundle.
+
+    Manifests, ``__init__.py`` files and ``oca_dependencies.txt`` are checked
+    out first. Then, the files declared in the ``data`` and ``demo`` keys of
+    the manifests are added to the checkout. Any other file (python code,
+    static assets, translations) is not written to disk.
+
+    :param path: (string) a path pointing to a git repository (or worktree)
+                 that was cloned with ``--no-checkout``.
+
+    .. versionadded:: 0.3.0
+    """
+    git('-C', path, 'sparse-checkout', 'set', '--no-cone', *SPARSE_PATTERNS)
+    git('-C', path, 'checkout', '--quiet', 'HEAD')
+    patterns = sorted(set(get_sparse_patterns(path)))
+    if patterns:
+        git('-C', path, 'sparse-checkout', 'add', '--stdin',
+            _in='\n'.join(patterns))
+
+
+def get_sparse_patterns(path):
+    """
+    Get sparse checkout patterns for the files declared by the modules.
+
+    :param path: (string) a path pointing to a bundle.
+    :return: a generator that produces a pattern matching exactly each file
+             declared in the ``data`` and ``demo`` keys of the manifests.
+
+    .. versionadded:: 0.3.0
+    """
+    path = os.path.abspath(path)
+    for module in iter_modules([path]):
+        for key in ('data', 'demo'):
+            for data in getattr(module.properties, key, []):
+                datafile = os.path.relpath(os.path.join(module.path, data),
+                                           path)
+                yield '/' + re.sub(r'([\\*?[])', r'\\\1', datafile)
+
+
+def iter_modules(paths=None, manifest_cache=None):
+    """
+    Instance all the valid modules below some paths.
+
+    :param paths: (list) a list of paths pointing to bundles or modules.
+    :param manifest_cache: a ``ManifestCache`` instance used to read the
+                           manifests of the modules.
+    :return: a generator that produces ``Module`` instances. Modules whose
+             manifest cannot be read are skipped.
+
+    .. versionadded:: 0.3.0
+    """
+    for path in paths or []:
+        for entry in scan_modules(path):
+            try:
+                yield Module(entry.path, entry=entry,
+                             manifest_cache=manifest_cache).load()
+            except (AssertionError, IOError):
+                continue
+
+
+def get_file_hash(path):
+    """
+    Compute the SHA-1 hash of the content of a file.
+
+    :param path: (string) a path pointing to a file.
+    :return: (string) the hexadecimal digest.
+
+    .. versionadded:: 0.3.0
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_directory_size(path):
+    """
+    Compute the size in bytes of the files below a directory.
+
+    :param path: (string) a path pointing to a directory.
+    :return: (int) the sum of the sizes of all files (symlinks are ignored).
+
+    .. versionadded:: 0.3.0
+    """
+    size = 0
+    for directory, _, files in os.walk(path):
+        for filename in files:
+            filepath = os.path.join(directory, filename)
+            if not os.path.islink(filepath):
+                size += os.path.getsize(filepath)
+    return size
+
+
+def main(argv=None):
+    """
+    Manage the manifest and record caches from the command line.
+
+    :param argv: (list) the command line arguments. Default: ``sys.argv``.
+    :return: (int) the exit status.
+
+    .. versionadded:: 0.3.0
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m candyshop.cache',
+        description='Manage the manifest and record caches.')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_DATABASE,
+                        help='path to the cache database file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('warm', help='parse and store manifests and records'
+                        ).add_argument('paths', nargs='+',
+                                       help='bundles or modules to parse')
+    commands.add_parser('inspect', help='list cached files')
+    commands.add_parser('invalidate', help='remove cached files'
+                        ).add_argument('paths', nargs='*',
+                                       help='remove only entries below these'
+                                            ' paths (default: everything)')
+    args = parser.parse_args(argv)
+    caches = [ManifestCache(args.cache), RecordCache(args.cache)]
+    try:
+        _run_command(args, *caches)
+    finally:
+        for cache in caches:
+            cache.close()
+    return 0
+
+
+def _run_command(args, manifests, records):
+    """
+    Run a command of ``main()`` on the manifest and record caches.
+
+    .. versionadded:: 0.3.0
+    """
+    if args.command == 'warm':
+        print('{0} manifests and {1} XML files cached.'.format(
+            manifests.warm(args.paths), records.warm(args.paths, manifests)))
+    elif args.command == 'inspect':
+        for cache in (manifests, records):
+            for path, _, size, digest in cache.get_entries():
+                print('{0}  {1:<9}  {2:>8}  {3}'.format(
+                    digest, cache.table, size, path))
+    else:
+        removed = [cache.invalidate(args.paths or None)
+                   for cache in (manifests, records)]
+        print('{0} manifests and {1} XML files removed.'.format(*removed))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
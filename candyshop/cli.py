@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+``candyshop.cli`` is the command line interface of candyshop.
+
+It creates an environment with some bundles and runs queries on it::
+
+    candyshop check path/to/bundle
+    candyshop check --format ndjson --check dependencies path/to/bundle
+    candyshop check --format sarif --output candyshop.sarif path/to/bundle
+    candyshop impact --module mail path/to/bundle
+    candyshop impact --git-diff origin/15.0...HEAD path/to/bundle
+    candyshop serve --socket candyshop.sock path/to/bundle
+    candyshop watch path/to/bundle
+    candyshop index --output odoo-15.0.idx path/to/odoo
+    candyshop check --index odoo-15.0.idx path/to/bundle
+    candyshop check --profile profile.json path/to/bundle
+
+The ``check`` command exits with status 0 if no problems are found, 1 if
+some problems are found and 2 if the arguments are not valid.
+"""
+
+import sys
+import json
+import signal
+import argparse
+
+from .environment import DEFAULT_BRANCH, Environment, get_git_changed_paths
+from .metrics import METRICS
+from .report import CHECKS, REPORTS, get_checks
+from .server import DEFAULT_HOST, DEFAULT_PORT, EnvironmentServer
+from .watch import BACKENDS, DEFAULT_INTERVAL, EnvironmentWatcher
+
+
+def get_parser():
+    """
+    Build the parser of the command line arguments.
+
+    :return: (``argparse.ArgumentParser``) the parser.
+
+    .. versionadded:: 0.3.0
+    """
+    profiling = argparse.ArgumentParser(add_help=False)
+    profiling.add_argument('--profile', metavar='PATH',
+                           help='measure the time and files of each phase,'
+                                ' and write them to this JSON file (or'
+                                ' print them to the standard error if PATH'
+                                ' is -)')
+
+    environment = argparse.ArgumentParser(add_help=False,
+                                          parents=[profiling])
+    environment.add_argument('bundles', nargs='+',
+                             help='paths to the bundles of the environment')
+    environment.add_argument('--odoo', metavar='PATH',
+                             help='use the Odoo codebase in this directory'
+                                  ' instead of cloning it')
+    environment.add_argument('--no-odoo', action='store_true',
+                             help='do not add the Odoo codebase')
+    environment.add_argument('--index', metavar='PATH',
+                             help='load the Odoo codebase from this index'
+                                  ' (see the index command) instead of'
+                                  ' cloning it')
+    environment.add_argument('--branch', default=DEFAULT_BRANCH,
+                             help='the Odoo branch to clone'
+                                  ' (default: %(default)s)')
+    environment.add_argument('--sparse', action='store_true',
+                             help='only checkout the files needed for the'
+                                  ' analysis of cloned repositories')
+    environment.add_argument('--include-tests', action='store_true',
+                             help='include modules inside tests'
+                                  ' directories')
+    environment.add_argument('--cache', metavar='PATH',
+                             help='path to a manifest and record cache'
+                                  ' database file')
+
+    parser = argparse.ArgumentParser(
+        prog='candyshop',
+        description='Check the dependencies of Odoo modules.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    check = commands.add_parser(
+        'check', parents=[environment],
+        help='report dependencies and record ids not found in the'
+             ' environment')
+    check.add_argument('-c', '--check', dest='checks', action='append',
+                       choices=list(CHECKS), metavar='CHECK',
+                       help='a check to run: {0} (can be repeated,'
+                            ' default: all)'.format(', '.join(CHECKS)))
+    check.add_argument('-f', '--format', default='text',
+                       choices=list(REPORTS),
+                       help='the output format: {0} (default: %(default)s)'
+                            .format(', '.join(REPORTS)))
+    check.add_argument('-o', '--output', metavar='PATH',
+                       help='write the report to this file instead of the'
+                            ' standard output')
+    check.add_argument('--no-summary', action='store_true',
+                       help='do not end the report with the number of'
+                            ' problems found by each check')
+    check.add_argument('-w', '--workers', type=int,
+                       help='the number of processes used to parse XML'
+                            ' files')
+    check.set_defaults(run=run_check)
+
+    impact = commands.add_parser(
+        'impact', parents=[environment],
+        help='list the modules impacted by changes')
+    impact.add_argument('-m', '--module', dest='modules', action='append',
+                        default=[], metavar='MODULE',
+                        help='a module that changed (can be repeated)')
+    impact.add_argument('-p', '--path', dest='paths', action='append',
+                        default=[], metavar='PATH',
+                        help='a file that changed (can be repeated)')
+    impact.add_argument('--git-diff', metavar='RANGE',
+                        help='consider the files changed in this revision'
+                             ' range of the bundles (for example,'
+                             ' origin/15.0...HEAD) as changed')
+    impact.set_defaults(run=run_impact)
+
+    watcher = argparse.ArgumentParser(add_help=False)
+    watcher.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                         help='the number of seconds between polls of the'
+                              ' bundles (default: %(default)s)')
+    watcher.add_argument('--backend', default='auto', choices=BACKENDS,
+                         help='how changes are detected: {0} (default:'
+                              ' %(default)s, that is, watchdog if it is'
+                              ' installed)'.format(', '.join(BACKENDS)))
+
+    serve = commands.add_parser(
+        'serve', parents=[environment, watcher],
+        help='keep the environment in memory and answer queries over HTTP')
+    serve.add_argument('--socket', metavar='PATH',
+                       help='listen on this Unix socket instead of TCP')
+    serve.add_argument('--host', default=DEFAULT_HOST,
+                       help='the TCP host to listen on'
+                            ' (default: %(default)s)')
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT,
+                       help='the TCP port to listen on'
+                            ' (default: %(default)s)')
+    serve.add_argument('-q', '--quiet', action='store_true',
+                       help='do not log requests')
+    serve.set_defaults(run=run_serve)
+
+    watch = commands.add_parser(
+        'watch', parents=[environment, watcher],
+        help='report the dependencies that become missing or satisfied as'
+             ' files change')
+    watch.add_argument('-c', '--check', dest='checks', action='append',
+                       choices=list(CHECKS), metavar='CHECK',
+                       help='a check to run: {0} (can be repeated,'
+                            ' default: all)'.format(', '.join(CHECKS)))
+    watch.add_argument('-f', '--format', default='text',
+                       choices=['text', 'ndjson'],
+                       help='the output format (default: %(default)s)')
+    watch.set_defaults(run=run_watch)
+
+    index = commands.add_parser(
+        'index', parents=[profiling],
+        help='save the modules and records of a local Odoo codebase to an'
+             ' index')
+    index.add_argument('odoo', metavar='ODOO_DIR',
+                       help='path to the Odoo codebase')
+    index.add_argument('-o', '--output', required=True, metavar='PATH',
+                       help='the index file to write')
+    index.add_argument('-w', '--workers', type=int,
+                       help='the number of processes used to parse XML'
+                            ' files')
+    index.add_argument('--cache', metavar='PATH',
+                       help='path to a manifest and record cache'
+                            ' database file')
+    index.set_defaults(run=run_index, bundles=[], no_odoo=False,
+                       index=None, branch=DEFAULT_BRANCH,
+                       include_tests=False, sparse=False)
+    return parser
+
+
+def get_environment(args):
+    """
+    Create an environment from the command line arguments.
+
+    :param args: (``argparse.Namespace``) the parsed arguments.
+    :return: (``Environment``) the environment, without bundles.
+
+    .. versionadded:: 0.3.0
+    """
+    return Environment(init=not args.no_odoo, init_from=args.odoo,
+                       branch=args.branch, manifest_cache=args.cache,
+                       record_cache=args.cache, init_from_index=args.index,
+                       sparse=args.sparse)
+
+
+def run_check(args, env):
+    """
+    Write a report of the problems found in the environment.
+
+    :param args: (``argparse.Namespace``) the parsed arguments.
+    :param env: (``Environment``) the environment.
+    :return: (int) 1 if problems were found, 0 otherwise.
+
+    .. versionadded:: 0.3.0
+    """
+    stream = open(args.output, 'w') if args.output else sys.stdout
+    report = REPORTS[args.format](stream, not args.no_summary)
+    try:
+        return report.write(get_checks(env, args.checks, args.workers))
+    finally:
+        if args.output:
+            stream.close()
+
+
+def run_impact(args, env):
+    """
+    Print the names of the modules impacted by changes, one per line.
+
+    :param args: (``argparse.Namespace``) the parsed arguments.
+    :param env: (``Environment``) the environment.
+    :return: (int) the exit status.
+
+    .. versionadded:: 0.3.0
+    """
+    paths = list(args.paths)
+    if args.git_diff:
+        for bundle in args.bundles:
+            paths.extend(get_git_changed_paths(bundle, args.git_diff))
+    for slug in env.get_impacted_modules(args.modules, paths):
+        print(slug)
+    return 0
+
+
+def run_serve(args, env):
+    """
+    Serve the environment until interrupted (or terminated).
+
+    :param args: (``argparse.Namespace``) the parsed arguments.
+    :param env: (``Environment``) the environment.
+    :return: (int) the exit status.
+
+    .. versionadded:: 0.3.0
+    """
+    server = EnvironmentServer(env, args.bundles, args.interval,
+                               not args.quiet, args.backend)
+    address = server.bind(args.socket or (args.host, args.port))
+    sys.stderr.write('Serving {0} modules on {1}.\n'.format(
+        len(env.modules_index), address))
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def write_delta(args, delta):
+    """
+    Print the dependencies that became missing or satisfied.
+
+    :param args: (``argparse.Namespace``) the parsed arguments.
+    :param delta: (list) the dependencies, see
+                  ``candyshop.watch.get_delta()``.
+
+    .. versionadded:: 0.3.0
+    """
+    for item in delta:
+        if args.format == 'ndjson':
+            print(json.dumps(item))
+        else:
+            print('{event:<9}  {bundle}  {name}  {dependency}'.format(**item))
+    sys.stdout.flush()
+
+
+def run_watch(args, env):
+    """
+    Report changes of the results of the checks until interrupted.
+
+    :param args: (``argparse.Namespace``) the parsed arguments.
+    :param env: (``Environment``) the environment.
+    :return: (int) the exit status.
+
+    .. versionadded:: 0.3.0
+    """
+    watcher = EnvironmentWatcher(env, args.bundles, args.checks,
+                                 args.interval, args.backend)
+    sys.stderr.write('Watching {0} modules, {1} missing dependencies.\n'
+                     .format(len(env.modules_index), len(watcher.state)))
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        watcher.watch(lambda delta: write_delta(args, delta))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+    return 0
+
+
+def run_index(args, env):
+    """
+    Save the environment, which only contains the Odoo codebase, to an index.
+
+    :param args: (``argparse.Namespace``) the parsed arguments.
+    :param env: (``Environment``) the environment.
+    :return: (int) the exit status.
+
+    .. versionadded:: 0.3.0
+    """
+    env.save(args.output, args.workers)
+    sys.stderr.write('Saved {0} modules to {1}.\n'.format(
+        len(env.modules_index), args.output))
+    return 0
+
+
+def write_profile(path):
+    """
+    Write the time and counters of each phase.
+
+    :param path: (string) a JSON file, or ``-`` to print a table to the
+                 standard error.
+
+    .. versionadded:: 0.3.0
+    """
+    if path == '-':
+        METRICS.write_text(sys.stderr)
+        return
+    with open(path, 'w') as stream:
+        METRICS.write_json(stream)
+
+
+def main(argv=None):
+    """
+    Run candyshop from the command line.
+
+    :param argv: (list) the command line arguments. Default: ``sys.argv``.
+    :return: (int) the exit status.
+
+    .. versionadded:: 0.3.0
+    """
+    args = get_parser().parse_args(argv)
+    if args.profile:
+        METRICS.reset()
+        METRICS.enable()
+    try:
+        env = get_environment(args)
+        try:
+            env.addbundles(args.bundles, not args.include_tests)
+            return args.run(args, env)
+        finally:
+            env.destroy()
+    finally:
+        if args.profile:
+            METRICS.disable()
+            write_profile(args.profile)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+``candyshop.compare`` is a module for comparing branches of a repository.
+
+This module implements an object that analyzes several branches of the same
+bundles side by side, each one in its own ``Environment`` (so that each
+branch is checked against the Odoo codebase of its own series), and reports
+the differences between them::
+
+    comparison = BranchComparison('addons.git', ['14.0', '15.0', '16.0'],
+                                  init_from_index='odoo-{branch}.idx')
+    comparison.get_differences('15.0', '16.0')
+
+Bundles are read from git objects (see ``candyshop.gittree``), and the
+manifests and XML files that are identical in several branches (including
+the Odoo codebase) are parsed only once, thanks to a shared ``ParseCache``.
+"""
+
+from collections import OrderedDict
+
+from .cache import ParseCache
+from .environment import Environment, get_cache
+from .report import get_state
+from .watch import get_delta
+
+
+class BranchComparison(object):
+    """
+    This class represents several branches of the same bundles.
+
+    Results are kept as sets of ``(check, bundle, name, dependency)`` tuples
+    (see ``candyshop.report.get_state()``), one per branch.
+    """
+
+    def __init__(self, repo, branches, locations=None, exclude_tests=True,
+                 checks=None, parse_cache=None, **kwargs):
+        """
+        Initialize a ``BranchComparison`` instance.
+
+        :param repo: (string) a path pointing to a git repository, which can
+                     be bare.
+        :param branches: (list) the branches (or other references) to
+                         compare.
+        :param locations: (list) paths of the bundles, relative to the root
+                          directory of the repository. Default: the root
+                          directory.
+        :param exclude_tests: (boolean) if ``True``, will exclude modules
+                              inside ``tests`` directories.
+        :param checks: (list) names of the checks to compare (see
+                       ``candyshop.report.CHECKS``). Default: all.
+        :param parse_cache: (``ParseCache`` or string) the parse cache shared
+                            by all branches, or a path pointing to its
+                            database file. Default: a new ``ParseCache``,
+                            kept in memory.
+        :param kwargs: other parameters passed to the ``Environment`` of
+                       each branch, whose ``branch`` parameter is the branch
+                       by default. ``{branch}`` is replaced by the branch in
+                       string values (for example,
+                       ``init_from_index='odoo-{branch}.idx'``).
+        :return: a ``BranchComparison`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        assert branches, 'There are no branches to compare.'
+
+        #: Attribute ``BranchComparison.checks`` (list or None): The names
+        #: of the checks to compare.
+        self.checks = checks
+
+        #: Attribute ``BranchComparison.parse_cache`` (``ParseCache``): The
+        #: data extracted from files, shared by all branches.
+        self.parse_cache = get_cache(ParseCache, parse_cache) or ParseCache()
+
+        #: Attribute ``BranchComparison.environments`` (dict): An ordered
+        #: dictionary mapping each branch to its ``Environment``.
+        self.environments = OrderedDict()
+
+        try:
+            for branch in branches:
+                env = Environment(parse_cache=self.parse_cache,
+                                  **get_options(branch, kwargs))
+                self.environments[branch] = env
+                env.addbundles_fromgit(repo, branch, locations,
+                                       exclude_tests)
+        except BaseException:
+            self.destroy()
+            raise
+
+        self.__states = {}
+
+    def destroy(self):
+        """
+        Destroy the environments of all branches.
+
+        .. versionadded:: 0.3.0
+        """
+        for env in self.environments.values():
+            env.destroy()
+        self.environments = OrderedDict()
+        self.__states = {}
+
+    def get_state(self, branch):
+        """
+        Get the results of the checks of a branch.
+
+        :param branch: (string) the branch.
+        :return: (set) a ``(check, bundle, name, dependency)`` tuple for each
+                 missing dependency.
+
+        .. versionadded:: 0.3.0
+        """
+        if branch not in self.__states:
+            self.__states[branch] = get_state(self.environments[branch],
+                                              self.checks)
+        return self.__states[branch]
+
+    def get_differences(self, base, other):
+        """
+        Get the dependencies missing in a branch but not in another.
+
+        :param base: (string) the branch to compare with.
+        :param other: (string) the compared branch.
+        :return: (list) a dictionary for each dependency that is missing in
+                 ``other`` but not in ``base`` (``event`` is ``missing``),
+                 or the other way around (``event`` is ``satisfied``). See
+                 ``candyshop.watch.get_delta()``.
+
+        .. versionadded:: 0.3.0
+        """
+        return get_delta(self.get_state(base), self.get_state(other))
+
+    def get_matrix(self):
+        """
+        Get the branches where each dependency is missing.
+
+        :return: (list) a dictionary for each dependency missing in some
+                 branch, sorted, with the keys ``check``, ``bundle``,
+                 ``name``, ``dependency`` and ``branches`` (the list of
+                 branches where it is missing, in the order they were
+                 given).
+
+        .. versionadded:: 0.3.0
+        """
+        matrix = OrderedDict()
+        for branch in self.environments:
+            for item in self.get_state(branch):
+                matrix.setdefault(item, []).append(branch)
+        return [dict(zip(('check', 'bundle', 'name', 'dependency'), item),
+                     branches=matrix[item])
+                for item in sorted(matrix)]
+
+    def get_common(self):
+        """
+        Get the dependencies missing in every branch.
+
+        :return: (set) a ``(check, bundle, name, dependency)`` tuple for each
+                 dependency missing in all branches.
+
+        .. versionadded:: 0.3.0
+        """
+        return set.intersection(*[self.get_state(branch)
+                                  for branch in self.environments])
+
+
+def get_options(branch, options):
+    """
+    Get the parameters of the ``Environment`` of a branch.
+
+    :param branch: (string) the branch.
+    :param options: (dict) the parameters given for all branches.
+    :return: (dict) the parameters, with ``{branch}`` replaced by the branch
+             in string values, and ``branch`` set if it was not given.
+
+    >>> sorted(get_options('15.0', {'init_from_index': 'odoo-{branch}.idx',
+    ...                             'lazy': True}).items())
+    [('branch', '15.0'), ('init_from_index', 'odoo-15.0.idx'), ('lazy', True)]
+    >>> get_options('15.0', {'init_from_index': '{odoo}/{branch}.idx'})
+    {'init_from_index': '{odoo}/15.0.idx', 'branch': '15.0'}
+
+    .. versionadded:: 0.3.0
+    """
+    options = dict((key, value.replace('{branch}', branch)
+                    if isinstance(value, str) else value)
+                   for key, value in options.items())
+    options.setdefault('branch', branch)
+    return options
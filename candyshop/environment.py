@@ -23,16 +23,66 @@ bundles can be consulted for different reports.
 """
 
 import os
-import sys
 import shutil
 import tempfile
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from sh import git
 
-from .bundle import Bundle
+from .bundle import (Bundle, extract_records, get_referenced_modules,
+                     set_records_file)
+from .cache import (CloneCache, ManifestCache, ParseCache, RecordCache,
+                    sparse_clone)
+from .gittree import GitBundle, GitTree
+from .graph import DependencyGraph
+from .index import IndexedBundle, read_index, write_index
+from .metrics import METRICS, timed
+from .profiling import profiled
+from .report import TextReport, iter_problems
+from .utils import is_subpath
 
 DEFAULT_URL = 'https://github.com/odoo/odoo'
 DEFAULT_BRANCH = '15.0'
+DEFAULT_CLONE_WORKERS = 4
+
+
+def get_cache(cls, cache=None):
+    """
+    Get an instance of a cache class.
+
+    :param cls: the cache class.
+    :param cache: an instance of ``cls``, a path that will be used to create
+                  one, or ``None``.
+    :return: an instance of ``cls``, or ``None`` if ``cache`` is ``None``.
+
+    .. versionadded:: 0.3.0
+    """
+    if cache is None or isinstance(cache, cls):
+        return cache
+    return cls(cache)
+
+
+def get_git_changed_paths(repo, rev_range=None):
+    """
+    Get the paths of the files changed in a git repository.
+
+    :param repo: (string) a path pointing to a git repository.
+    :param rev_range: (string) a revision range understood by ``git diff``
+                      (for example, ``origin/15.0...HEAD``). If ``None``
+                      (default), uncommitted changes are listed.
+    :return: (list) the absolute paths of the changed files, including
+             deleted files and both sides of renames.
+
+    .. versionadded:: 0.3.0
+    """
+    toplevel = str(git('-C', repo, 'rev-parse', '--show-toplevel',
+                       _tty_out=False)).strip()
+    output = git('-C', repo, 'diff', '--name-only', '--no-renames',
+                 rev_range or 'HEAD', '--', _tty_out=False)
+    return [os.path.join(toplevel, line)
+            for line in str(output).splitlines() if line]
 
 
 class Environment(object):
@@ -45,7 +95,10 @@ class Environment(object):
     """
 
     def __init__(self, init=True, init_from=None,
-                 url=DEFAULT_URL, branch=DEFAULT_BRANCH):
+                 url=DEFAULT_URL, branch=DEFAULT_BRANCH,
+                 clone_workers=DEFAULT_CLONE_WORKERS, cache=None,
+                 manifest_cache=None, record_cache=None, lazy=False,
+                 init_from_index=None, sparse=False, parse_cache=None):
         """
         Initialize the ``Environment`` instance.
 
@@ -59,24 +112,101 @@ class Environment(object):
                      used to clone the Odoo Codebase if ``init`` is ``True``
                      and ``init_from`` is ``None``.
         :param branch: (string) the branch used to clone ``url``.
+        :param clone_workers: (int) the maximum number of OCA dependencies
+                              that will be cloned at the same time.
+        :param cache: (``CloneCache`` or string) a clone cache, or a path
+                      pointing to its directory. If present, repositories are
+                      materialized from the cache instead of being cloned
+                      from start. Default: None (no cache).
+        :param manifest_cache: (``ManifestCache`` or string) a manifest cache,
+                               or a path pointing to its database file. If
+                               present, manifests of all bundles are read
+                               through it. Default: None (no cache).
+        :param record_cache: (``RecordCache`` or string) a record cache, or a
+                             path pointing to its database file (which can
+                             be the same file of ``manifest_cache``). If
+                             present, records extracted from XML files are
+                             stored in it, so that unchanged files are not
+                             parsed again on subsequent runs. Default: None
+                             (no cache).
+        :param lazy: (boolean) if ``True``, the manifests of the modules of
+                     every bundle are read on first access instead of when
+                     the bundle is inserted. Default: False.
+        :param init_from_index: (string) a path pointing to an index of an
+                                Odoo codebase (see ``save()``). If present,
+                                the native addons are loaded from this file
+                                instead of being cloned or read from
+                                ``init_from``, which takes milliseconds.
+        :param sparse: (boolean) if ``True``, only the files needed to
+                       analyze cloned repositories (manifests, ``__init__.py``
+                       files and declared data files) are fetched and
+                       written to disk. Default: False.
+        :param parse_cache: (``ParseCache`` or string) a content-addressed
+                            parse cache, or a path pointing to its database
+                            file. If present, files whose contents were
+                            already parsed (in any bundle) are not parsed
+                            again, unless ``manifest_cache`` or
+                            ``record_cache`` are used instead. Default: None
+                            (no cache).
         :return: an ``Environment`` instance.
 
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Added the ``clone_workers``, ``cache``, ``manifest_cache``,
+           ``record_cache``, ``lazy``, ``init_from_index``, ``sparse`` and
+           ``parse_cache`` parameters.
         """
         #: Attribute ``Environment.bundles`` (list): A list of ``Bundle``
         #: instances representing the bundles contained in this environment.
         self.bundles = []
 
+        #: Attribute ``Environment.modules_index`` (dict): An index mapping
+        #: module names (slugs) to ``Module`` instances, updated each time a
+        #: bundle is inserted. If two bundles contain a module with the same
+        #: name, the first one registered wins.
+        self.modules_index = {}
+
+        #: Attribute ``Environment.clone_workers`` (int): The size of the
+        #: thread pool used to clone OCA dependencies.
+        self.clone_workers = clone_workers
+
+        #: Attribute ``Environment.cache`` (``CloneCache`` or None): The
+        #: cache used to clone the Odoo codebase and OCA dependencies.
+        self.cache = get_cache(CloneCache, cache)
+
+        #: Attribute ``Environment.manifest_cache`` (``ManifestCache`` or
+        #: None): The cache used to read the manifests of all bundles.
+        self.manifest_cache = get_cache(ManifestCache, manifest_cache)
+
+        #: Attribute ``Environment.record_cache`` (``RecordCache`` or None):
+        #: The cache used to store the records of XML files of all bundles.
+        self.record_cache = get_cache(RecordCache, record_cache)
+
+        #: Attribute ``Environment.parse_cache`` (``ParseCache`` or None):
+        #: The cache of data extracted from the contents of files.
+        self.parse_cache = get_cache(ParseCache, parse_cache)
+
+        #: Attribute ``Environment.lazy`` (boolean): True if the manifests
+        #: of the modules are read on first access. False otherwise.
+        self.lazy = lazy
+
+        #: Attribute ``Environment.sparse`` (boolean): True if only the
+        #: files needed for the analysis are checked out from cloned
+        #: repositories. False otherwise.
+        self.sparse = sparse
+
+        self.__graph = None
+
         #: Attribute ``Environment.path`` (string): A path pointing to
         #: the temporary directory where odoo and OCA dependencies will be
         #: cloned.
         self.path = tempfile.mkdtemp()
 
         if init:
-            self.__initialize_odoo(url, branch, init_from)
+            self.__initialize_odoo(url, branch, init_from, init_from_index)
 
     def __initialize_odoo(self, url=DEFAULT_URL, branch=DEFAULT_BRANCH,
-                          init_from=None):
+                          init_from=None, init_from_index=None):
         """
         Private method to clone an Odoo codebase inside the Environment path.
 
@@ -85,8 +215,16 @@ class Environment(object):
         with. Without this method, native modules (base, board, etc) would
         appear as missing dependencies.
 
+        If ``init_from_index`` is present, the native bundles are loaded from
+        this index instead.
+
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Added the ``init_from_index`` parameter.
         """
+        if init_from_index:
+            self.__add_index(init_from_index)
+            return
         if init_from:
             if not os.path.isdir(init_from):
                 raise Exception('init_from directory "{0}" doesn\'t'
@@ -101,40 +239,110 @@ class Environment(object):
             os.path.join(odoo_dir, 'odoo', 'addons')
         ])
 
-    @staticmethod
-    def __git_clone(url, branch, path):
+    def __git_clone(self, url, branch, path):
         """
         Private method to clone a git repository.
 
         This method clones a git repository specified by ``url`` and
         ``branch`` to a folder ``path``. The ``--depth=1`` option is passed
-        to the command to avoid cloning full history.
+        to the command to avoid cloning full history. If the environment
+        has a clone cache, the repository is checked out from it instead.
+        If ``Environment.sparse`` is ``True``, the checkout is sparse (see
+        ``candyshop.cache.sparse_clone()``). The clone is measured as the
+        ``clone`` phase of ``candyshop.metrics.METRICS``; the files it
+        produced are counted afterwards, so walking them is not measured.
 
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Use ``Environment.cache`` and ``Environment.sparse``.
+        """
+        self.__clone(url, branch, path)
+        METRICS.count_path(path, 'clone')
+
+    @timed('clone')
+    def __clone(self, url, branch, path):
+        """
+        Private method to clone a git repository, see ``__git_clone()``.
+
+        .. versionadded:: 0.3.0
         """
         try:
-            git.clone(url, path, quiet=True, depth=1, branch=branch)
+            if self.cache is not None:
+                self.cache.checkout(url, branch, path, self.sparse)
+            elif self.sparse:
+                sparse_clone(url, branch, path)
+            else:
+                git.clone(url, path, quiet=True, depth=1, branch=branch)
         except BaseException:
             print('There was a problem cloning {0}.'.format(url))
             raise
 
-    def __clone_deptree(self):
+    def __clone_deptree(self, bundles=None):
         """
-        Private method that clones the dependency tree of existing bundles.
+        Private method that clones the dependency tree of a list of bundles.
 
-        It reads the oca_dependencies attribute of each bundle, clones each one
-        (if any) and then adds them as bundles (which invokes this method again
-        to satisfy dependencies in the new bundles).
+        The tree is traversed breadth-first. On each level, the
+        oca_dependencies attribute of every bundle is read, all the
+        repositories that are not yet in the environment are cloned
+        concurrently (using up to ``clone_workers`` threads) and only then
+        they are added as bundles, whose dependencies form the next level.
+
+        :param bundles: (list) the ``Bundle`` instances whose dependencies
+                        will be cloned.
 
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Repositories of the same level are cloned concurrently.
         """
-        for bundle in self.bundles:
+        level = bundles or []
+        while level:
+            pending = self.__pending_dependencies(level)
+            with ThreadPoolExecutor(self.clone_workers) as executor:
+                list(executor.map(lambda dep: self.__git_clone(*dep),
+                                  pending.values()))
+            level = list(filter(None, map(self.__addbundle, pending)))
+
+    def __pending_dependencies(self, bundles):
+        """
+        Private method that lists the OCA dependencies that must be cloned.
+
+        Dependencies are deduplicated by name, url and branch. Since the name
+        is also the name of the directory they are cloned into, only the
+        first declaration of a name is cloned; a ``UserWarning`` is issued
+        for later declarations with a different url or branch.
+
+        :param bundles: (list) a list of ``Bundle`` instances.
+        :return: (dict) a dictionary mapping the path where each dependency
+                 will be cloned to a tuple of ``(url, branch, path)``.
+
+        .. versionadded:: 0.3.0
+        """
+        pending = {}
+        for bundle in bundles:
             for name, url, branch in bundle.oca_dependencies:
                 bundle_dir = os.path.join(self.path, name)
-                if os.path.isdir(bundle_dir):
-                    continue
-                self.__git_clone(url=url, branch=branch, path=bundle_dir)
-                self.addbundles([bundle_dir])
+                if bundle_dir in pending:
+                    self.__check_conflict(pending[bundle_dir], url, branch)
+                elif not os.path.isdir(bundle_dir):
+                    pending[bundle_dir] = (url, branch, bundle_dir)
+        return pending
+
+    def __check_conflict(self, dependency, url, branch):
+        """
+        Private method that warns about conflicting OCA dependencies.
+
+        :param dependency: (tuple) the ``(url, branch, path)`` tuple that
+                           will be cloned.
+        :param url: (string) the url of another declaration of the same name.
+        :param branch: (string) the branch of that declaration.
+
+        .. versionadded:: 0.3.0
+        """
+        if dependency[:2] != (url, branch):
+            warnings.warn('{0} is declared as {1} {2} and as {3} {4}; only'
+                          ' the first one is cloned.'.format(
+                              os.path.basename(dependency[2]),
+                              dependency[0], dependency[1], url, branch))
 
     def __deps_notin_e(self, deps=None):
         """
@@ -148,15 +356,40 @@ class Environment(object):
         """
         deps = deps or []
         for dep in deps:
-            if dep not in self.get_modules_slug_list():
+            if dep not in self.modules_index:
                 yield dep
 
+    def __index_bundle(self, bundle):
+        """
+        Private method that registers the modules of a bundle in the index.
+
+        :param bundle: (``Bundle``) the bundle whose modules will be indexed.
+
+        .. versionadded:: 0.3.0
+        """
+        for module in bundle.modules:
+            self.modules_index.setdefault(module.slug, module)
+        self.__graph = None
+
+    def __reindex(self):
+        """
+        Private method that builds the modules index from scratch.
+
+        .. versionadded:: 0.3.0
+        """
+        self.modules_index = {}
+        self.__graph = None
+        for bundle in self.bundles:
+            self.__index_bundle(bundle)
+
+    @profiled
     def addbundles(self, locations=None, exclude_tests=True):
         """
         Public method that inserts bundles inside the environment.
 
-        This method register a list of bundles and builds the dependency tree
-        of each bundle recursively by calling ``__clone_deptree()``.
+        This method register a list of bundles and then builds the dependency
+        tree of the new bundles by calling ``__clone_deptree()``. It can be
+        profiled, see ``candyshop.profiling``.
 
         :param locations: (list) a list of strings containing relative or
                           absolute paths to directories containig bundles.
@@ -164,32 +397,176 @@ class Environment(object):
                               inside ``tests`` directories.
 
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Profile the calls if ``CANDYSHOP_PROFILE`` is set.
         """
         locations = locations or []
-        for location in locations:
-            location = os.path.abspath(location)
-            if location in self.get_bundle_path_list() or \
-               not os.path.isdir(location):
-                continue
-            try:
-                self.bundles.append(Bundle(location, exclude_tests))
-            except BaseException:
-                print(('There was a problem inserting the bundle'
-                       ' located at {0}').format(location))
-                raise
-            else:
-                self.__clone_deptree()
+        bundles = [self.__addbundle(location, exclude_tests)
+                   for location in locations]
+        self.__clone_deptree(list(filter(None, bundles)))
+
+    def __addbundle(self, location, exclude_tests=True):
+        """
+        Private method that inserts a single bundle inside the environment.
+
+        :param location: (string) a relative or absolute path to a directory
+                         containing a bundle.
+        :param exclude_tests: (boolean) if ``True``, will exclude modules
+                              inside ``tests`` directories.
+        :return: (``Bundle`` or ``None``) the inserted bundle, or ``None`` if
+                 ``location`` is not a directory or was already inserted.
+
+        .. versionadded:: 0.3.0
+        """
+        location = os.path.abspath(location)
+        if location in self.get_bundle_path_list() or \
+           not os.path.isdir(location):
+            return None
+        try:
+            bundle = Bundle(location, exclude_tests, self.manifest_cache,
+                            self.record_cache, self.lazy, self.parse_cache)
+        except BaseException:
+            print(('There was a problem inserting the bundle'
+                   ' located at {0}').format(location))
+            raise
+        self.bundles.append(bundle)
+        self.__index_bundle(bundle)
+        return bundle
+
+    def addbundles_fromgit(self, repo, ref='HEAD', locations=None,
+                           exclude_tests=True, objects=None):
+        """
+        Public method that inserts bundles read from a git commit.
+
+        Files are read from git objects (see ``candyshop.gittree``), so
+        ``repo`` can be a bare repository and nothing is checked out. Like
+        ``addbundles()``, the OCA dependencies of the new bundles are cloned.
+
+        :param repo: (string) a path pointing to a git repository.
+        :param ref: (string) a branch, tag or commit of the repository.
+                    Default: ``HEAD``.
+        :param locations: (list) paths of the bundles, relative to the root
+                          directory of the commit. Default: the root
+                          directory.
+        :param exclude_tests: (boolean) if ``True``, will exclude modules
+                              inside ``tests`` directories.
+        :param objects: (dict or ``ParseCache``) data extracted from files,
+                        shared with other trees (see ``GitTree.objects``).
+                        Default: ``Environment.parse_cache``, if any.
+        :return: (list) the inserted ``GitBundle`` instances.
+
+        .. versionadded:: 0.3.0
+        """
+        tree = GitTree(repo, ref, objects if objects is not None
+                       else self.parse_cache)
+        paths = list(self.get_bundle_path_list())
+        bundles = [GitBundle(tree, location, exclude_tests, self.lazy)
+                   for location in locations or ['']
+                   if tree.get_path(location) not in paths]
+        self.bundles.extend(bundles)
+        for bundle in bundles:
+            self.__index_bundle(bundle)
+        self.__clone_deptree(bundles)
+        return bundles
+
+    def refresh(self, paths=None):
+        """
+        Public method that updates the environment after files changed.
+
+        Only the bundles containing changed paths are updated (see
+        ``Bundle.update()``): changed manifests are read again, records of
+        changed XML files are extracted again the next time they are
+        needed, and new OCA dependencies are cloned. Reports generated
+        afterwards take the changes into account. Bundles loaded from an
+        index are not updated.
+
+        :param paths: (list) paths of created, modified or deleted files.
+                      ``get_git_changed_paths()`` can be used to get them
+                      from a git diff.
+        :return: (list) the ``Module`` instances containing changed files.
+
+        .. versionadded:: 0.3.0
+        """
+        paths = [os.path.abspath(p) for p in paths or []]
+        affected, updated = [], []
+        for bundle in self.bundles:
+            inside = [p for p in paths if is_subpath(p, bundle.path)]
+            if inside and not isinstance(bundle, IndexedBundle):
+                affected.extend(bundle.update(inside))
+                updated.append(bundle)
+        self.__reindex()
+        self.__clone_deptree(updated)
+        return affected
+
+    def save(self, path, workers=None):
+        """
+        Public method that saves the bundles of the environment to an index.
+
+        The records of all XML data files are extracted beforehand (see
+        ``extract_records()``), so that the index holds everything needed to
+        generate reports. The environment can be restored with ``load()``.
+
+        :param path: (string) a path pointing to the index file. It is
+                     replaced if it exists.
+        :param workers: (int) the number of processes used to parse XML
+                        files. See ``extract_records()``.
+
+        .. versionadded:: 0.3.0
+        """
+        self.extract_records(workers)
+        write_index(path, self.bundles)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """
+        Public method that creates an environment from an index.
+
+        Bundles are read from the index instead of their directories, which
+        do not need to exist; they are snapshots that are not updated by
+        ``refresh()``. OCA dependencies are not cloned, since the index
+        already contains the bundles that were in the saved environment.
+
+        :param path: (string) a path pointing to a file written by
+                     ``save()``.
+        :param kwargs: other parameters passed to ``Environment()``, except
+                       ``init``.
+        :return: an ``Environment`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        env = cls(init=False, **kwargs)
+        env.__add_index(path)
+        return env
+
+    def __add_index(self, path):
+        """
+        Private method that inserts the bundles of an index.
+
+        Bundles whose path is already in the environment are skipped.
+
+        :param path: (string) a path pointing to the index file.
+        :return: (list) the inserted ``IndexedBundle`` instances.
+
+        .. versionadded:: 0.3.0
+        """
+        paths = list(self.get_bundle_path_list())
+        bundles = [b for b in read_index(path) if b.path not in paths]
+        self.bundles.extend(bundles)
+        self.__reindex()
+        return bundles
 
     def destroy(self):
         """
         Public method to destroy an ``Environment`` instance.
 
-        This method empties the bundle list and deletes the environment path,
-        including all previously clones bundles.
+        This method empties the bundle list and the modules index, and deletes
+        the environment path, including all previously clones bundles.
 
         .. versionadded:: 0.1.0
         """
         self.bundles = []
+        self.modules_index = {}
+        self.__graph = None
         shutil.rmtree(self.path)
 
     def reset(self):
@@ -240,12 +617,92 @@ class Environment(object):
         """
         for bundle in self.bundles:
             for module in bundle.modules:
-                yield module.properties.slug
+                yield module.slug
+
+    def get_module(self, slug):
+        """
+        Public method that looks up a module by its name.
+
+        :param slug: (string) the name of the module.
+        :return: (``Module`` or ``None``) the ``Module`` instance registered
+                 under ``slug``, or ``None`` if it is not present within the
+                 environment.
+
+        .. versionadded:: 0.3.0
+        """
+        return self.modules_index.get(slug)
+
+    def get_modules_frompaths(self, paths):
+        """
+        Public method that looks up the modules containing some paths.
+
+        :param paths: (list) relative or absolute paths of files or
+                      directories. They do not need to exist.
+        :return: (generator) a generator that produces the ``Module``
+                 instance (registered in ``modules_index``) containing each
+                 path. Paths outside of any module are skipped.
+
+        .. versionadded:: 0.3.0
+        """
+        index = {module.path: module
+                 for module in self.modules_index.values()}
+        for path in paths:
+            path = os.path.abspath(path)
+            while path not in index and os.path.dirname(path) != path:
+                path = os.path.dirname(path)
+            if path in index:
+                yield index[path]
+
+    def get_impacted_modules(self, slugs=None, paths=None):
+        """
+        Public method that informs about the modules impacted by changes.
+
+        A module is impacted if it changed, or if it depends (directly or
+        not) on a module that changed.
 
+        :param slugs: (list) names of the modules that changed. They do not
+                      need to be present within the environment.
+        :param paths: (list) paths of created, modified or deleted files.
+                      The modules containing them are considered changed.
+                      ``get_git_changed_paths()`` can be used to get them
+                      from a git diff.
+        :return: (list) names of the impacted modules present within the
+                 environment, sorted.
+
+        .. versionadded:: 0.3.0
+        """
+        graph = self.get_dependency_graph()
+        changed = set(slugs or [])
+        changed.update(m.slug for m in self.get_modules_frompaths(paths or []))
+        impacted = {slug for slug in changed if slug in graph}
+        impacted.update(graph.get_dependents(changed))
+        return sorted(impacted)
+
+    def get_dependency_graph(self):
+        """
+        Public method that gets the dependency graph of the environment.
+
+        The graph is built from the manifests of the modules registered in
+        ``modules_index`` the first time it is requested, and built again
+        after bundles are inserted or refreshed.
+
+        :return: (``DependencyGraph``) the dependency graph.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.__graph is None:
+            self.__graph = DependencyGraph(
+                (slug, getattr(module.properties, 'depends', []))
+                for slug, module in self.modules_index.items())
+        return self.__graph
+
+    @profiled
     def get_notmet_dependencies(self):
         """
         Public method that informs about missing dependencies in modules.
 
+        It can be profiled, see ``candyshop.profiling``.
+
         :return: (generator) a generator that produces an iterable of
                  dictionaries containing references to each bundle that have
                  unmet dependencies within a module. The output is something
@@ -260,18 +717,104 @@ class Environment(object):
                     ]
 
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Profile the calls if ``CANDYSHOP_PROFILE`` is set.
         """
         for module in self.get_modules_list():
             if hasattr(module.properties, 'depends'):
                 deplist = list(self.__deps_notin_e(module.properties.depends))
                 if not deplist:
                     continue
-                yield {module.bundle.name: {module.properties.slug: deplist}}
+                yield {module.bundle.name: {module.slug: deplist}}
+
+    def extract_records(self, workers=None):
+        """
+        Public method that parses the XML data files of all modules.
+
+        Files are distributed among ``workers`` processes, which send back
+        compact record tuples that are stored in each ``Module``. Files that
+        were already parsed are skipped. If the environment has a parse
+        cache, files with identical contents are parsed only once. This is
+        measured as the ``records`` phase of ``candyshop.metrics.METRICS``.
+
+        :param workers: (int) the number of worker processes. If ``None``
+                        (default) or lower than 2, files are parsed in the
+                        current process when they are first needed.
+
+        .. versionadded:: 0.3.0
+        """
+        if not workers or workers < 2:
+            return
+        with METRICS.phase('records'):
+            self.__extract_records(workers)
+
+    def __extract_records(self, workers):
+        """
+        Private method that parses the pending XML files in worker processes.
 
-    def get_notmet_record_ids(self):
+        .. versionadded:: 0.3.0
+        """
+        groups = self.__group_extraction_tasks(
+            self.__get_extraction_tasks())
+        chunksize = max(1, len(groups) // (workers * 4))
+        METRICS.count(files=len(groups))
+        with ProcessPoolExecutor(workers) as executor:
+            results = executor.map(extract_records,
+                                   [tasks[0][1] for tasks in groups],
+                                   [tasks[0][0].slug for tasks in groups],
+                                   chunksize=chunksize)
+            for tasks, records in zip(groups, results):
+                for module, datafile, key in tasks:
+                    module.store_records_fromfile(
+                        datafile, set_records_file(records, datafile), key)
+
+    def __group_extraction_tasks(self, tasks):
+        """
+        Private method that groups the tasks that parse identical files.
+
+        Tasks without a parse cache key are each in its own group.
+
+        :param tasks: (iterable) tuples of ``(module, xmlfile, key)``.
+        :return: (list) lists of tasks whose files have the same contents
+                 and are owned by modules with the same name.
+
+        .. versionadded:: 0.3.0
+        """
+        groups = OrderedDict()
+        for task in tasks:
+            groups.setdefault(task[2] or task[:2], []).append(task)
+        return list(groups.values())
+
+    def __get_extraction_tasks(self):
+        """
+        Private method that lists the XML files that must be parsed.
+
+        Files whose records are in memory or in the caches are skipped.
+        Each file is hashed once, if there is a parse cache: its key is
+        reused to group, look up and store its records.
+
+        :return: (generator) a generator that produces tuples of
+                 ``(module, xmlfile, key)``.
+
+        .. versionadded:: 0.3.0
+        """
+        for module in self.get_modules_list():
+            for datafile in module.get_pending_datafiles():
+                key = module.get_records_key(datafile)
+                if not module.lookup_records_fromfile(datafile, key):
+                    yield module, datafile, key
+
+    @profiled
+    def get_notmet_record_ids(self, workers=None):
         """
         Public method that informs about missing dependencies in XML files.
 
+        It can be profiled, see ``candyshop.profiling``.
+
+        :param workers: (int) if present, XML files are parsed beforehand by
+                        this number of worker processes (see
+                        ``extract_records()``). The output is the same as
+                        in the serial mode.
         :return: (generator) a generator that produces an iterable of
                  dictionaries containing references to each bundle that have
                  unmet dependencies refereced inside XML record ids. The output
@@ -286,65 +829,56 @@ class Environment(object):
                     ]
 
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Added the ``workers`` parameter. Profile the calls if
+           ``CANDYSHOP_PROFILE`` is set.
         """
+        self.extract_records(workers)
         for module in self.get_modules_list():
-            for data in module.get_record_ids_module_references():
+            for data in module.get_record_refs():
                 for xml, refs in data.items():
-                    deplist = list(self.__deps_notin_e(refs))
+                    deplist = list(self.__deps_notin_e(
+                        get_referenced_modules(refs)))
                     if not deplist:
                         continue
-                    relxml = os.path.join(module.properties.slug, xml)
+                    relxml = os.path.join(module.slug, xml)
                     yield {module.bundle.name: {relxml: deplist}}
 
-    def get_notmet_dependencies_report(self):
+    def get_notmet_dependencies_report(self, report=None):
         """
         Public method that reports missing dependencies in modules.
 
-        :return: (string) a report of human readable output for the
-                 ``get_notmet_dependencies()`` method.
+        :param report: (``Report``) the report writer. Default: a
+                       ``TextReport`` without summary, writing to the
+                       standard output.
+        :return: (int) 1 if there are missing dependencies, 0 otherwise.
 
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Added the ``report`` parameter. Problems are written as they are
+           found, and the exit status is returned instead of exiting.
         """
-        report = list(self.get_notmet_dependencies())
-        if report:
-            print('The following module dependencies are not found'
-                  ' in the environment:')
-            for item in report:
-                bundle, data = list(item.items())[0]
-                module, depends = list(data.items())[0]
-                print('')
-                print('    Bundle: {0}'.format(bundle))
-                print('    Module: {0}'.format(module))
-                print('    Missing dependencies:')
-                for dep in depends:
-                    print('        - {0}'.format(dep))
-            print('')
-            sys.exit(1)
-        else:
-            print('All dependencies are satisfied in the environment.')
+        report = report or TextReport(summary=False)
+        return report.write([('dependencies', iter_problems(
+            'dependencies', self.get_notmet_dependencies()))])
 
-    def get_notmet_record_ids_report(self):
+    def get_notmet_record_ids_report(self, workers=None, report=None):
         """
         Public method that reports missing dependencies in XML files.
 
-        :return: (string) a report of human readable output for the
-                 ``get_notmet_record_ids()`` method.
+        :param workers: (int) the number of worker processes used to parse
+                        XML files. See ``get_notmet_record_ids()``.
+        :param report: (``Report``) the report writer. Default: a
+                       ``TextReport`` without summary, writing to the
+                       standard output.
+        :return: (int) 1 if there are missing references, 0 otherwise.
 
         .. versionadded:: 0.1.0
+        .. versionchanged:: 0.3.0
+           Added the ``workers`` and ``report`` parameters. Problems are
+           written as they are found, and the exit status is returned
+           instead of exiting.
         """
-        report = list(self.get_notmet_record_ids())
-        if report:
-            print('The following record ids are not found in the environment:')
-            for item in report:
-                bundle, data = list(item.items())[0]
-                xmlfile, depends = list(data.items())[0]
-                print('')
-                print('    Bundle: {0}'.format(bundle))
-                print('    XML file: {0}'.format(xmlfile))
-                print('    Missing references:')
-                for dep in depends:
-                    print('        - {0}'.format(dep))
-            print('')
-            sys.exit(1)
-        else:
-            print('All references are present in the environment.')
+        report = report or TextReport(summary=False)
+        return report.write([('records', iter_problems(
+            'records', self.get_notmet_record_ids(workers)))])
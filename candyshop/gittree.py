@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+``candyshop.gittree`` is a module for reading bundles from git objects.
+
+This module implements bundles and modules that are read from a commit of a
+git repository instead of a directory: files are listed with ``git ls-tree``
+and read through a single ``git cat-file --batch`` process, so nothing is
+checked out. Several branches of the same repository (even a bare mirror)
+can be analyzed side by side::
+
+    for branch in ('14.0', '15.0', '16.0'):
+        bundle = GitBundle(GitTree('odoo.git', branch), 'addons')
+
+Paths of these bundles and modules are virtual: they look like
+``/path/to/odoo.git@15.0/addons/base``, but do not exist on disk.
+
+Trees can share a dictionary of extracted data (``GitTree.objects``), keyed
+by the hash of the contents of each file, so that files that are identical
+in several branches are parsed only once.
+"""
+
+import os
+import threading
+import subprocess
+import weakref
+from collections import OrderedDict
+
+from sh import git
+
+from .bundle import (DEFAULT_MANIFEST_FILE, Bundle, Module,
+                     extract_content_records, parse_manifest,
+                     parse_oca_dependencies, set_records_file)
+from .utils import ModuleEntry
+
+
+def _close_process(process):
+    """
+    Terminate a ``git cat-file --batch`` process.
+
+    Closing its input is not enough: worker processes forked in the meantime
+    keep a copy of it open, so the process would never see the end of it.
+
+    .. versionadded:: 0.3.0
+    """
+    process.stdin.close()
+    process.terminate()
+    process.wait()
+    process.stdout.close()
+
+
+class GitTree(object):
+    """
+    This class represents the files of a commit of a git repository.
+
+    For example::
+
+        tree = GitTree('odoo.git', '15.0')
+        tree.read('odoo/addons/base/__manifest__.py')
+    """
+
+    def __init__(self, repo, ref='HEAD', objects=None):
+        """
+        Initialize a ``GitTree`` instance.
+
+        :param repo: (string) a path pointing to a git repository, which can
+                     be bare.
+        :param ref: (string) a branch, tag or commit of the repository.
+                    Default: ``HEAD``.
+        :param objects: (dict or ``ParseCache``) a dictionary of extracted
+                        data shared with other trees, or a parse cache.
+                        Default: a new dictionary.
+        :return: a ``GitTree`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        #: Attribute ``GitTree.repo`` (string): The absolute path of the
+        #: repository.
+        self.repo = os.path.abspath(repo)
+
+        #: Attribute ``GitTree.ref`` (string): The reference of the commit.
+        self.ref = ref
+
+        #: Attribute ``GitTree.commit`` (string): The hash of the commit.
+        self.commit = str(git('-C', self.repo, 'rev-parse', '--verify',
+                              '{0}^{{commit}}'.format(ref))).strip()
+
+        #: Attribute ``GitTree.path`` (string): The virtual path of the root
+        #: directory of the commit.
+        self.path = '{0}@{1}'.format(self.repo, ref)
+
+        #: Attribute ``GitTree.blobs`` (dict): A dictionary mapping the
+        #: path of each file of the commit (relative to its root directory)
+        #: to the hash of its contents.
+        self.blobs = OrderedDict(self.__list_blobs())
+
+        #: Attribute ``GitTree.objects`` (dict or ``ParseCache``): A
+        #: dictionary mapping tuples of ``(hash, function, args)`` to the
+        #: data extracted by ``function`` from the contents of a file. The
+        #: hash of the contents is the hash of the git object, so keys are
+        #: the same as the keys of ``ParseCache``.
+        self.objects = {} if objects is None else objects
+
+        self.__process = None
+        self.__lock = threading.Lock()
+
+    def __list_blobs(self):
+        """
+        Private method that lists the files of the commit.
+
+        .. versionadded:: 0.3.0
+        """
+        output = git('-C', self.repo, 'ls-tree', '-r', '-z', '--full-tree',
+                     self.commit).stdout
+        for line in output.split(b'\0'):
+            info, _, path = line.partition(b'\t')
+            if info.split(b' ')[1:2] == [b'blob']:
+                yield path.decode('utf-8'), info.split(b' ')[2].decode()
+
+    def get_path(self, path=''):
+        """
+        Get the virtual path of a file or directory of the commit.
+
+        :param path: (string) a path relative to the root directory.
+        :return: (string) the virtual path.
+
+        .. versionadded:: 0.3.0
+        """
+        return os.path.normpath(os.path.join(self.path, path))
+
+    def get_relpath(self, path):
+        """
+        Get the path of a file relative to the root directory.
+
+        :param path: (string) a virtual path (see ``get_path()``).
+        :return: (string) the relative path.
+
+        .. versionadded:: 0.3.0
+        """
+        return os.path.relpath(path, self.path)
+
+    def isfile(self, path):
+        """
+        Check if a file exists in the commit.
+
+        :param path: (string) a path relative to the root directory.
+        :return: (boolean) ``True`` if the file exists, ``False`` otherwise.
+
+        .. versionadded:: 0.3.0
+        """
+        return path in self.blobs
+
+    def read(self, path):
+        """
+        Read the contents of a file of the commit.
+
+        :param path: (string) a path relative to the root directory.
+        :return: (bytes) the contents of the file.
+
+        .. versionadded:: 0.3.0
+        """
+        if path not in self.blobs:
+            raise IOError('{0} does not exist.'.format(self.get_path(path)))
+        return self.read_object(self.blobs[path])
+
+    def extract(self, path, function, *args):
+        """
+        Extract data from the contents of a file of the commit.
+
+        If the same data was already extracted from a file with the same
+        contents (in this commit or in other trees sharing
+        ``GitTree.objects``), it is reused instead.
+
+        :param path: (string) a path relative to the root directory.
+        :param function: (function) a function that receives the contents of
+                         the file (bytes) and ``args``, and returns the data.
+        :param args: other arguments of ``function``.
+        :return: the data returned by ``function``.
+
+        .. versionadded:: 0.3.0
+        """
+        if path not in self.blobs:
+            raise IOError('{0} does not exist.'.format(self.get_path(path)))
+        key = (self.blobs[path], function.__name__) + args
+        try:
+            return self.objects[key]
+        except KeyError:
+            data = self.objects[key] = function(self.read(path), *args)
+            return data
+
+    def read_object(self, sha):
+        """
+        Read an object of the repository.
+
+        Objects are read through a ``git cat-file --batch`` process that is
+        started on the first call and reused afterwards.
+
+        :param sha: (string) the hash of the object.
+        :return: (bytes) the contents of the object.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            process = self.__get_process()
+            process.stdin.write('{0}\n'.format(sha).encode('ascii'))
+            process.stdin.flush()
+            header = process.stdout.readline().split()
+            assert len(header) == 3, \
+                'The object {0} does not exist.'.format(sha)
+            data = process.stdout.read(int(header[2]))
+            process.stdout.read(1)
+            return data
+
+    def __get_process(self):
+        """
+        Private method that starts the ``git cat-file --batch`` process.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.__process is None:
+            self.__process = subprocess.Popen(
+                ['git', '-C', self.repo, 'cat-file', '--batch'],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self.__finalizer = weakref.finalize(self, _close_process,
+                                                self.__process)
+        return self.__process
+
+    def close(self):
+        """
+        Terminate the ``git cat-file --batch`` process, if any.
+
+        It is started again if more files are read afterwards.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            if self.__process is not None:
+                self.__finalizer()
+                self.__process = None
+
+    def scan_modules(self, path='', exclude_tests=True):
+        """
+        Search for module roots below a directory of the commit.
+
+        Like ``candyshop.utils.scan_modules()``, directories below a module
+        root and ``tests`` directories (if ``exclude_tests`` is ``True``)
+        are skipped.
+
+        :param path: (string) a path relative to the root directory.
+        :param exclude_tests: (boolean) ``True`` (default) to skip ``tests``
+                              directories.
+        :return: (list) the paths of the module roots, relative to the root
+                 directory, in alphabetical order.
+
+        .. versionadded:: 0.3.0
+        """
+        prefix = os.path.join(path, '') if path.strip('/.') else ''
+        roots = sorted(os.path.dirname(p) for p in self.blobs
+                       if p.startswith(prefix) and
+                       os.path.basename(p) == DEFAULT_MANIFEST_FILE)
+        modules = []
+        for root in roots:
+            if modules and root.startswith(os.path.join(modules[-1], '')):
+                continue
+            if exclude_tests and 'tests' in root[len(prefix):].split('/'):
+                continue
+            modules.append(root)
+        return modules
+
+
+class GitBundle(Bundle):
+    """
+    This class represents a bundle read from a commit of a git repository.
+
+    It behaves as a ``Bundle`` that is not checked out: its modules are
+    ``GitModule`` instances, and it is not updated when files change.
+    """
+
+    def __init__(self, tree, path='', exclude_tests=True, lazy=False):
+        """
+        Initialize a ``GitBundle`` instance.
+
+        :param tree: (``GitTree``) the commit.
+        :param path: (string) the path of the bundle relative to the root
+                     directory of the commit. Default: the root directory.
+        :param exclude_tests: (boolean) ``True`` (default) to exclude modules
+                              inside ``tests`` directories.
+        :param lazy: (boolean) if ``True``, manifests are read on first
+                     access. Default: False.
+        :return: a ``GitBundle`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        relpath = os.path.normpath(path).strip('/.')
+        super().__init__(tree.get_path(relpath), exclude_tests, lazy=lazy,
+                         scan=False)
+
+        #: Attribute ``GitBundle.tree`` (``GitTree``): The commit.
+        self.tree = tree
+
+        #: Attribute ``GitBundle.relpath`` (string): The path of the bundle
+        #: relative to the root directory of the commit.
+        self.relpath = relpath
+
+        self.modules = list(self.__get_modules())
+        assert self.modules, \
+            'The specified path does not contain valid Odoo modules.'
+        self.name = os.path.basename(self.relpath) or \
+            os.path.splitext(os.path.basename(tree.repo))[0]
+        self.oca_dependencies = list(self.__parse_oca_dependencies())
+
+    def __get_modules(self):
+        """
+        Private method to instance the modules of the bundle.
+
+        Modules that are not python packages, or whose manifest cannot be
+        read (unless the bundle is lazy), are skipped.
+
+        .. versionadded:: 0.3.0
+        """
+        for path in self.tree.scan_modules(self.relpath, self.exclude_tests):
+            try:
+                module = GitModule(self.tree, path, self)
+                yield module if self.lazy else module.load()
+            except (AssertionError, IOError):
+                continue
+
+    def __parse_oca_dependencies(self):
+        """
+        Private method to parse (if any) the oca_dependencies.txt file.
+
+        .. versionadded:: 0.3.0
+        """
+        oca_dependencies_file = os.path.join(self.relpath,
+                                             'oca_dependencies.txt')
+        if self.tree.isfile(oca_dependencies_file):
+            self.oca_dependencies_file = self.tree.get_path(
+                oca_dependencies_file)
+            yield from parse_oca_dependencies(
+                self.tree.read(oca_dependencies_file).decode('utf-8'))
+
+    def update(self, paths=None):
+        """
+        Ignore changes to files: the commit does not change.
+
+        :return: (list) an empty list.
+
+        .. versionadded:: 0.3.0
+        """
+        return []
+
+
+class GitModule(Module):
+    """
+    This class represents a module read from a commit of a git repository.
+
+    It behaves as a ``Module`` whose files are read from git objects.
+    Records are extracted on first access, in the current process.
+    """
+
+    def __init__(self, tree, path, bundle=None):
+        """
+        Initialize a ``GitModule`` instance.
+
+        :param tree: (``GitTree``) the commit.
+        :param path: (string) the path of the module relative to the root
+                     directory of the commit.
+        :param bundle: (``GitBundle``) the bundle of the module.
+        :return: a ``GitModule`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        assert tree.isfile(os.path.join(path, '__init__.py')), \
+            'The module is not a python package.'
+        module_dir = tree.get_path(path)
+        super().__init__(module_dir, bundle, ModuleEntry(
+            module_dir, os.path.join(module_dir, DEFAULT_MANIFEST_FILE), True))
+
+        #: Attribute ``GitModule.tree`` (``GitTree``): The commit.
+        self.tree = tree
+
+    def has_file(self, path):
+        """
+        Check if a file of the module exists in the commit.
+
+        See ``Module.has_file()``.
+
+        .. versionadded:: 0.3.0
+        """
+        return self.tree.isfile(self.tree.get_relpath(path))
+
+    def _read_properties(self):
+        """
+        Read the dictionary declared in the manifest from git.
+
+        See ``Module._read_properties()``.
+
+        .. versionadded:: 0.3.0
+        """
+        try:
+            return self.tree.extract(self.tree.get_relpath(self.manifest),
+                                     parse_manifest)
+        except BaseException:
+            raise IOError(('An error ocurred while '
+                           'reading {0}.').format(self.manifest))
+
+    def _read_records(self, xmlfile):
+        """
+        Extract the records of an XML data file from git.
+
+        See ``Module._read_records()``.
+
+        .. versionadded:: 0.3.0
+        """
+        return set_records_file(self.tree.extract(
+            self.tree.get_relpath(xmlfile), extract_content_records,
+            self.slug), xmlfile)
+
+    def _lookup_records(self, xmlfile, key):
+        """
+        Extract the records of an XML data file from git.
+
+        Worker processes cannot read the files of a commit, so they are
+        never left for them. See ``Module._lookup_records()``.
+
+        .. versionadded:: 0.3.0
+        """
+        return True, self._read_records(xmlfile)
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+``candyshop.graph`` is a module for querying module dependencies.
+
+This module implements a dependency graph that is compiled once from the
+``depends`` entries of the manifests of an environment, so that transitive
+dependencies, reverse dependencies, install order and dependency cycles can
+be queried without walking the ``Module`` instances again.
+"""
+
+from array import array
+
+
+def _reach(offsets, targets, roots, visited):
+    """
+    Get the nodes reachable from some nodes of a compiled graph.
+
+    :param offsets: (array) the position of the first edge of each node in
+                    ``targets``, followed by the total number of edges.
+    :param targets: (array) the target nodes of the edges.
+    :param roots: (iterable) the nodes where the traversal starts.
+    :param visited: (bytearray) the nodes already visited. It is updated
+                    with the reached nodes, which are skipped in subsequent
+                    calls.
+    :return: (list) the reached nodes that were not visited before,
+             including the roots, in breadth-first order.
+
+    >>> _reach(array('i', [0, 1, 2, 2]), array('i', [1, 2]), [0],
+    ...        bytearray(3))
+    [0, 1, 2]
+
+    .. versionadded:: 0.3.0
+    """
+    queue = []
+    for node in roots:
+        if not visited[node]:
+            visited[node] = 1
+            queue.append(node)
+    for node in queue:
+        queue.extend(_expand(offsets, targets, node, visited))
+    return queue
+
+
+def _expand(offsets, targets, node, visited):
+    """
+    Get the neighbours of a node that were not visited before.
+
+    :param offsets: (array) the position of the first edge of each node.
+    :param targets: (array) the target nodes of the edges.
+    :param node: (int) the node whose neighbours are visited.
+    :param visited: (bytearray) the nodes already visited. It is updated
+                    with the returned nodes.
+    :return: (list) the neighbours of ``node`` not visited before.
+
+    .. versionadded:: 0.3.0
+    """
+    found = []
+    for child in targets[offsets[node]:offsets[node + 1]]:
+        if not visited[child]:
+            visited[child] = 1
+            found.append(child)
+    return found
+
+
+def _postorder(offsets, targets, root, visited, order):
+    """
+    Append the nodes reachable from a node to a list, in postorder.
+
+    :param offsets: (array) the position of the first edge of each node.
+    :param targets: (array) the target nodes of the edges.
+    :param root: (int) the node where the traversal starts.
+    :param visited: (bytearray) the nodes already visited.
+    :param order: (array) the list where the nodes are appended.
+
+    .. versionadded:: 0.3.0
+    """
+    visited[root] = 1
+    stack = [(root, offsets[root])]
+    while stack:
+        node, position = stack[-1]
+        if position == offsets[node + 1]:
+            stack.pop()
+            order.append(node)
+            continue
+        stack[-1] = (node, position + 1)
+        child = targets[position]
+        if not visited[child]:
+            visited[child] = 1
+            stack.append((child, offsets[child]))
+
+
+def _compile(adjacency):
+    """
+    Compile adjacency lists into offset and target arrays.
+
+    :param adjacency: (list) a list containing, for each node, the list of
+                      nodes it points to.
+    :return: (tuple) the ``offsets`` and ``targets`` arrays.
+
+    >>> _compile([[1, 2], [], [0]])
+    (array('i', [0, 2, 2, 3]), array('i', [1, 2, 0]))
+
+    .. versionadded:: 0.3.0
+    """
+    offsets, targets = array('i', [0]), array('i')
+    for edges in adjacency:
+        targets.extend(edges)
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+class DependencyGraph(object):
+    """
+    This class represents the dependency graph of a group of modules.
+
+    Module names are mapped to consecutive integers, and the dependencies
+    of every module (as well as its reverse dependencies) are stored in
+    flat integer arrays, so that each query visits every module and
+    dependency at most once. Modules that are referenced as a dependency
+    but are not part of the graph are kept as *missing* nodes.
+
+    For example::
+
+        graph = environment.get_dependency_graph()
+        graph.get_install_order(['account'])
+        graph.get_dependents(['base'])
+    """
+
+    def __init__(self, modules=None):
+        """
+        Initialize a ``DependencyGraph`` instance.
+
+        :param modules: (iterable) ``(slug, depends)`` pairs, where
+                        ``depends`` is the list of names of the modules that
+                        the module ``slug`` depends on.
+        :return: a ``DependencyGraph`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        depends = dict(modules or [])
+        missing = {dep for deps in depends.values() for dep in deps}
+        missing.difference_update(depends)
+
+        #: Attribute ``DependencyGraph.slugs`` (list): The names of the
+        #: nodes of the graph; present modules first, then missing ones.
+        self.slugs = sorted(depends) + sorted(missing)
+
+        #: Attribute ``DependencyGraph.index`` (dict): A mapping from the
+        #: names of the nodes to their position in ``slugs``.
+        self.index = {slug: i for i, slug in enumerate(self.slugs)}
+
+        #: Attribute ``DependencyGraph.size`` (int): The number of present
+        #: modules. Nodes from this position onwards are missing modules.
+        self.size = len(depends)
+
+        adjacency = [sorted({self.index[dep] for dep in depends[slug]})
+                     for slug in self.slugs[:self.size]]
+        adjacency.extend([] for _ in missing)
+        reverse = [[] for _ in self.slugs]
+        for node, edges in enumerate(adjacency):
+            for dep in edges:
+                reverse[dep].append(node)
+        self.__offsets, self.__targets = _compile(adjacency)
+        self.__roffsets, self.__rtargets = _compile(reverse)
+
+    def __len__(self):
+        """
+        Get the number of nodes, including missing modules.
+
+        .. versionadded:: 0.3.0
+        """
+        return len(self.slugs)
+
+    def __contains__(self, slug):
+        """
+        Check if a module is present in the graph (not missing).
+
+        .. versionadded:: 0.3.0
+        """
+        return self.index.get(slug, self.size) < self.size
+
+    def __get_nodes(self, slugs):
+        """
+        Private method to get the nodes of some modules.
+
+        :param slugs: (iterable) names of modules. Names that are not in the
+                      graph are ignored.
+        :return: (list) the nodes of the modules.
+
+        .. versionadded:: 0.3.0
+        """
+        return [self.index[slug] for slug in slugs if slug in self.index]
+
+    def __get_names(self, nodes, exclude=()):
+        """
+        Private method to get the names of some nodes, sorted.
+
+        .. versionadded:: 0.3.0
+        """
+        exclude = set(exclude)
+        return sorted(self.slugs[node] for node in nodes
+                      if node not in exclude)
+
+    def get_missing(self):
+        """
+        Get the modules that are depended on but not present in the graph.
+
+        :return: (list) names of the missing modules, sorted.
+
+        .. versionadded:: 0.3.0
+        """
+        return self.slugs[self.size:]
+
+    def get_dependencies(self, slugs, transitive=True):
+        """
+        Get the modules that some modules depend on.
+
+        :param slugs: (iterable) names of modules.
+        :param transitive: (boolean) if ``True`` (default), dependencies of
+                           dependencies are included.
+        :return: (list) names of the dependencies, sorted, including missing
+                 modules and excluding ``slugs`` themselves.
+
+        .. versionadded:: 0.3.0
+        """
+        return self.__query(self.__offsets, self.__targets, slugs, transitive)
+
+    def get_dependents(self, slugs, transitive=True):
+        """
+        Get the modules that depend on some modules.
+
+        :param slugs: (iterable) names of modules.
+        :param transitive: (boolean) if ``True`` (default), modules that
+                           depend on the dependents are included.
+        :return: (list) names of the dependents, sorted, excluding ``slugs``
+                 themselves.
+
+        .. versionadded:: 0.3.0
+        """
+        return self.__query(self.__roffsets, self.__rtargets, slugs,
+                            transitive)
+
+    def __query(self, offsets, targets, slugs, transitive):
+        """
+        Private method that collects the neighbours of some modules.
+
+        .. versionadded:: 0.3.0
+        """
+        roots = self.__get_nodes(slugs)
+        if transitive:
+            return self.__get_names(
+                _reach(offsets, targets, roots, bytearray(len(self))), roots)
+        found = set()
+        for node in roots:
+            found.update(targets[offsets[node]:offsets[node + 1]])
+        return self.__get_names(found, roots)
+
+    def get_install_order(self, slugs=None):
+        """
+        Get the order in which modules can be installed.
+
+        Every module comes after all of its dependencies. Missing modules
+        are left out of the result.
+
+        :param slugs: (iterable) names of the modules to install, which
+                      will be listed together with all their dependencies.
+                      If ``None`` (default), all modules are listed.
+        :return: (list) names of the modules in install order.
+        :raise AssertionError: if the modules have dependency cycles.
+
+        .. versionadded:: 0.3.0
+        """
+        if slugs is None:
+            nodes = list(range(len(self)))
+        else:
+            nodes = sorted(_reach(self.__offsets, self.__targets,
+                                  self.__get_nodes(slugs),
+                                  bytearray(len(self))))
+        order = self.__sort(nodes)
+        assert len(order) == len(nodes), \
+            'There are dependency cycles between: {0}'.format(', '.join(
+                self.__get_names(set(nodes) - set(order))))
+        return [self.slugs[node] for node in order if node < self.size]
+
+    def __sort(self, nodes):
+        """
+        Private method that sorts some nodes topologically.
+
+        :param nodes: (list) the nodes to sort. They must include all the
+                      dependencies of each node.
+        :return: (list) the sorted nodes, leaving out those that are part of
+                 (or depend on) a cycle.
+
+        .. versionadded:: 0.3.0
+        """
+        pending = array('i', [0]) * len(self)
+        for node in nodes:
+            pending[node] = self.__offsets[node + 1] - self.__offsets[node]
+        order = [node for node in nodes if not pending[node]]
+        for node in order:
+            start, end = self.__roffsets[node], self.__roffsets[node + 1]
+            for dependent in self.__rtargets[start:end]:
+                pending[dependent] -= 1
+                if not pending[dependent]:
+                    order.append(dependent)
+        return order
+
+    def get_cycles(self):
+        """
+        Get the groups of modules that depend on each other.
+
+        :return: (list) a list of lists containing the names of the modules
+                 that are part of each cycle, sorted.
+
+        .. versionadded:: 0.3.0
+        """
+        visited, order = bytearray(len(self)), array('i')
+        for node in range(len(self)):
+            if not visited[node]:
+                _postorder(self.__offsets, self.__targets, node, visited,
+                           order)
+        visited = bytearray(len(self))
+        components = (_reach(self.__roffsets, self.__rtargets, [node],
+                             visited) for node in reversed(order))
+        return sorted(self.__get_names(component)
+                      for component in components
+                      if self.__is_cycle(component))
+
+    def __is_cycle(self, component):
+        """
+        Private method that checks if a strongly connected set is a cycle.
+
+        .. versionadded:: 0.3.0
+        """
+        if len(component) != 1:
+            return len(component) > 1
+        node = component[0]
+        start, end = self.__offsets[node], self.__offsets[node + 1]
+        return node in self.__targets[start:end]
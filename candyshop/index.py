@@ -0,0 +1,554 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+``candyshop.index`` is a module for saving analyzed bundles to a file.
+
+This module implements a compact binary index of bundles: their modules,
+manifests, XML data files and the records declared in them. An index can
+be loaded in a few milliseconds instead of scanning, parsing (and maybe
+cloning) the bundles again, so that it can be built once (for example, for
+the Odoo codebase of a given branch) and shared between CI jobs::
+
+    env.save('odoo-15.0.idx')
+    env = Environment.load('odoo-15.0.idx')
+
+The file starts with a header and a table of sections. Every string is
+stored once in a string table and referenced by its position. Every other
+section is an array of 32-bit unsigned integers (a column), so that loading
+an index only maps the file in memory: values are decoded when they are
+accessed.
+"""
+
+import os
+import sys
+import mmap
+import struct
+import marshal
+from array import array
+from collections import OrderedDict
+
+from .bundle import Bundle, Module
+from .utils import ModuleEntry
+
+INDEX_MAGIC = b'CSIX'
+INDEX_VERSION = 1
+
+#: The value used in columns instead of the position of a string for
+#: ``None`` values.
+NULL = 0xFFFFFFFF
+
+#: The header of the file: magic, version, byte order (0 for little endian,
+#: 1 for big endian) and number of sections.
+HEADER = struct.Struct('<4sHHI')
+
+#: An entry of the table of sections: name, offset and size in bytes.
+SECTION = struct.Struct('<24sQQ')
+
+#: The sections of the file. Sections ending in ``.offsets`` hold, for each
+#: row, the position of its first value in another section, followed by the
+#: total number of values.
+SECTIONS = (
+    'string.offsets', 'string.data',
+    'bundle.name', 'bundle.path', 'bundle.modules', 'bundle.ocadeps',
+    'ocadep.values',
+    'module.slug', 'module.path', 'module.manifest', 'module.depends',
+    'depend.values', 'module.datafiles', 'module.properties',
+    'property.data',
+    'datafile.name', 'datafile.records',
+    'record.module', 'record.xml_id', 'record.model', 'record.noupdate',
+    'record.line',
+)
+
+#: The sections that hold bytes instead of integers.
+BYTE_SECTIONS = ('string.data', 'property.data')
+
+#: The sections that hold offsets (they start with a zero).
+OFFSET_SECTIONS = ('string.offsets', 'bundle.modules', 'bundle.ocadeps',
+                   'module.depends', 'module.datafiles', 'module.properties',
+                   'datafile.records')
+
+
+class IndexWriter(object):
+    """
+    This class builds an index in memory and writes it to a file.
+
+    For example::
+
+        writer = IndexWriter()
+        for bundle in env.bundles:
+            writer.add_bundle(bundle)
+        writer.write('bundles.idx')
+    """
+
+    def __init__(self):
+        """
+        Initialize an ``IndexWriter`` instance.
+
+        :return: an ``IndexWriter`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        #: Attribute ``IndexWriter.sections`` (dict): The contents of each
+        #: section, as an ``array``.
+        self.sections = OrderedDict(
+            (name, array('B' if name in BYTE_SECTIONS else 'I',
+                         [0] if name in OFFSET_SECTIONS else []))
+            for name in SECTIONS)
+
+        self.__strings = {}
+
+    def add_string(self, string):
+        """
+        Add a string to the string table, unless it is already there.
+
+        :param string: (string or None) the string.
+        :return: (int) the position of the string in the table, or ``NULL``
+                 if ``string`` is ``None``.
+
+        .. versionadded:: 0.3.0
+        """
+        if string is None:
+            return NULL
+        if string not in self.__strings:
+            self.__strings[string] = len(self.__strings)
+            self.extend('string.data', string.encode('utf-8'))
+        return self.__strings[string]
+
+    def extend(self, name, values):
+        """
+        Add values to a section, updating its offsets section if any.
+
+        :param name: (string) the name of the section.
+        :param values: (iterable) the values.
+
+        .. versionadded:: 0.3.0
+        """
+        self.sections[name].extend(values)
+        offsets = {'string.data': 'string.offsets',
+                   'property.data': 'module.properties'}.get(name)
+        if offsets:
+            self.sections[offsets].append(len(self.sections[name]))
+
+    def add_row(self, offsets, name, values):
+        """
+        Add a row of values to a section that has an offsets section.
+
+        :param offsets: (string) the name of the offsets section.
+        :param name: (string) the name of the section of the values.
+        :param values: (iterable) the values.
+
+        .. versionadded:: 0.3.0
+        """
+        self.sections[name].extend(values)
+        self.sections[offsets].append(len(self.sections[name]))
+
+    def add_bundle(self, bundle):
+        """
+        Add a bundle and its modules.
+
+        :param bundle: (``Bundle``) the bundle.
+
+        .. versionadded:: 0.3.0
+        """
+        self.sections['bundle.name'].append(self.add_string(bundle.name))
+        self.sections['bundle.path'].append(self.add_string(bundle.path))
+        self.add_row('bundle.ocadeps', 'ocadep.values',
+                     [self.add_string(value)
+                      for dep in bundle.oca_dependencies
+                      for value in dep[:3]])
+        for module in bundle.modules:
+            self.add_module(module)
+        self.sections['bundle.modules'].append(
+            len(self.sections['module.slug']))
+
+    def add_module(self, module):
+        """
+        Add a module, its manifest and the records of its XML data files.
+
+        :param module: (``Module``) the module.
+
+        .. versionadded:: 0.3.0
+        """
+        properties = dict(vars(module.properties))
+        properties.pop('slug', None)
+        self.sections['module.slug'].append(self.add_string(module.slug))
+        self.sections['module.path'].append(self.add_string(module.path))
+        self.sections['module.manifest'].append(
+            self.add_string(module.manifest or None))
+        self.add_row('module.depends', 'depend.values',
+                     map(self.add_string, properties.get('depends', [])))
+        self.extend('property.data', marshal.dumps(properties))
+        for data, datafile in module.get_xml_datafiles():
+            self.add_datafile(module, data, datafile)
+        self.sections['module.datafiles'].append(
+            len(self.sections['datafile.name']))
+
+    def add_datafile(self, module, data, datafile):
+        """
+        Add an XML data file and its records.
+
+        Records are extracted by the module if needed, wherever it reads
+        its files from. Files that do not exist are added without records.
+
+        :param module: (``Module``) the module declaring the file.
+        :param data: (string) the path of the file, as declared.
+        :param datafile: (string) the absolute path of the file.
+
+        .. versionadded:: 0.3.0
+        """
+        records = ()
+        if module.has_file(datafile):
+            records = module.extract_records_fromfile(datafile)
+        self.sections['datafile.name'].append(self.add_string(data))
+        for xml_module, xml_id, model, noupdate, _, line in records:
+            self.sections['record.module'].append(self.add_string(xml_module))
+            self.sections['record.xml_id'].append(self.add_string(xml_id))
+            self.sections['record.model'].append(self.add_string(model))
+            self.sections['record.noupdate'].append(self.add_string(noupdate))
+            self.sections['record.line'].append(line or 0)
+        self.sections['datafile.records'].append(
+            len(self.sections['record.line']))
+
+    def write(self, path):
+        """
+        Write the index to a file.
+
+        :param path: (string) the path of the file. It is replaced
+                     atomically if it exists.
+
+        .. versionadded:: 0.3.0
+        """
+        offset = HEADER.size + SECTION.size * len(self.sections)
+        table, contents = [], []
+        for name, values in self.sections.items():
+            data = values.tobytes()
+            padding = b'\0' * (-len(data) % 8)
+            table.append(SECTION.pack(name.encode('ascii'), offset,
+                                      len(data)))
+            contents.extend((data, padding))
+            offset += len(data) + len(padding)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION,
+                                int(sys.byteorder == 'big'),
+                                len(self.sections)))
+            f.write(b''.join(table))
+            f.write(b''.join(contents))
+        os.replace(path + '.tmp', path)
+
+
+def write_index(path, bundles):
+    """
+    Write an index of some bundles.
+
+    :param path: (string) the path of the file.
+    :param bundles: (list) the ``Bundle`` instances.
+
+    .. versionadded:: 0.3.0
+    """
+    writer = IndexWriter()
+    for bundle in bundles:
+        writer.add_bundle(bundle)
+    writer.write(path)
+
+
+class Index(object):
+    """
+    This class represents an index file mapped in memory.
+
+    Sections are exposed as ``memoryview`` objects over the mapped file, so
+    nothing is read until it is accessed.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize an ``Index`` instance.
+
+        :param path: (string) the path of the index file.
+        :return: an ``Index`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        #: Attribute ``Index.path`` (string): The path of the index file.
+        self.path = os.path.abspath(path)
+
+        with open(self.path, 'rb') as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, byteorder, count = HEADER.unpack_from(self.__map)
+        assert magic == INDEX_MAGIC and version == INDEX_VERSION, \
+            '{0} is not a candyshop index (version {1}).'.format(
+                path, INDEX_VERSION)
+        assert byteorder == int(sys.byteorder == 'big'), \
+            '{0} was written on a machine with another byte order.'.format(
+                path)
+
+        #: Attribute ``Index.sections`` (dict): The contents of each
+        #: section, as a ``memoryview``.
+        self.sections = dict(self.__read_sections(count))
+
+        self.__strings = {}
+
+    def __read_sections(self, count):
+        """
+        Private method that maps the sections listed in the table.
+
+        .. versionadded:: 0.3.0
+        """
+        view = memoryview(self.__map)
+        for i in range(count):
+            name, offset, size = SECTION.unpack_from(
+                self.__map, HEADER.size + i * SECTION.size)
+            name = name.rstrip(b'\0').decode('ascii')
+            section = view[offset:offset + size]
+            yield name, (section if name in BYTE_SECTIONS
+                         else section.cast('I'))
+
+    def get_string(self, position):
+        """
+        Get a string of the string table.
+
+        :param position: (int) the position of the string, or ``NULL``.
+        :return: (string or None) the string.
+
+        .. versionadded:: 0.3.0
+        """
+        if position == NULL:
+            return None
+        if position not in self.__strings:
+            self.__strings[position] = str(
+                self.get_row('string.offsets', 'string.data', position),
+                'utf-8')
+        return self.__strings[position]
+
+    def get_row(self, offsets, name, row):
+        """
+        Get a row of values of a section that has an offsets section.
+
+        :param offsets: (string) the name of the offsets section.
+        :param name: (string) the name of the section of the values.
+        :param row: (int) the number of the row.
+        :return: (``memoryview``) the values.
+
+        .. versionadded:: 0.3.0
+        """
+        offsets = self.sections[offsets]
+        return self.sections[name][offsets[row]:offsets[row + 1]]
+
+    def get_strings(self, name, row=None, offsets=None):
+        """
+        Get strings referenced by a section.
+
+        :param name: (string) the name of the section.
+        :param row: (int) the number of the row to get, or ``None``
+                    (default) to get the whole section.
+        :param offsets: (string) the name of the offsets section, required
+                        if ``row`` is present.
+        :return: (list) the strings.
+
+        .. versionadded:: 0.3.0
+        """
+        values = self.sections[name] if row is None else \
+            self.get_row(offsets, name, row)
+        return [self.get_string(value) for value in values]
+
+    def get_bundles(self):
+        """
+        Get the bundles of the index.
+
+        :return: (list) an ``IndexedBundle`` instance for each bundle.
+
+        .. versionadded:: 0.3.0
+        """
+        return [IndexedBundle(self, row)
+                for row in range(len(self.sections['bundle.name']))]
+
+
+def read_index(path):
+    """
+    Read the bundles of an index.
+
+    :param path: (string) the path of the index file.
+    :return: (list) an ``IndexedBundle`` instance for each bundle.
+
+    .. versionadded:: 0.3.0
+    """
+    return Index(path).get_bundles()
+
+
+class IndexedBundle(Bundle):
+    """
+    This class represents a bundle read from an index.
+
+    It behaves as a ``Bundle`` whose directory is not read: its modules are
+    ``IndexedModule`` instances, and it is not updated when files change.
+    """
+
+    def __init__(self, index, row):
+        """
+        Initialize an ``IndexedBundle`` instance.
+
+        :param index: (``Index``) the index.
+        :param row: (int) the number of the bundle in the index.
+        :return: an ``IndexedBundle`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        sections = index.sections
+
+        super().__init__(index.get_string(sections['bundle.path'][row]),
+                         lazy=True, scan=False)
+
+        #: Attribute ``IndexedBundle.index`` (``Index``): The index.
+        self.index = index
+
+        self.name = index.get_string(sections['bundle.name'][row])
+        values = index.get_strings('ocadep.values', row, 'bundle.ocadeps')
+        self.oca_dependencies = [values[i:i + 3]
+                                 for i in range(0, len(values), 3)]
+        self.modules = [IndexedModule(index, position, self) for position in
+                        range(*sections['bundle.modules'][row:row + 2])]
+
+    def update(self, paths=None):
+        """
+        Ignore changes to files: indexed bundles are snapshots.
+
+        :return: (list) an empty list.
+
+        .. versionadded:: 0.3.0
+        """
+        return []
+
+
+class IndexedModule(Module):
+    """
+    This class represents a module read from an index.
+
+    It behaves as a ``Module`` whose files are not read: its manifest and
+    the records of its XML data files are read from the index.
+    """
+
+    def __init__(self, index, row, bundle=None):
+        """
+        Initialize an ``IndexedModule`` instance.
+
+        :param index: (``Index``) the index.
+        :param row: (int) the number of the module in the index.
+        :param bundle: (``IndexedBundle``) the bundle of the module.
+        :return: an ``IndexedModule`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        sections = index.sections
+
+        path = index.get_string(sections['module.path'][row])
+        super().__init__(path, bundle, ModuleEntry(
+            path, index.get_string(sections['module.manifest'][row]), True))
+
+        #: Attribute ``IndexedModule.index`` (``Index``): The index.
+        self.index = index
+
+        #: Attribute ``IndexedModule.row`` (int): The number of the module
+        #: in the index.
+        self.row = row
+
+        self.slug = index.get_string(sections['module.slug'][row])
+        self.__datafiles = None
+
+    def has_file(self, path):
+        """
+        Check if a file of the module is in the index.
+
+        XML data files are always in the index, even if they did not exist
+        when it was written (then they have no records). See
+        ``Module.has_file()``.
+
+        .. versionadded:: 0.3.0
+        """
+        return path in self.get_datafiles()
+
+    def _read_properties(self):
+        """
+        Decode the dictionary declared in the manifest from the index.
+
+        See ``Module._read_properties()``.
+
+        .. versionadded:: 0.3.0
+        """
+        return marshal.loads(self.index.get_row(
+            'module.properties', 'property.data', self.row))
+
+    def get_datafiles(self):
+        """
+        Get the XML data files stored in the index.
+
+        :return: (dict) a dictionary mapping the absolute path of each file
+                 to a tuple of ``(data, row)``, where ``data`` is the path as
+                 declared in the manifest and ``row`` is the number of the
+                 file in the index.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.__datafiles is None:
+            rows = range(*self.index.sections['module.datafiles'][
+                self.row:self.row + 2])
+            names = self.index.sections['datafile.name']
+            self.__datafiles = OrderedDict(
+                (os.path.join(self.path, self.index.get_string(names[row])),
+                 (self.index.get_string(names[row]), row))
+                for row in rows)
+        return self.__datafiles
+
+    def get_xml_datafiles(self):
+        """
+        Get the XML files declared in the ``data`` key of the manifest.
+
+        See ``Module.get_xml_datafiles()``.
+
+        .. versionadded:: 0.3.0
+        """
+        for datafile, (data, _) in self.get_datafiles().items():
+            yield data, datafile
+
+    def _read_records(self, xmlfile):
+        """
+        Decode the records of an XML data file from the index.
+
+        See ``Module._read_records()``.
+
+        .. versionadded:: 0.3.0
+        """
+        row = self.get_datafiles()[xmlfile][1]
+        start, end = self.index.sections['datafile.records'][row:row + 2]
+        columns = [self.index.sections[name][start:end] for name in (
+            'record.module', 'record.xml_id', 'record.model',
+            'record.noupdate')]
+        lines = self.index.sections['record.line'][start:end]
+        get_string = self.index.get_string
+        return tuple((get_string(module), get_string(xml_id),
+                      get_string(model), get_string(noupdate), xmlfile, line)
+                     for module, xml_id, model, noupdate, line
+                     in zip(*columns, lines))
+
+    def _lookup_records(self, xmlfile, key):
+        """
+        Decode the records of an XML data file: they are all in the index.
+
+        See ``Module._lookup_records()``.
+
+        .. versionadded:: 0.3.0
+        """
+        return True, self._read_records(xmlfile)
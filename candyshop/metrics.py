@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+``candyshop.metrics`` measures where candyshop spends its time.
+
+This module implements a collector of wall time and counters (files
+processed, their size in bytes, and cache hits and misses) grouped by
+phase: cloning, discovering modules, reading manifests, parsing XML files,
+extracting records and writing reports. It is disabled by default, and
+enabled by the ``--profile`` option of the command line, or like this::
+
+    METRICS.reset()
+    METRICS.enable()
+    env = Environment(init=False)
+    env.addbundles(['path/to/bundle'])
+    list(env.get_notmet_record_ids())
+    METRICS.write_text(sys.stderr)
+
+Phases can be nested; the time of a phase does not include the time of the
+phases that run inside it, so the times of all phases add up to the time
+measured.
+"""
+
+import os
+import json
+import time
+import threading
+from functools import wraps
+from collections import OrderedDict
+from contextlib import contextmanager
+
+#: The counters kept for each phase.
+COUNTERS = ('calls', 'seconds', 'files', 'bytes', 'hits', 'misses')
+
+
+class Metrics(object):
+    """
+    This class collects the time and counters of each phase.
+
+    Counters that are not given a phase are added to the innermost phase
+    running in the current thread. The time of phases that run in several
+    threads at once (like clones) is added, and may exceed the wall time.
+    Work done in worker processes is only measured as a whole, by the phase
+    that waits for it.
+    """
+
+    def __init__(self):
+        """
+        Initialize the ``Metrics`` instance.
+
+        :return: a ``Metrics`` instance, disabled.
+
+        .. versionadded:: 0.3.0
+        """
+        #: Attribute ``Metrics.enabled`` (boolean): True if phases and
+        #: counters are being collected. False otherwise.
+        self.enabled = False
+
+        #: Attribute ``Metrics.phases`` (``OrderedDict``): Maps the name of
+        #: each phase, in the order they first started, to a dictionary with
+        #: the counters in ``COUNTERS``.
+        self.phases = OrderedDict()
+
+        #: Attribute ``Metrics.started`` (float): The value of
+        #: ``time.perf_counter()`` when the collection was last reset.
+        self.started = time.perf_counter()
+
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+
+    def enable(self):
+        """
+        Start collecting phases and counters.
+
+        .. versionadded:: 0.3.0
+        """
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stop collecting phases and counters. Collected data is kept.
+
+        .. versionadded:: 0.3.0
+        """
+        self.enabled = False
+
+    def reset(self):
+        """
+        Discard the collected data and restart the total time.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            self.phases.clear()
+            self.started = time.perf_counter()
+
+    def __get_stack(self):
+        """
+        Private method to get the phases running in the current thread.
+
+        Each item is a ``[name, time of nested phases]`` list.
+
+        .. versionadded:: 0.3.0
+        """
+        if not hasattr(self.__local, 'stack'):
+            self.__local.stack = []
+        return self.__local.stack
+
+    def __add(self, name, counters):
+        """
+        Private method to add some counters to a phase.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            phase = self.phases.setdefault(
+                name, OrderedDict((counter, 0) for counter in COUNTERS))
+            for counter, value in counters.items():
+                phase[counter] += value
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Measure the code run inside a ``with`` block as a phase.
+
+        :param name: (string) the name of the phase.
+
+        .. versionadded:: 0.3.0
+        """
+        if not self.enabled:
+            yield
+            return
+        self.__add(name, {})
+        stack = self.__get_stack()
+        stack.append([name, 0.0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()[1]
+            if stack:
+                stack[-1][1] += elapsed
+            self.__add(name, {'calls': 1, 'seconds': elapsed - nested})
+
+    def count(self, phase=None, **counters):
+        """
+        Add some counters to a phase.
+
+        :param phase: (string) the name of the phase. If ``None`` (default),
+                      the innermost phase running in the current thread.
+                      Counters are discarded if there is no such phase.
+        :param counters: the values to add to the counters, like
+                         ``files=1``.
+
+        .. versionadded:: 0.3.0
+        """
+        if not self.enabled:
+            return
+        stack = self.__get_stack()
+        if phase is None and stack:
+            phase = stack[-1][0]
+        if phase is not None:
+            self.__add(phase, counters)
+
+    def count_path(self, path, phase=None):
+        """
+        Count a file, or the files below a directory, as processed by a phase.
+
+        :param path: (string) the path of the file or directory.
+        :param phase: (string) the name of the phase. See ``count()``.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.enabled:
+            files, size = get_path_stats(path)
+            self.count(phase, files=files, bytes=size)
+
+    def get_stats(self):
+        """
+        Get the collected data.
+
+        :return: (dict) a dictionary with the ``total`` time in seconds since
+                 the last reset, and the counters of each phase in
+                 ``phases``.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            return {'total': time.perf_counter() - self.started,
+                    'phases': OrderedDict((name, dict(phase)) for name, phase
+                                          in self.phases.items())}
+
+    def write_text(self, stream):
+        """
+        Write a table with the collected data.
+
+        :param stream: a file-like object.
+
+        .. versionadded:: 0.3.0
+        """
+        stats = self.get_stats()
+        row = '{0:<12} {1:>8} {2:>10} {3:>6} {4:>8} {5:>12} {6:>8} {7:>8}\n'
+        stream.write(row.format('phase', 'calls', 'seconds', '%', 'files',
+                                'bytes', 'hits', 'misses'))
+        for name, phase in stats['phases'].items():
+            share = phase['seconds'] / stats['total'] if stats['total'] else 0
+            stream.write(row.format(
+                name, phase['calls'], '{0:.3f}'.format(phase['seconds']),
+                '{0:.1f}'.format(share * 100), phase['files'],
+                phase['bytes'], phase['hits'], phase['misses']))
+        stream.write('Total: {0:.3f} seconds.\n'.format(stats['total']))
+
+    def write_json(self, stream):
+        """
+        Write the collected data as JSON (see ``get_stats()``).
+
+        :param stream: a file-like object.
+
+        .. versionadded:: 0.3.0
+        """
+        json.dump(self.get_stats(), stream, indent=2)
+        stream.write('\n')
+
+
+def get_path_stats(path):
+    """
+    Get the number of files below a path and the sum of their sizes.
+
+    :param path: (string) the path of a file or directory. Symlinks below
+                 a directory are ignored.
+    :return: (tuple) a ``(files, bytes)`` tuple.
+
+    .. versionadded:: 0.3.0
+    """
+    if not os.path.isdir(path):
+        return 1, os.path.getsize(path)
+    files, size = 0, 0
+    for directory, _, filenames in os.walk(path):
+        for filename in filenames:
+            filepath = os.path.join(directory, filename)
+            if not os.path.islink(filepath):
+                files, size = files + 1, size + os.path.getsize(filepath)
+    return files, size
+
+
+#: The collector used by candyshop.
+METRICS = Metrics()
+
+
+def timed(name):
+    """
+    Decorate a function to measure its calls as a phase of ``METRICS``.
+
+    :param name: (string) the name of the phase.
+    :return: (function) the decorator.
+
+    .. versionadded:: 0.3.0
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with METRICS.phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
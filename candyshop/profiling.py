@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+``candyshop.profiling`` records profiles of candyshop runs.
+
+This module implements a hook that profiles the most expensive operations
+of an ``Environment`` (``addbundles()``, ``get_notmet_dependencies()`` and
+``get_notmet_record_ids()``) and writes a file for each call, without
+changing the code that uses them. It is enabled with an environment
+variable pointing to the directory where the files are written::
+
+    CANDYSHOP_PROFILE=profiles candyshop check path/to/bundle
+
+The deterministic profiler of the standard library (``cProfile``) is used
+by default, and writes ``.prof`` files that can be read with ``pstats`` or
+tools like snakeviz. If the optional pyinstrument_ package is installed,
+``CANDYSHOP_PROFILER=pyinstrument`` selects its sampling profiler, which
+writes ``.speedscope.json`` files that can be opened in speedscope_.
+
+Any other block of code can be profiled with ``Profile``::
+
+    with Profile('check.prof'):
+        env.addbundles(['path/to/bundle'])
+        env.get_notmet_dependencies_report()
+
+Calls made inside a profiled block are not profiled again.
+
+.. _pyinstrument: https://pypi.org/project/pyinstrument/
+.. _speedscope: https://www.speedscope.app/
+"""
+
+import os
+import time
+import cProfile
+import itertools
+import threading
+from functools import wraps
+from inspect import isgeneratorfunction
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:
+    Profiler = None
+
+#: The environment variable with the directory where profiles are written.
+PROFILE_VARIABLE = 'CANDYSHOP_PROFILE'
+
+#: The environment variable with the name of the profiler to use.
+PROFILER_VARIABLE = 'CANDYSHOP_PROFILER'
+
+#: The available profilers, and the extensions of the files they write.
+PROFILERS = {'cprofile': '.prof', 'pyinstrument': '.speedscope.json'}
+
+_local = threading.local()
+_counter = itertools.count()
+
+
+class Profile(object):
+    """
+    This class represents a profile of some code, written to a file.
+
+    It can be used as a context manager, or started and stopped several
+    times (the time in between is not profiled) and then written with
+    ``Profile.dump()``.
+    """
+
+    def __init__(self, path, profiler='cprofile'):
+        """
+        Initialize a ``Profile`` instance.
+
+        :param path: (string) the file where the profile will be written.
+        :param profiler: (string) ``cprofile`` (default) for the
+                         deterministic profiler of the standard library, or
+                         ``pyinstrument`` for the sampling profiler of the
+                         pyinstrument package.
+        :return: a ``Profile`` instance, stopped.
+
+        .. versionadded:: 0.3.0
+        """
+        assert profiler in PROFILERS, \
+            'Unknown profiler {0}.'.format(profiler)
+        assert profiler != 'pyinstrument' or Profiler is not None, \
+            'The pyinstrument package is required to use its profiler.'
+
+        #: Attribute ``Profile.path`` (string): The absolute path of the
+        #: file where the profile will be written.
+        self.path = os.path.abspath(path)
+
+        #: Attribute ``Profile.profiler`` (string): The name of the
+        #: profiler, a key of ``PROFILERS``.
+        self.profiler = profiler
+
+        if profiler == 'pyinstrument':
+            self.__profiler = Profiler()
+        else:
+            self.__profiler = cProfile.Profile()
+
+    def __enter__(self):
+        """
+        Start the profile.
+
+        .. versionadded:: 0.3.0
+        """
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Stop the profile and write it.
+
+        .. versionadded:: 0.3.0
+        """
+        self.stop()
+        self.dump()
+
+    def start(self):
+        """
+        Start (or resume) profiling the current thread.
+
+        .. versionadded:: 0.3.0
+        """
+        assert not is_profiling(), \
+            'Another profile is running in this thread.'
+        _local.profile = self
+        if self.profiler == 'pyinstrument':
+            self.__profiler.start()
+        else:
+            self.__profiler.enable()
+
+    def stop(self):
+        """
+        Stop profiling the current thread.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.profiler == 'pyinstrument':
+            self.__profiler.stop()
+        else:
+            self.__profiler.disable()
+        _local.profile = None
+
+    def dump(self):
+        """
+        Write the profile to ``Profile.path``.
+
+        .. versionadded:: 0.3.0
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if self.profiler == 'cprofile':
+            self.__profiler.dump_stats(self.path)
+            return
+        with open(self.path, 'w') as f:
+            f.write(self.__profiler.output(SpeedscopeRenderer()))
+
+
+def is_profiling():
+    """
+    Tell if a ``Profile`` is running in the current thread.
+
+    .. versionadded:: 0.3.0
+    """
+    return getattr(_local, 'profile', None) is not None
+
+
+def get_profile_path(directory, name, profiler='cprofile'):
+    """
+    Build a unique path for the profile of a call.
+
+    :param directory: (string) the directory of the file.
+    :param name: (string) the name of the profiled function.
+    :param profiler: (string) the name of the profiler, see ``PROFILERS``.
+    :return: (string) the path, which contains the name, the date, the
+             process id and a counter.
+
+    .. versionadded:: 0.3.0
+    """
+    assert profiler in PROFILERS, \
+        'Unknown profiler {0}.'.format(profiler)
+    return os.path.join(directory, 'candyshop-{0}-{1}-{2}-{3}{4}'.format(
+        name, time.strftime('%Y%m%d%H%M%S'), os.getpid(), next(_counter),
+        PROFILERS[profiler]))
+
+
+def get_profile(name):
+    """
+    Create a ``Profile`` for a call, as configured by the environment.
+
+    :param name: (string) the name of the profiled function.
+    :return: a ``Profile`` instance, or ``None`` if the ``CANDYSHOP_PROFILE``
+             variable is not set or a profile is already running.
+
+    .. versionadded:: 0.3.0
+    """
+    directory = os.environ.get(PROFILE_VARIABLE)
+    if not directory or is_profiling():
+        return None
+    profiler = os.environ.get(PROFILER_VARIABLE) or 'cprofile'
+    return Profile(get_profile_path(directory, name, profiler), profiler)
+
+
+def iter_profiled(profile, iterator):
+    """
+    Profile the production of the items of an iterator.
+
+    The code that consumes the items is not profiled. The profile is
+    written when the iterator is exhausted or discarded.
+
+    :param profile: a ``Profile`` instance.
+    :param iterator: the iterator.
+    :return: (generator) a generator that produces the same items.
+
+    .. versionadded:: 0.3.0
+    """
+    try:
+        while True:
+            profile.start()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                profile.stop()
+            yield item
+    finally:
+        profile.dump()
+
+
+def profiled(function):
+    """
+    Decorate a function to profile its calls when enabled by the environment.
+
+    If the ``CANDYSHOP_PROFILE`` variable is set, each call is profiled (see
+    ``get_profile()``). For generator functions, the production of the
+    items is profiled.
+
+    :param function: the function.
+    :return: (function) the decorated function.
+
+    .. versionadded:: 0.3.0
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        profile = get_profile(function.__name__)
+        if profile is None:
+            return function(*args, **kwargs)
+        if isgeneratorfunction(function):
+            return iter_profiled(profile, function(*args, **kwargs))
+        with profile:
+            return function(*args, **kwargs)
+    return wrapper
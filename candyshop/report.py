@@ -0,0 +1,516 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+``candyshop.report`` is a module for writing reports of problems.
+
+This module implements report writers that consume the results of the
+checks of an environment as they are produced, writing (and flushing) each
+problem as soon as it is found, followed by a summary. For example::
+
+    report = SARIFReport(open('candyshop.sarif', 'w'))
+    status = report.write([
+        ('dependencies', iter_problems('dependencies',
+                                       env.get_notmet_dependencies())),
+    ])
+"""
+
+import sys
+import json
+from xml.sax.saxutils import escape, quoteattr
+
+from . import __url__, __version__
+from .metrics import timed
+
+#: The checks that can be reported, and the texts used to report them.
+CHECKS = {
+    'dependencies': {
+        'key': 'module',
+        'header': ('The following module dependencies are not found'
+                   ' in the environment:'),
+        'success': 'All dependencies are satisfied in the environment.',
+        'label': '    Module: {0}',
+        'missing': '    Missing dependencies:',
+        'summary': '{0} modules with missing dependencies',
+        'rule': 'missing-dependency',
+        'description': 'Module dependencies not found in the environment.',
+        'message': 'Module {module} depends on modules that are not found'
+                   ' in the environment: {missing}.',
+        'location': '{module}/__manifest__.py',
+    },
+    'records': {
+        'key': 'file',
+        'header': ('The following record ids are not found'
+                   ' in the environment:'),
+        'success': 'All references are present in the environment.',
+        'label': '    XML file: {0}',
+        'missing': '    Missing references:',
+        'summary': '{0} XML files with missing references',
+        'rule': 'missing-reference',
+        'description': 'Record ids of modules not found in the environment.',
+        'message': 'The XML file {file} references records of modules that'
+                   ' are not found in the environment: {missing}.',
+        'location': '{file}',
+    },
+}
+
+SARIF_SCHEMA = ('https://raw.githubusercontent.com/oasis-tcs/sarif-spec/'
+                'master/Schemata/sarif-schema-2.1.0.json')
+
+
+def iter_problems(check, results):
+    """
+    Flatten the results of a check of an environment.
+
+    :param check: (string) the name of the check, a key of ``CHECKS``.
+    :param results: (iterable) the results of the check, as produced by
+                    ``Environment.get_notmet_dependencies()`` or
+                    ``Environment.get_notmet_record_ids()``.
+    :return: (generator) a generator that produces a dictionary for each
+             problem found.
+
+    >>> list(iter_problems('dependencies', [{'addons': {'sale': ['stock']}}]))
+    [{'check': 'dependencies', 'bundle': 'addons', 'module': 'sale', \
+'missing': ['stock']}]
+
+    .. versionadded:: 0.3.0
+    """
+    key = CHECKS[check]['key']
+    for result in results:
+        for bundle, data in result.items():
+            for name, missing in data.items():
+                yield {'check': check, 'bundle': bundle, key: name,
+                       'missing': missing}
+
+
+def get_checks(env, checks=None, workers=None):
+    """
+    Get the problems found by some checks of an environment.
+
+    :param env: (``Environment``) the environment.
+    :param checks: (list) names of checks, keys of ``CHECKS``. Default: all.
+    :param workers: (int) the number of processes used to parse XML files.
+                    See ``Environment.get_notmet_record_ids()``.
+    :return: (list) a list of ``(check, problems)`` pairs, where
+             ``problems`` is a generator of the problems found by the
+             check, evaluated as it is consumed.
+
+    .. versionadded:: 0.3.0
+    """
+    results = {
+        'dependencies': env.get_notmet_dependencies,
+        'records': lambda: env.get_notmet_record_ids(workers),
+    }
+    return [(check, iter_problems(check, results[check]()))
+            for check in CHECKS if check in (checks or CHECKS)]
+
+
+def get_state(env, checks=None, workers=None):
+    """
+    Get the results of some checks of an environment as a set.
+
+    :param env: (``Environment``) the environment.
+    :param checks: (list) names of checks, keys of ``CHECKS``. Default: all.
+    :param workers: (int) the number of processes used to parse XML files.
+    :return: (set) a ``(check, bundle, name, dependency)`` tuple for each
+             missing dependency, where ``name`` is the name of a module or
+             the path of an XML file.
+
+    .. versionadded:: 0.3.0
+    """
+    return {(check, p['bundle'], p[CHECKS[check]['key']], dep)
+            for check, problems in get_checks(env, checks, workers)
+            for p in problems for dep in p['missing']}
+
+
+def get_message(problem):
+    """
+    Get a sentence describing a problem.
+
+    :param problem: (dict) a problem, as produced by ``iter_problems()``.
+    :return: (string) the sentence.
+
+    >>> get_message({'check': 'dependencies', 'bundle': 'addons',
+    ...              'module': 'sale', 'missing': ['stock', 'account']})
+    'Module sale depends on modules that are not found in the environment: \
+stock, account.'
+
+    .. versionadded:: 0.3.0
+    """
+    return CHECKS[problem['check']]['message'].format(
+        **dict(problem, missing=', '.join(problem['missing'])))
+
+
+class Report(object):
+    """
+    This class is the base of report writers.
+
+    Subclasses write the report by overriding the ``start()``,
+    ``start_check()``, ``add()``, ``end_check()`` and ``end()`` methods,
+    which are called by ``write()`` in that order. The stream is flushed
+    after each problem is added.
+    """
+
+    def __init__(self, stream=None, summary=True):
+        """
+        Initialize a ``Report`` instance.
+
+        :param stream: (file) the stream where the report is written.
+                       Default: the standard output at the time the report
+                       is written.
+        :param summary: (boolean) if ``True`` (default), the report ends
+                        with the number of problems found by each check.
+        :return: a ``Report`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        #: Attribute ``Report.stream`` (file): The stream where the report
+        #: is written, or ``None`` to use the standard output.
+        self.stream = stream
+
+        #: Attribute ``Report.summary`` (boolean): True if the report ends
+        #: with a summary. False otherwise.
+        self.summary = summary
+
+        #: Attribute ``Report.counts`` (dict): The number of problems
+        #: written for each check.
+        self.counts = {}
+
+    @property
+    def status(self):
+        """
+        Get the exit status corresponding to the problems written.
+
+        :return: (int) 1 if problems were written, 0 otherwise.
+
+        .. versionadded:: 0.3.0
+        """
+        return 1 if any(self.counts.values()) else 0
+
+    @timed('reports')
+    def write(self, checks):
+        """
+        Write a report.
+
+        It is measured as the ``reports`` phase of
+        ``candyshop.metrics.METRICS``, which includes the time spent by the
+        checks, as they are evaluated while the report is written, except
+        for the phases that run inside them (like ``records``).
+
+        :param checks: (iterable) ``(check, problems)`` pairs, where
+                       ``check`` is a key of ``CHECKS`` and ``problems`` an
+                       iterable of problems, as produced by
+                       ``iter_problems()``. Problems are written as they are
+                       produced.
+        :return: (int) the exit status, see ``Report.status``.
+
+        .. versionadded:: 0.3.0
+        """
+        stream = self.stream or sys.stdout
+        self.counts = {}
+        self.start(stream)
+        for check, problems in checks:
+            self.counts[check] = 0
+            self.start_check(stream, check)
+            for problem in problems:
+                self.add(stream, problem, self.counts[check])
+                self.counts[check] += 1
+                stream.flush()
+            self.end_check(stream, check, self.counts[check])
+        self.end(stream)
+        stream.flush()
+        return self.status
+
+    def get_summary(self):
+        """
+        Get a sentence with the number of problems found by each check.
+
+        :return: (string) the sentence.
+
+        .. versionadded:: 0.3.0
+        """
+        return 'Summary: {0}.'.format(', '.join(
+            CHECKS[check]['summary'].format(count)
+            for check, count in self.counts.items()))
+
+    def start(self, stream):
+        """
+        Write the beginning of the report.
+
+        .. versionadded:: 0.3.0
+        """
+
+    def start_check(self, stream, check):
+        """
+        Write the beginning of the problems found by a check.
+
+        .. versionadded:: 0.3.0
+        """
+
+    def add(self, stream, problem, index):
+        """
+        Write a problem.
+
+        :param stream: (file) the stream where the report is written.
+        :param problem: (dict) the problem, see ``iter_problems()``.
+        :param index: (int) the number of problems of the same check
+                      written before this one.
+
+        .. versionadded:: 0.3.0
+        """
+        raise NotImplementedError
+
+    def end_check(self, stream, check, count):
+        """
+        Write the end of the problems found by a check.
+
+        .. versionadded:: 0.3.0
+        """
+
+    def end(self, stream):
+        """
+        Write the end of the report.
+
+        .. versionadded:: 0.3.0
+        """
+
+
+class TextReport(Report):
+    """
+    This class writes reports as human readable text.
+
+    Without a summary, the output is the one of the
+    ``Environment.get_notmet_*_report()`` methods.
+    """
+
+    def add(self, stream, problem, index):
+        """
+        Write a problem as a block of lines, preceded by the header.
+
+        .. versionadded:: 0.3.0
+        """
+        texts = CHECKS[problem['check']]
+        key = problem[texts['key']]
+        lines = [texts['header']] if not index else []
+        lines += ['', '    Bundle: {0}'.format(problem['bundle']),
+                  texts['label'].format(key), texts['missing']]
+        lines += ['        - {0}'.format(dep) for dep in problem['missing']]
+        stream.write('\n'.join(lines) + '\n')
+
+    def end_check(self, stream, check, count):
+        """
+        Write a blank line, or a message if no problems were found.
+
+        .. versionadded:: 0.3.0
+        """
+        stream.write('\n' if count else CHECKS[check]['success'] + '\n')
+
+    def end(self, stream):
+        """
+        Write the summary.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.summary:
+            stream.write(self.get_summary() + '\n')
+
+
+class JSONReport(Report):
+    """
+    This class writes reports as a JSON array of problems.
+
+    The array is written one problem per line. The summary is not written,
+    as it can be computed from the array.
+    """
+
+    def start(self, stream):
+        """
+        Write the beginning of the array.
+
+        .. versionadded:: 0.3.0
+        """
+        stream.write('[')
+
+    def add(self, stream, problem, index):
+        """
+        Write a problem as an element of the array.
+
+        .. versionadded:: 0.3.0
+        """
+        first = not any(self.counts.values())
+        stream.write(('\n' if first else ',\n') + json.dumps(problem))
+
+    def end(self, stream):
+        """
+        Write the end of the array.
+
+        .. versionadded:: 0.3.0
+        """
+        stream.write('\n]\n' if self.status else ']\n')
+
+
+class JSONLinesReport(Report):
+    """
+    This class writes reports as JSON objects, one per line.
+
+    Each problem is written as an object with a ``check`` key. The summary
+    is written as a last object with a ``summary`` key, mapping each check
+    to the number of problems it found.
+    """
+
+    def add(self, stream, problem, index):
+        """
+        Write a problem as a line.
+
+        .. versionadded:: 0.3.0
+        """
+        stream.write(json.dumps(problem) + '\n')
+
+    def end(self, stream):
+        """
+        Write the summary as a line.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.summary:
+            stream.write(json.dumps({'summary': self.counts}) + '\n')
+
+
+class JUnitReport(Report):
+    """
+    This class writes reports as JUnit XML.
+
+    Each check is a test suite and each problem is a failed test case. A
+    check without problems is reported as a single passed test case. The
+    summary of each check is written as the output of its test suite.
+    """
+
+    def start(self, stream):
+        """
+        Write the XML declaration and the root element.
+
+        .. versionadded:: 0.3.0
+        """
+        stream.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                     '<testsuites name="candyshop">\n')
+
+    def start_check(self, stream, check):
+        """
+        Write the beginning of a test suite.
+
+        .. versionadded:: 0.3.0
+        """
+        stream.write('  <testsuite name={0}>\n'.format(quoteattr(check)))
+
+    def add(self, stream, problem, index):
+        """
+        Write a problem as a failed test case.
+
+        .. versionadded:: 0.3.0
+        """
+        key = CHECKS[problem['check']]['key']
+        stream.write(
+            '    <testcase classname={0} name={1}>\n'
+            '      <failure type={2} message={3}>{4}</failure>\n'
+            '    </testcase>\n'.format(
+                quoteattr(problem['bundle']), quoteattr(problem[key]),
+                quoteattr(CHECKS[problem['check']]['rule']),
+                quoteattr(get_message(problem)),
+                escape('\n'.join(problem['missing']))))
+
+    def end_check(self, stream, check, count):
+        """
+        Write the end of a test suite.
+
+        .. versionadded:: 0.3.0
+        """
+        if not count:
+            stream.write('    <testcase classname="candyshop" name={0}/>\n'
+                         .format(quoteattr(check)))
+        if self.summary:
+            stream.write('    <system-out>{0}</system-out>\n'.format(
+                escape(CHECKS[check]['summary'].format(count))))
+        stream.write('  </testsuite>\n')
+
+    def end(self, stream):
+        """
+        Write the end of the root element.
+
+        .. versionadded:: 0.3.0
+        """
+        stream.write('</testsuites>\n')
+
+
+class SARIFReport(Report):
+    """
+    This class writes reports as SARIF 2.1.0 logs.
+
+    The log contains a single run, whose results are the problems. Their
+    locations are relative to the bundle containing them, which is used as
+    the base URI id. The summary is written as a property bag of the run.
+    """
+
+    def start(self, stream):
+        """
+        Write the beginning of the log, up to the results of the run.
+
+        .. versionadded:: 0.3.0
+        """
+        rules = [{'id': texts['rule'],
+                  'shortDescription': {'text': texts['description']}}
+                 for texts in CHECKS.values()]
+        driver = {'name': 'candyshop', 'version': __version__,
+                  'informationUri': __url__, 'rules': rules}
+        stream.write('{{"version": "2.1.0", "$schema": {0}, "runs": [{{'
+                     '"tool": {{"driver": {1}}}, "results": ['.format(
+                         json.dumps(SARIF_SCHEMA), json.dumps(driver)))
+
+    def add(self, stream, problem, index):
+        """
+        Write a problem as a result of the run.
+
+        .. versionadded:: 0.3.0
+        """
+        texts = CHECKS[problem['check']]
+        location = {'artifactLocation': {
+            'uri': texts['location'].format(**problem),
+            'uriBaseId': problem['bundle']}}
+        result = {'ruleId': texts['rule'], 'level': 'error',
+                  'message': {'text': get_message(problem)},
+                  'locations': [{'physicalLocation': location}]}
+        first = not any(self.counts.values())
+        stream.write(('\n' if first else ',\n') + json.dumps(result))
+
+    def end(self, stream):
+        """
+        Write the end of the log, including the summary.
+
+        .. versionadded:: 0.3.0
+        """
+        properties = {'summary': self.counts} if self.summary else {}
+        stream.write('], "properties": {0}}}]}}\n'.format(
+            json.dumps(properties)))
+
+
+#: The report writers, by format name.
+REPORTS = {
+    'text': TextReport,
+    'json': JSONReport,
+    'ndjson': JSONLinesReport,
+    'junit': JUnitReport,
+    'sarif': SARIFReport,
+}
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+``candyshop.server`` is a module for serving an environment.
+
+This module implements an HTTP server that keeps an ``Environment`` in
+memory, refreshes it when the files of its bundles change (see
+``candyshop.watch``) and answers queries about it, over TCP or a Unix
+socket::
+
+    curl --unix-socket candyshop.sock 'http://localhost/check?format=ndjson'
+    curl 'http://localhost:8765/impact?module=mail'
+
+The following requests are supported:
+
+``GET /check``
+    Write a report of the problems found in the environment. Parameters:
+    ``check`` (can be repeated), ``format`` (default: ``ndjson``),
+    ``workers`` and ``summary`` (``0`` to leave the summary out).
+
+``GET /impact``
+    Return the modules impacted by changes as a JSON object. Parameters:
+    ``module`` and ``path`` (both can be repeated).
+
+``GET /status``
+    Return the bundles and the number of modules of the environment as a
+    JSON object.
+
+Before answering a request, the changes to the files of the bundles are
+collected and the environment is refreshed if needed.
+"""
+
+import os
+import io
+import sys
+import json
+import threading
+import socketserver
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import __version__
+from .report import CHECKS, REPORTS, get_checks
+from .watch import DEFAULT_INTERVAL, get_watcher
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+CONTENT_TYPES = {
+    'text': 'text/plain; charset=utf-8',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'junit': 'application/xml',
+    'sarif': 'application/sarif+json',
+}
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn,
+                     socketserver.UnixStreamServer):
+    """This class represents an HTTP server listening on a Unix socket."""
+
+    daemon_threads = True
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """This class handles the requests made to an ``EnvironmentServer``."""
+
+    server_version = 'candyshop/{0}'.format(__version__)
+
+    def do_GET(self):
+        """
+        Answer a ``GET`` request.
+
+        .. versionadded:: 0.3.0
+        """
+        url = urlsplit(self.path)
+        routes = {'/check': self.send_check, '/impact': self.send_impact,
+                  '/status': self.send_status}
+        if url.path not in routes:
+            self.send_error(404)
+            return
+        try:
+            routes[url.path](parse_qs(url.query))
+        except ValueError as e:
+            self.send_error(400, str(e))
+
+    def send_check(self, query):
+        """
+        Write a report of the problems found in the environment.
+
+        :raise ValueError: if the parameters are not valid.
+
+        .. versionadded:: 0.3.0
+        """
+        checks = query.get('check')
+        report = query.get('format', ['ndjson'])[-1]
+        workers = int(query.get('workers', [0])[-1]) or None
+        summary = query.get('summary', ['1'])[-1] != '0'
+        if report not in REPORTS or not set(checks or []) <= set(CHECKS):
+            raise ValueError('Unknown format or check.')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPES[report])
+        self.end_headers()
+        stream = io.TextIOWrapper(self.wfile, encoding='utf-8',
+                                  write_through=True)
+        try:
+            self.server.candyshop.check(stream, checks, report, workers,
+                                        summary)
+        finally:
+            stream.detach()
+
+    def send_impact(self, query):
+        """
+        Send the modules impacted by changes.
+
+        .. versionadded:: 0.3.0
+        """
+        self.send_json({'modules': self.server.candyshop.impact(
+            query.get('module'), query.get('path'))})
+
+    def send_status(self, query):
+        """
+        Send the bundles and the number of modules of the environment.
+
+        .. versionadded:: 0.3.0
+        """
+        self.send_json(self.server.candyshop.get_status())
+
+    def send_json(self, data):
+        """
+        Send a JSON object.
+
+        .. versionadded:: 0.3.0
+        """
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        """
+        Get the address of the client, for logging purposes.
+
+        .. versionadded:: 0.3.0
+        """
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        """
+        Log a request to the standard error, unless the server is quiet.
+
+        .. versionadded:: 0.3.0
+        """
+        if self.server.candyshop.verbose:
+            super().log_message(format, *args)
+
+
+class EnvironmentServer(object):
+    """
+    This class represents a server that keeps an environment in memory.
+
+    For example::
+
+        server = EnvironmentServer(env, ['path/to/bundle'])
+        server.bind('candyshop.sock')
+        server.serve()
+    """
+
+    def __init__(self, env, paths, interval=DEFAULT_INTERVAL, verbose=True,
+                 backend='auto'):
+        """
+        Initialize an ``EnvironmentServer`` instance.
+
+        :param env: (``Environment``) the environment, with its bundles.
+        :param paths: (list) paths of the bundles that will be watched for
+                      changes.
+        :param interval: (float) the number of seconds between polls of the
+                         bundles when no requests are made.
+        :param verbose: (boolean) if ``True`` (default), requests and
+                        refreshes are logged to the standard error.
+        :param backend: (string) the watcher backend, see
+                        ``candyshop.watch.get_watcher()``.
+        :return: an ``EnvironmentServer`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        #: Attribute ``EnvironmentServer.env`` (``Environment``): The
+        #: environment that is served.
+        self.env = env
+
+        #: Attribute ``EnvironmentServer.watcher``: The watcher of the
+        #: bundles, see ``candyshop.watch.get_watcher()``.
+        self.watcher = get_watcher(paths, interval, backend)
+
+        #: Attribute ``EnvironmentServer.verbose`` (boolean): True if
+        #: requests and refreshes are logged. False otherwise.
+        self.verbose = verbose
+
+        #: Attribute ``EnvironmentServer.httpd`` (``socketserver.BaseServer``
+        #: or None): The underlying server, created by ``bind()``.
+        self.httpd = None
+
+        self.__lock = threading.RLock()
+        self.__stopped = threading.Event()
+
+    def bind(self, address):
+        """
+        Create the underlying server.
+
+        :param address: a ``(host, port)`` tuple to listen on TCP, or a
+                        string with the path of a Unix socket. An existing
+                        socket file is replaced.
+        :return: the address of the server.
+
+        .. versionadded:: 0.3.0
+        """
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.remove(address)
+            self.httpd = UnixHTTPServer(address, RequestHandler)
+        else:
+            self.httpd = ThreadingHTTPServer(address, RequestHandler)
+        self.httpd.candyshop = self
+        return self.httpd.server_address
+
+    def serve(self):
+        """
+        Answer requests until ``shutdown()`` is called.
+
+        The bundles are polled in a background thread meanwhile.
+
+        .. versionadded:: 0.3.0
+        """
+        watcher = threading.Thread(target=self.__watch, daemon=True)
+        watcher.start()
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.__stopped.set()
+            self.watcher.stop()
+            self.httpd.server_close()
+            if isinstance(self.httpd.server_address, str):
+                os.remove(self.httpd.server_address)
+
+    def __watch(self):
+        """
+        Private method that refreshes the environment periodically.
+
+        .. versionadded:: 0.3.0
+        """
+        while not self.__stopped.wait(self.watcher.interval):
+            self.refresh()
+
+    def shutdown(self):
+        """
+        Stop answering requests. Must be called from another thread.
+
+        .. versionadded:: 0.3.0
+        """
+        self.httpd.shutdown()
+
+    def refresh(self, changes=None):
+        """
+        Refresh the environment after files changed.
+
+        Changes are polled and applied while holding the lock of the
+        environment, so that no request is answered in between.
+
+        :param changes: (list) the paths of the changed files. Default: the
+                        files changed since the previous poll.
+        :return: (list) the paths of the changed files.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            changes = self.watcher.poll() if changes is None else changes
+            if changes:
+                self.env.refresh(changes)
+        if changes and self.verbose:
+            sys.stderr.write('Refreshed {0} changed files.\n'.format(
+                len(changes)))
+        return changes
+
+    def check(self, stream, checks=None, report='ndjson', workers=None,
+              summary=True):
+        """
+        Write a report of the problems found in the environment.
+
+        :param stream: (file) the stream where the report is written.
+        :param checks: (list) names of checks. Default: all.
+        :param report: (string) the report format, a key of ``REPORTS``.
+        :param workers: (int) the number of processes used to parse XML
+                        files.
+        :param summary: (boolean) if ``True``, the report ends with a
+                        summary.
+        :return: (int) 1 if problems were found, 0 otherwise.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            self.refresh()
+            return REPORTS[report](stream, summary).write(
+                get_checks(self.env, checks, workers))
+
+    def impact(self, slugs=None, paths=None):
+        """
+        Get the modules impacted by changes.
+
+        See ``Environment.get_impacted_modules()``.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            self.refresh()
+            return self.env.get_impacted_modules(slugs, paths)
+
+    def get_status(self):
+        """
+        Get the bundles and the number of modules of the environment.
+
+        :return: (dict) the paths of the bundles (``bundles``) and the
+                 number of modules (``modules``).
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            self.refresh()
+            return {'bundles': list(self.env.get_bundle_path_list()),
+                    'modules': len(self.env.modules_index)}
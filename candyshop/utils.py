@@ -25,6 +25,42 @@ other modules.
 import os
 import re
 import fnmatch
+from collections import namedtuple
+
+#: A module root found by ``scan_modules()``. ``path`` is the absolute path
+#: of the module directory, ``manifest`` the absolute path of its manifest
+#: file and ``is_package`` tells if the directory has an ``__init__.py``.
+ModuleEntry = namedtuple('ModuleEntry', ['path', 'manifest', 'is_package'])
+
+
+class RecordRef(namedtuple('RecordRef', ['module', 'xml_id', 'noupdate',
+                                         'model', 'sourceline'])):
+    """
+    This class represents a reference to a record of an Odoo XML file.
+
+    It is an immutable tuple of ``(module, xml_id, noupdate, model,
+    sourceline)``. Its string form is the one historically returned by
+    ``Module.get_record_ids_fromfile()``.
+
+    For example:
+
+    >>> ref = RecordRef('base', 'main_company', '0', 'res.company', 3)
+    >>> ref.module
+    'base'
+    >>> str(ref)
+    'base.main_company.noupdate=0'
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        """
+        Format the reference as ``[MODULE].[ID].noupdate=[NOUPDATE]``.
+
+        .. versionadded:: 0.3.0
+        """
+        return '{0}.{1}.noupdate={2}'.format(self.module, self.xml_id,
+                                             self.noupdate)
 
 
 class ModuleProperties(object):
@@ -109,6 +145,30 @@ def get_path(path=None):
         os.path.abspath(os.path.join(*path))))
 
 
+def is_subpath(path, directory):
+    """
+    Determine if a path is a directory or is located inside it.
+
+    Both paths must be absolute and normalized. The filesystem is not
+    queried.
+
+    :param path: a string containing a path.
+    :param directory: a string containing the path of a directory.
+    :return: ``True`` if ``path`` is ``directory`` or is below it.
+
+    For example:
+
+    >>> is_subpath('/odoo/addons/sale/views/sale.xml', '/odoo/addons/sale')
+    True
+    >>> is_subpath('/odoo/addons/sale_stock', '/odoo/addons/sale')
+    False
+
+    .. versionadded:: 0.3.0
+    """
+    return path == directory or path.startswith(directory.rstrip(os.sep) +
+                                                os.sep)
+
+
 def find_files(path=None, pattern='*'):
     """
     Search for files.
@@ -134,3 +194,56 @@ def find_files(path=None, pattern='*'):
                 else:
                     d.append(get_path([directory, filename]))
     return d
+
+
+def scan_modules(path=None, manifest='__manifest__.py', exclude_tests=False):
+    """
+    Search for module roots in a single pass.
+
+    Walk the directory tree below ``path`` using ``os.scandir`` and report
+    every directory containing a ``manifest`` file. Descent stops at module
+    roots, so the (often large) ``static``, ``i18n`` or ``data`` folders of a
+    module are never visited. ``.git`` folders are skipped as well.
+
+    :param path: a string containing the path where modules will be looked for.
+    :param manifest: a string containing the name of the manifest file.
+    :param exclude_tests: ``True`` to skip ``tests`` folders.
+    :return: a generator of ``ModuleEntry`` instances, in alphabetical order.
+
+    .. versionadded:: 0.3.0
+    """
+    assert isinstance(path, str)
+    root = os.path.abspath(path)
+    if exclude_tests and 'tests' in root.split(os.sep):
+        return
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        subdirs, files = _scan_directory(directory)
+        if manifest in files:
+            yield ModuleEntry(directory, os.path.join(directory, manifest),
+                              '__init__.py' in files)
+            continue
+        pending.extend(os.path.join(directory, d) for d in reversed(subdirs)
+                       if d != '.git' and not (exclude_tests and d == 'tests'))
+
+
+def _scan_directory(directory):
+    """
+    List the contents of a directory with a single ``os.scandir`` call.
+
+    :param directory: a string containing the path to a directory.
+    :return: a tuple with a sorted list of subdirectory names (symlinks are
+             not followed) and a set of file names.
+
+    .. versionadded:: 0.3.0
+    """
+    try:
+        with os.scandir(directory) as iterator:
+            entries = list(iterator)
+    except OSError:
+        return [], set()
+    subdirs = sorted(e.name for e in entries
+                     if e.is_dir(follow_symlinks=False))
+    files = set(e.name for e in entries if e.is_file())
+    return subdirs, files
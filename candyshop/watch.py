@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+``candyshop.watch`` is a module for watching bundles for changes.
+
+This module implements watchers that report the files of some bundles that
+are relevant to the analysis (manifests, ``__init__.py`` files,
+``oca_dependencies.txt`` files and XML files) when they are created,
+modified or deleted, so that an ``Environment`` can be refreshed::
+
+    watcher = get_watcher(['path/to/bundle'])
+    watcher.watch(env.refresh)
+
+Files are polled, unless the optional watchdog_ package is installed, in
+which case filesystem events are used.
+
+``EnvironmentWatcher`` goes further: it refreshes the environment and
+reports which dependencies became missing or satisfied after each change.
+
+.. _watchdog: https://pypi.org/project/watchdog/
+"""
+
+import os
+import threading
+
+from .bundle import DEFAULT_MANIFEST_FILE, RESCAN_FILES
+from .report import get_state
+
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+DEFAULT_INTERVAL = 1.0
+IGNORED_DIRECTORIES = ('.git', '__pycache__', 'node_modules')
+BACKENDS = ('auto', 'polling', 'watchdog')
+EVENT_TYPES = ('created', 'modified', 'deleted', 'moved')
+
+
+def is_watched(name):
+    """
+    Determine if a file is relevant to the analysis of a bundle.
+
+    :param name: (string) the name of the file.
+    :return: ``True`` if changes to the file must be reported.
+
+    >>> is_watched('__manifest__.py'), is_watched('models.py')
+    (True, False)
+
+    .. versionadded:: 0.3.0
+    """
+    return name in RESCAN_FILES or name.endswith('.xml')
+
+
+def get_snapshot(paths):
+    """
+    Get the state of the watched files below some directories.
+
+    :param paths: (list) absolute paths of directories.
+    :return: (dict) a mapping from the paths of the watched files to their
+             modification time (in nanoseconds) and size.
+
+    .. versionadded:: 0.3.0
+    """
+    snapshot = {}
+    directories = list(paths)
+    while directories:
+        subdirs, files = _scan_entries(directories.pop())
+        directories.extend(subdirs)
+        snapshot.update(files)
+    return snapshot
+
+
+def _scan_entries(directory):
+    """
+    List the subdirectories and watched files of a directory.
+
+    :param directory: (string) the path of the directory.
+    :return: a tuple with a list of subdirectory paths (symlinks are not
+             followed) and a list of ``(path, (mtime, size))`` pairs.
+
+    .. versionadded:: 0.3.0
+    """
+    try:
+        with os.scandir(directory) as iterator:
+            entries = list(iterator)
+    except OSError:
+        return [], []
+    subdirs = [e.path for e in entries
+               if e.name not in IGNORED_DIRECTORIES and
+               e.is_dir(follow_symlinks=False)]
+    files = [(e.path, _get_state(e)) for e in entries
+             if is_watched(e.name) and e.is_file()]
+    return subdirs, [(path, state) for path, state in files if state]
+
+
+def _get_state(entry):
+    """
+    Get the modification time and size of a directory entry.
+
+    :param entry: (``os.DirEntry``) the entry.
+    :return: a ``(mtime, size)`` tuple, or ``None`` if the entry was deleted.
+
+    .. versionadded:: 0.3.0
+    """
+    try:
+        stat = entry.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_changes(old, new):
+    """
+    Compare two snapshots.
+
+    :param old: (dict) a snapshot, as produced by ``get_snapshot()``.
+    :param new: (dict) a more recent snapshot.
+    :return: (list) the paths of the files created, modified or deleted,
+             sorted.
+
+    >>> get_changes({'a': (1, 1), 'b': (1, 1)}, {'b': (2, 1), 'c': (1, 1)})
+    ['a', 'b', 'c']
+
+    .. versionadded:: 0.3.0
+    """
+    return sorted(path for path in set(old).union(new)
+                  if old.get(path) != new.get(path))
+
+
+class PollingWatcher(object):
+    """
+    This class represents a watcher that polls directories for changes.
+
+    Each poll scans the directories (without reading any file), so it is
+    cheap enough to be done every second on big bundles.
+    """
+
+    def __init__(self, paths, interval=DEFAULT_INTERVAL):
+        """
+        Initialize a ``PollingWatcher`` instance.
+
+        :param paths: (list) relative or absolute paths of the directories
+                      to watch.
+        :param interval: (float) the number of seconds between polls.
+        :return: a ``PollingWatcher`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        #: Attribute ``PollingWatcher.paths`` (list): The absolute paths of
+        #: the watched directories.
+        self.paths = [os.path.abspath(path) for path in paths]
+
+        #: Attribute ``PollingWatcher.interval`` (float): The number of
+        #: seconds between polls.
+        self.interval = interval
+
+        self.__snapshot = get_snapshot(self.paths)
+        self.__stopped = threading.Event()
+        self.__lock = threading.Lock()
+
+    def poll(self):
+        """
+        Get the files changed since the previous poll.
+
+        This method can be called from several threads: each change is
+        reported only once.
+
+        :return: (list) the paths of the files created, modified or deleted,
+                 sorted.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            snapshot = get_snapshot(self.paths)
+            changes = get_changes(self.__snapshot, snapshot)
+            self.__snapshot = snapshot
+        return changes
+
+    def watch(self, callback):
+        """
+        Poll the directories until ``stop()`` is called.
+
+        :param callback: (callable) a function called with the list of
+                         changed paths each time files change.
+
+        .. versionadded:: 0.3.0
+        """
+        while not self.__stopped.wait(self.interval):
+            changes = self.poll()
+            if changes:
+                callback(changes)
+
+    def stop(self):
+        """
+        Stop watching the directories. The watcher cannot be started again.
+
+        .. versionadded:: 0.3.0
+        """
+        self.__stopped.set()
+
+
+class WatchdogWatcher(object):
+    """
+    This class represents a watcher that uses filesystem events.
+
+    It has the same interface of ``PollingWatcher``, but the directories are
+    not scanned: the changes are collected from the events sent by the
+    operating system (inotify, FSEvents, etc) through the watchdog_ package,
+    which must be installed.
+    """
+
+    def __init__(self, paths, interval=DEFAULT_INTERVAL):
+        """
+        Initialize a ``WatchdogWatcher`` instance and start observing.
+
+        :param paths: (list) relative or absolute paths of the directories
+                      to watch.
+        :param interval: (float) the number of seconds between the checks
+                         for collected changes in ``watch()``.
+        :return: a ``WatchdogWatcher`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        assert Observer is not None, \
+            'The watchdog package is required to use filesystem events.'
+
+        #: Attribute ``WatchdogWatcher.paths`` (list): The absolute paths of
+        #: the watched directories.
+        self.paths = [os.path.abspath(path) for path in paths]
+
+        #: Attribute ``WatchdogWatcher.interval`` (float): The number of
+        #: seconds between the checks for collected changes.
+        self.interval = interval
+
+        self.__changes = set()
+        self.__stopped = threading.Event()
+        self.__lock = threading.Lock()
+        self.__observer = Observer()
+        for path in self.paths:
+            self.__observer.schedule(self, path, recursive=True)
+        self.__observer.start()
+
+    def dispatch(self, event):
+        """
+        Collect the changes of a filesystem event.
+
+        A directory that was created, deleted or moved (for example, a
+        module) is collected as a change to the manifest it may contain.
+
+        :param event: (``watchdog.events.FileSystemEvent``) the event.
+
+        .. versionadded:: 0.3.0
+        """
+        if event.event_type not in EVENT_TYPES or \
+           (event.is_directory and event.event_type == 'modified'):
+            return
+        paths = [p for p in (event.src_path, getattr(event, 'dest_path', ''))
+                 if p and not set(p.split(os.sep)) & set(IGNORED_DIRECTORIES)]
+        if event.is_directory:
+            paths = [os.path.join(p, DEFAULT_MANIFEST_FILE) for p in paths]
+        with self.__lock:
+            self.__changes.update(p for p in paths
+                                  if is_watched(os.path.basename(p)))
+
+    def poll(self):
+        """
+        Get the files changed since the previous poll.
+
+        :return: (list) the paths of the files created, modified or deleted,
+                 sorted.
+
+        .. versionadded:: 0.3.0
+        """
+        with self.__lock:
+            changes, self.__changes = sorted(self.__changes), set()
+        return changes
+
+    def watch(self, callback):
+        """
+        Report changes until ``stop()`` is called.
+
+        :param callback: (callable) a function called with the list of
+                         changed paths each time files change.
+
+        .. versionadded:: 0.3.0
+        """
+        while not self.__stopped.wait(self.interval):
+            changes = self.poll()
+            if changes:
+                callback(changes)
+
+    def stop(self):
+        """
+        Stop watching the directories. The watcher cannot be started again.
+
+        .. versionadded:: 0.3.0
+        """
+        self.__stopped.set()
+        self.__observer.stop()
+        self.__observer.join()
+
+
+def get_watcher(paths, interval=DEFAULT_INTERVAL, backend='auto'):
+    """
+    Create a watcher.
+
+    :param paths: (list) relative or absolute paths of the directories to
+                  watch.
+    :param interval: (float) the number of seconds between polls.
+    :param backend: (string) ``polling`` for a ``PollingWatcher``,
+                    ``watchdog`` for a ``WatchdogWatcher``, or ``auto``
+                    (default) for a ``WatchdogWatcher`` if the watchdog
+                    package is installed, and a ``PollingWatcher`` otherwise.
+    :return: the watcher.
+
+    .. versionadded:: 0.3.0
+    """
+    assert backend in BACKENDS, 'Unknown watcher backend: {0}'.format(backend)
+    if backend == 'watchdog' or (backend == 'auto' and Observer is not None):
+        return WatchdogWatcher(paths, interval)
+    return PollingWatcher(paths, interval)
+
+
+def get_delta(old, new):
+    """
+    Compare two states of an environment.
+
+    :param old: (set) a state, see ``EnvironmentWatcher.get_state()``.
+    :param new: (set) a more recent state.
+    :return: (list) a dictionary for each dependency that became missing or
+             satisfied, sorted.
+
+    >>> get_delta({('dependencies', 'addons', 'sale', 'stock')},
+    ...           {('records', 'addons', 'sale/data.xml', 'mail')})
+    ... # doctest: +NORMALIZE_WHITESPACE
+    [{'event': 'missing', 'check': 'records', 'bundle': 'addons',
+      'name': 'sale/data.xml', 'dependency': 'mail'},
+     {'event': 'satisfied', 'check': 'dependencies', 'bundle': 'addons',
+      'name': 'sale', 'dependency': 'stock'}]
+
+    .. versionadded:: 0.3.0
+    """
+    return [dict(zip(('event', 'check', 'bundle', 'name', 'dependency'),
+                     (event,) + item))
+            for event, items in (('missing', new - old),
+                                 ('satisfied', old - new))
+            for item in sorted(items)]
+
+
+class EnvironmentWatcher(object):
+    """
+    This class represents a watcher that keeps an environment up to date.
+
+    Each time files of the watched bundles change, the environment is
+    refreshed (so only changed manifests and XML files are read again) and
+    the results of its checks are compared with the previous ones. For
+    example::
+
+        watcher = EnvironmentWatcher(env, ['path/to/bundle'])
+        watcher.watch(print)
+    """
+
+    def __init__(self, env, paths, checks=None, interval=DEFAULT_INTERVAL,
+                 backend='auto'):
+        """
+        Initialize an ``EnvironmentWatcher`` instance.
+
+        :param env: (``Environment``) the environment, with its bundles.
+        :param paths: (list) paths of the bundles to watch.
+        :param checks: (list) names of the checks to compare (see
+                       ``candyshop.report.CHECKS``). Default: all.
+        :param interval: (float) the number of seconds between polls.
+        :param backend: (string) the watcher backend, see ``get_watcher()``.
+        :return: an ``EnvironmentWatcher`` instance.
+
+        .. versionadded:: 0.3.0
+        """
+        #: Attribute ``EnvironmentWatcher.env`` (``Environment``): The
+        #: environment that is kept up to date.
+        self.env = env
+
+        #: Attribute ``EnvironmentWatcher.checks`` (list or None): The names
+        #: of the checks to compare.
+        self.checks = checks
+
+        #: Attribute ``EnvironmentWatcher.watcher``: The watcher of the
+        #: bundles, see ``get_watcher()``.
+        self.watcher = get_watcher(paths, interval, backend)
+
+        #: Attribute ``EnvironmentWatcher.state`` (set): The results of the
+        #: checks after the last update.
+        self.state = self.get_state()
+
+    def get_state(self):
+        """
+        Get the results of the checks of the environment.
+
+        :return: (set) a ``(check, bundle, name, dependency)`` tuple for each
+                 missing dependency, see ``candyshop.report.get_state()``.
+
+        .. versionadded:: 0.3.0
+        """
+        return get_state(self.env, self.checks)
+
+    def update(self, changes):
+        """
+        Refresh the environment after files changed.
+
+        :param changes: (list) the paths of the changed files.
+        :return: (list) the dependencies that became missing or satisfied,
+                 see ``get_delta()``.
+
+        .. versionadded:: 0.3.0
+        """
+        self.env.refresh(changes)
+        state = self.get_state()
+        delta = get_delta(self.state, state)
+        self.state = state
+        return delta
+
+    def watch(self, callback):
+        """
+        Update the environment until ``stop()`` is called.
+
+        :param callback: (callable) a function called with the list of
+                         dependencies that became missing or satisfied (see
+                         ``get_delta()``) each time the results change.
+
+        .. versionadded:: 0.3.0
+        """
+        def update(changes):
+            delta = self.update(changes)
+            if delta:
+                callback(delta)
+        self.watcher.watch(update)
+
+    def stop(self):
+        """
+        Stop watching the bundles.
+
+        .. versionadded:: 0.3.0
+        """
+        self.watcher.stop()
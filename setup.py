@@ -43,9 +43,14 @@ setup(
     description=__description__,
     long_description=open('README.rst').read(),
     packages=['candyshop'],
+    entry_points={
+        'console_scripts': ['candyshop=candyshop.cli:main'],
+    },
     package_dir={'candyshop': 'candyshop'},
     include_package_data=True,
     install_requires=install_requires,
+    extras_require={'watchdog': ['watchdog'],
+                    'pyinstrument': ['pyinstrument']},
     license=open('LICENSE').read(),
     zip_safe=False,
     keywords=['odoo', 'requirements'],
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+
+from sh import git
+
+
+def make_module(path, name, depends=None, data=None):
+    """Write a minimal Odoo module called ``name`` inside ``path``."""
+    module_dir = os.path.join(path, name)
+    os.makedirs(module_dir)
+    with open(os.path.join(module_dir, '__init__.py'), 'w'):
+        pass
+    with open(os.path.join(module_dir, '__manifest__.py'), 'w') as f:
+        f.write(repr({'name': os.path.basename(name),
+                      'depends': depends or [],
+                      'data': data or []}))
+    return module_dir
+
+
+def make_git_repo(path, modules=None, oca_dependencies=None, branch='main',
+                  depends=None):
+    """
+    Create a git repository containing a bundle.
+
+    :param path: directory where the repository will be created.
+    :param modules: a list of module names (or paths relative to ``path``)
+                    to create inside the bundle.
+    :param oca_dependencies: a list of ``oca_dependencies.txt`` lines.
+    :param branch: the name of the branch holding the commit.
+    :param depends: a dictionary mapping module names to their dependencies.
+    :return: a ``file://`` URL pointing to the repository.
+    """
+    os.makedirs(path)
+    for name in modules or []:
+        make_module(path, name, depends=(depends or {}).get(name))
+    if oca_dependencies:
+        with open(os.path.join(path, 'oca_dependencies.txt'), 'w') as f:
+            f.write('\n'.join(oca_dependencies))
+    git.init('--quiet', '--initial-branch', branch, path)
+    git('-C', path, 'add', '--all')
+    git('-C', path, '-c', 'user.name=candyshop',
+        '-c', 'user.email=candyshop@example.com',
+        'commit', '--quiet', '-m', 'Initial commit')
+    return 'file://{0}'.format(path)
@@ -18,10 +18,13 @@
 
 import os
 import sys
+import shutil
 import doctest
+import tempfile
 import unittest
 
-from candyshop.bundle import Bundle, Module
+from candyshop.bundle import Bundle, Module, iter_records
+from candyshop.utils import RecordRef
 
 
 class TestModule(unittest.TestCase):
@@ -64,6 +67,103 @@ class TestModule(unittest.TestCase):
         self.assertCountEqual(list(self.openacademy.get_record_ids_module_references()),
                               record_ids_should_be)
 
+    def test_05_extract_records_fromfile(self):
+        xmlfile = os.path.join(self.openacademy_dir, 'security', 'security.xml')
+        records_should_be = (
+            ('openacademy', 'openacademy_group_manager', 'res.groups', '0',
+             xmlfile, 4),
+            ('openacademy', 'only_responsible_can_modify', 'ir.rule', '0',
+             xmlfile, 8)
+        )
+        records = self.openacademy.extract_records_fromfile(xmlfile)
+        self.assertTupleEqual(records, records_should_be)
+        self.assertIs(self.openacademy.extract_records_fromfile(xmlfile),
+                      records)
+
+    def test_06_extract_records_from_foreign_file(self):
+        xmlfile = os.path.join(self.openacademy_dir, 'demo',
+                               'openacademy_course_demo.xml')
+        self.assertRaisesRegex(
+            AssertionError, 'does not belong to this module',
+            self.openacademy.extract_records_fromfile, xmlfile
+        )
+
+    def test_07_get_record_refs(self):
+        refs = dict(list(d.items())[0]
+                    for d in self.openacademy.get_record_refs())
+        self.assertListEqual(refs['security/security.xml'], [
+            RecordRef('openacademy', 'openacademy_group_manager', '0',
+                      'res.groups', 4),
+            RecordRef('openacademy', 'only_responsible_can_modify', '0',
+                      'ir.rule', 8)
+        ])
+        self.assertNotIn('security/ir.model.access.csv', refs)
+
+    def test_08_get_record_ids_compatibility(self):
+        xmlfile = os.path.join(self.openacademy_dir, 'security', 'security.xml')
+        self.assertListEqual(
+            list(self.openacademy.get_record_ids_fromfile(xmlfile)),
+            ['openacademy.openacademy_group_manager.noupdate=0',
+             'openacademy.only_responsible_can_modify.noupdate=0'])
+        self.assertListEqual(
+            list(self.openacademy.get_record_ids_fromfile(xmlfile, 'base')),
+            [])
+
+
+class TestIterRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, content):
+        xmlfile = os.path.join(self.tmpdir, 'data.xml')
+        with open(xmlfile, 'w') as f:
+            f.write(content)
+        return xmlfile
+
+    def test_01_records(self):
+        xmlfile = self.write(
+            '<odoo>\n'
+            '  <record id="a" model="res.partner"/>\n'
+            '  <data noupdate="1">\n'
+            '    <record id="other.b" model="res.users">\n'
+            '      <field name="x"><record id="c" model="ir.ui.view"/></field>\n'
+            '    </record>\n'
+            '    <record model="res.users"/>\n'
+            '    <record id="d.e.f" model="res.users"/>\n'
+            '  </data>\n'
+            '</odoo>\n')
+        self.assertListEqual(list(iter_records(xmlfile, 'mod')), [
+            ('mod', 'a', 'res.partner', '0', xmlfile, 2),
+            ('other', 'b', 'res.users', '1', xmlfile, 4),
+            ('mod', 'c', 'ir.ui.view', '0', xmlfile, 5),
+            ('d', 'e.f', 'res.users', '1', xmlfile, 8),
+        ])
+        self.assertListEqual(
+            [r[1] for r in iter_records(xmlfile, 'mod', model='res.users')],
+            ['b', 'e.f'])
+
+    def test_02_not_an_odoo_file(self):
+        xmlfile = self.write('<html><record id="a" model="x"/></html>')
+        self.assertListEqual(list(iter_records(xmlfile, 'mod')), [])
+
+    def test_03_syntax_error(self):
+        xmlfile = self.write('<odoo><record id="a" model="x"/><data></odoo>')
+        self.assertListEqual(list(iter_records(xmlfile, 'mod')), [])
+
+    def test_04_root_siblings(self):
+        xmlfile = self.write(
+            '<?xml version="1.0"?>\n'
+            '<!-- License header -->\n'
+            '<?xml-stylesheet href="style.xsl"?>\n'
+            '<odoo><record id="a" model="x"/></odoo>\n'
+            '<!-- Trailing comment -->\n')
+        self.assertListEqual(list(iter_records(xmlfile, 'mod')),
+                             [('mod', 'a', 'x', '0', xmlfile, 4)])
+
 
 class TestBundle(unittest.TestCase):
 
@@ -153,6 +253,37 @@ class TestBrokenBundle(unittest.TestCase):
             Bundle, self.is_not_package_dir, exclude_tests=False
         )
 
+    def test_05_lazy_broken_manifest(self):
+        bundle = Bundle(self.broken_manifest_dir, exclude_tests=False,
+                        lazy=True)
+        module = bundle.modules[0]
+        self.assertEqual(module.slug, 'broken_manifest')
+        self.assertRaises(IOError, getattr, module, 'properties')
+
+
+class TestLazyBundle(unittest.TestCase):
+
+    def setUp(self):
+        self.testdir = os.path.dirname(os.path.abspath(__file__))
+        self.odoo_afr_dir = os.path.join(self.testdir, 'examples', 'odoo-afr')
+        self.eager = Bundle(self.odoo_afr_dir, exclude_tests=False)
+        self.lazy = Bundle(self.odoo_afr_dir, exclude_tests=False, lazy=True)
+
+    def test_01_same_modules(self):
+        self.assertListEqual([m.path for m in self.lazy.modules],
+                             [m.path for m in self.eager.modules])
+
+    def test_02_manifests_not_read(self):
+        for module in self.lazy.modules:
+            self.assertIsNone(module._Module__properties)
+
+    def test_03_manifests_read_on_access(self):
+        for lazy, eager in zip(self.lazy.modules, self.eager.modules):
+            self.assertEqual(lazy.properties.depends,
+                             eager.properties.depends)
+            self.assertEqual(lazy.properties.slug, lazy.slug)
+            self.assertIs(lazy.load(), lazy)
+
 
 def load_tests(loader, tests, pattern):
     tests.addTests(doctest.DocTestSuite('candyshop.bundle'))
@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import sys
+import shutil
+import doctest
+import tempfile
+import unittest
+
+from io import StringIO
+from unittest import mock
+from contextlib import redirect_stdout
+
+from sh import git
+
+from candyshop.bundle import Bundle
+from candyshop.bundle import parse_manifest
+from candyshop.cache import (CloneCache, ManifestCache, ParseCache,
+                             RecordCache, get_content_key, main,
+                             sparse_clone)
+from candyshop.environment import Environment
+
+from . import make_git_repo, make_module
+
+
+class TestCloneCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.repodir = os.path.join(self.tmpdir, 'repos')
+        self.odoo_url = make_git_repo(
+            os.path.join(self.repodir, 'odoo'),
+            modules=['addons/board', 'odoo/addons/base'])
+        self.dep_url = make_git_repo(os.path.join(self.repodir, 'dep'),
+                                     modules=['dep_module'])
+        self.cache = CloneCache(os.path.join(self.tmpdir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def commit_module(self, repo, name):
+        make_module(repo, name)
+        git('-C', repo, 'add', '--all')
+        git('-C', repo, '-c', 'user.name=candyshop',
+            '-c', 'user.email=candyshop@example.com',
+            'commit', '--quiet', '-m', 'Add {0}'.format(name))
+
+    def test_01_checkout(self):
+        checkout = os.path.join(self.tmpdir, 'checkout')
+        self.cache.checkout(self.dep_url, 'main', checkout)
+        self.assertTrue(os.path.isfile(os.path.join(
+            checkout, 'dep_module', '__manifest__.py')))
+        self.assertEqual(len(self.cache.get_mirrors()), 1)
+
+    def test_02_refresh(self):
+        self.cache.checkout(self.dep_url, 'main',
+                            os.path.join(self.tmpdir, 'first'))
+        self.commit_module(os.path.join(self.repodir, 'dep'), 'new_module')
+        second = os.path.join(self.tmpdir, 'second')
+        self.cache.checkout(self.dep_url, 'main', second)
+        self.assertTrue(os.path.isdir(os.path.join(second, 'new_module')))
+
+    def test_03_no_refresh(self):
+        self.cache.refresh = False
+        self.cache.checkout(self.dep_url, 'main',
+                            os.path.join(self.tmpdir, 'first'))
+        self.commit_module(os.path.join(self.repodir, 'dep'), 'new_module')
+        second = os.path.join(self.tmpdir, 'second')
+        self.cache.checkout(self.dep_url, 'main', second)
+        self.assertFalse(os.path.isdir(os.path.join(second, 'new_module')))
+
+    def test_04_lru_eviction(self):
+        self.cache.checkout(self.dep_url, 'main',
+                            os.path.join(self.tmpdir, 'first'))
+        self.cache.max_size = 1
+        self.cache.checkout(self.odoo_url, 'main',
+                            os.path.join(self.tmpdir, 'second'))
+        self.assertListEqual(
+            [m[0] for m in self.cache.get_mirrors()],
+            [self.cache.get_mirror_path(self.odoo_url, 'main')])
+
+    def test_05_environment_uses_cache(self):
+        for _ in range(2):
+            env = Environment(url=self.odoo_url, branch='main',
+                              cache=self.cache.path)
+            self.assertListEqual(sorted(env.modules_index), ['base', 'board'])
+            env.destroy()
+        self.assertEqual(len(self.cache.get_mirrors()), 1)
+        self.cache.clear()
+        self.assertListEqual(self.cache.get_mirrors(), [])
+
+
+class TestSparseClone(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.repodir = os.path.join(self.tmpdir, 'repo')
+        self.url = make_git_repo(self.repodir, modules=['b/sub'])
+        git('-C', self.repodir, 'config', 'uploadpack.allowFilter', 'true')
+        module = make_module(self.repodir, 'a')
+        os.makedirs(os.path.join(module, 'views'))
+        with open(os.path.join(module, '__manifest__.py'), 'w') as f:
+            f.write(repr({'name': 'a', 'data': ['views/[a].xml'],
+                          'demo': ['demo.xml']}))
+        for name in ('views/[a].xml', 'views/b.xml', 'demo.xml', 'models.py'):
+            with open(os.path.join(module, name), 'w') as f:
+                f.write('<odoo/>')
+        git('-C', self.repodir, 'add', '--all')
+        git('-C', self.repodir, '-c', 'user.name=candyshop',
+            '-c', 'user.email=candyshop@example.com',
+            'commit', '--quiet', '-m', 'Add a')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def get_files(self, path):
+        for root, dirs, files in os.walk(path):
+            dirs[:] = [d for d in dirs if d != '.git']
+            for name in set(files) - {'.git'}:
+                yield os.path.relpath(os.path.join(root, name), path)
+
+    def assertSparse(self, path):
+        self.assertCountEqual(self.get_files(path), [
+            'a/__manifest__.py', 'a/__init__.py', 'a/views/[a].xml',
+            'a/demo.xml', 'b/sub/__manifest__.py', 'b/sub/__init__.py'])
+        self.assertEqual(len(Bundle(path).modules), 2)
+
+    def test_01_sparse_clone(self):
+        checkout = os.path.join(self.tmpdir, 'checkout')
+        sparse_clone(self.url, 'main', checkout)
+        self.assertSparse(checkout)
+        self.assertEqual(str(git('-C', checkout, 'config',
+                                 'remote.origin.promisor')).strip(), 'true')
+
+    def test_02_clone_cache(self):
+        cache = CloneCache(os.path.join(self.tmpdir, 'cache'))
+        checkout = os.path.join(self.tmpdir, 'checkout')
+        cache.checkout(self.url, 'main', checkout, sparse=True)
+        self.assertSparse(checkout)
+        full = os.path.join(self.tmpdir, 'full')
+        cache.checkout(self.url, 'main', full)
+        self.assertIn('a/models.py', list(self.get_files(full)))
+
+
+class TestManifestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.testdir = os.path.dirname(os.path.abspath(__file__))
+        self.bundle_dir = os.path.join(self.tmpdir, 'bundle')
+        shutil.copytree(os.path.join(self.testdir, 'examples',
+                                     'odoo-beginners'), self.bundle_dir)
+        self.manifest = os.path.join(self.bundle_dir, 'openacademy',
+                                     '__manifest__.py')
+        self.dbfile = os.path.join(self.tmpdir, 'cache', 'manifests.sqlite')
+        self.cache = ManifestCache(self.dbfile)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_01_get(self):
+        props = self.cache.get(self.manifest)
+        self.assertListEqual(props['depends'], ['base', 'board'])
+        self.assertEqual(self.cache.get(self.manifest), props)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_02_persistence(self):
+        self.cache.get(self.manifest)
+        other = ManifestCache(self.dbfile)
+        self.assertEqual(other.get(self.manifest)['name'], 'Open Academy')
+        self.assertEqual((other.hits, other.misses), (1, 0))
+        other.close()
+
+    def test_03_touched_file_with_same_content(self):
+        self.cache.get(self.manifest)
+        os.utime(self.manifest, ns=(0, 0))
+        self.cache.get(self.manifest)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(self.cache.get_entries()[0][1], 0)
+
+    def test_04_modified_file(self):
+        self.cache.get(self.manifest)
+        with open(self.manifest, 'w') as f:
+            f.write("{'name': 'Changed', 'depends': ['base']}")
+        self.assertEqual(self.cache.get(self.manifest)['name'], 'Changed')
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+    def test_05_warm_and_invalidate(self):
+        self.assertEqual(self.cache.warm([self.bundle_dir]), 3)
+        self.assertEqual(len(self.cache.get_entries()), 3)
+        self.assertEqual(self.cache.invalidate(
+            [os.path.join(self.bundle_dir, 'openacademy')]), 1)
+        self.assertEqual(self.cache.invalidate(), 2)
+        self.assertListEqual(self.cache.get_entries(), [])
+
+    def test_06_bundle_and_environment_use_cache(self):
+        bundle = Bundle(self.bundle_dir, exclude_tests=False,
+                        manifest_cache=self.cache)
+        self.assertEqual(self.cache.misses, 3)
+        env = Environment(init=False, manifest_cache=self.dbfile)
+        env.addbundles([self.bundle_dir], False)
+        self.assertEqual(env.manifest_cache.hits, 3)
+        self.assertEqual(
+            sorted(m.properties.slug for m in bundle.modules),
+            sorted(env.modules_index))
+        env.manifest_cache.close()
+        env.destroy()
+
+    def test_07_command_line(self):
+        output = StringIO()
+        with redirect_stdout(output):
+            main(['--cache', self.dbfile, 'warm', self.bundle_dir])
+            main(['--cache', self.dbfile, 'inspect'])
+            main(['--cache', self.dbfile, 'invalidate'])
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0], '3 manifests and 9 XML files cached.')
+        self.assertIn('manifests', lines[2])
+        self.assertTrue(lines[2].endswith(self.manifest))
+        self.assertEqual(len(lines), 3 + 9 + 2)
+        self.assertEqual(lines[-1], '3 manifests and 9 XML files removed.')
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.testdir = os.path.dirname(os.path.abspath(__file__))
+        for name in ('first', 'second'):
+            shutil.copytree(os.path.join(self.testdir, 'examples',
+                                         'odoo-beginners'),
+                            os.path.join(self.tmpdir, name))
+        self.dbfile = os.path.join(self.tmpdir, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_01_lru(self):
+        cache = ParseCache(max_size=2)
+        for content in (b'{1: 1}', b'{2: 2}', b'{3: 3}', b'{3: 3}'):
+            cache.extract(content, parse_manifest)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.extract(b'{1: 1}', parse_manifest), {1: 1})
+        self.assertDictEqual(cache.get_stats(), {
+            'entries': 2, 'hits': 1, 'disk_hits': 0, 'misses': 4,
+            'hit_rate': 0.2})
+
+    def test_02_disk(self):
+        cache = ParseCache(self.dbfile, max_size=1)
+        cache.extract(b'{1: 1}', parse_manifest)
+        cache.extract(b'{2: 2}', parse_manifest)
+        self.assertEqual(cache.lookup(b'{1: 1}', parse_manifest),
+                         (True, {1: 1}))
+        cache.close()
+        cache = ParseCache(self.dbfile)
+        self.assertEqual(cache.lookup(b'{2: 2}', parse_manifest),
+                         (True, {2: 2}))
+        self.assertEqual(cache.lookup(b'{3: 3}', parse_manifest),
+                         (False, None))
+        self.assertEqual((cache.hits, cache.disk_hits, cache.misses),
+                         (0, 1, 1))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.lookup(b'{2: 2}', parse_manifest),
+                         (False, None))
+        cache.close()
+
+    def test_03_identical_bundles(self):
+        for workers in (None, 2):
+            env = Environment(init=False, parse_cache=ParseCache())
+            env.addbundles([os.path.join(self.tmpdir, 'first'),
+                            os.path.join(self.tmpdir, 'second')], False)
+            notmet = list(env.get_notmet_record_ids(workers))
+            self.assertListEqual(
+                [list(item) for item in notmet], [['first'], ['second']])
+            self.assertListEqual(list(notmet[0].values()),
+                                 list(notmet[1].values()))
+            self.assertEqual(len(env.parse_cache), 12)
+            if not workers:
+                self.assertEqual(env.parse_cache.hits, 12)
+            env.destroy()
+
+    def test_04_files_are_hashed_once(self):
+        env = Environment(init=False, parse_cache=ParseCache())
+        env.addbundles([os.path.join(self.tmpdir, 'first'),
+                        os.path.join(self.tmpdir, 'second')], False)
+        pending = sum(len(list(module.get_pending_datafiles()))
+                      for module in env.get_modules_list())
+        with mock.patch('candyshop.cache.get_content_key',
+                        wraps=get_content_key) as hashed:
+            env.extract_records(workers=2)
+        self.assertEqual(hashed.call_count, pending)
+        self.assertEqual(len(env.parse_cache), 12)
+        env.destroy()
+
+
+class TestRecordCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.testdir = os.path.dirname(os.path.abspath(__file__))
+        self.bundle_dir = os.path.join(self.tmpdir, 'bundle')
+        shutil.copytree(os.path.join(self.testdir, 'examples',
+                                     'odoo-beginners'), self.bundle_dir)
+        self.xmlfile = os.path.join(self.bundle_dir, 'references_absent_ids',
+                                    'view', 'test.xml')
+        self.dbfile = os.path.join(self.tmpdir, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make_environment(self):
+        env = Environment(init=False, manifest_cache=self.dbfile,
+                          record_cache=self.dbfile)
+        env.addbundles([self.bundle_dir], False)
+        return env
+
+    def test_01_key_is_module(self):
+        cache = RecordCache(self.dbfile)
+        records = cache.get(self.xmlfile, 'references_absent_ids')
+        self.assertEqual(records[0][:2], ('unexistent_module',
+                                          'unexistent_id'))
+        self.assertTupleEqual(cache.lookup(self.xmlfile, 'other'),
+                              (False, None))
+        self.assertTupleEqual(cache.lookup(self.xmlfile,
+                                           'references_absent_ids'),
+                              (True, records))
+        cache.close()
+
+    def test_02_environment_reuses_records(self):
+        first = self.make_environment()
+        notmet = list(first.get_notmet_record_ids())
+        self.assertEqual(first.record_cache.misses, 9)
+        first.destroy()
+        second = self.make_environment()
+        self.assertListEqual(list(second.get_notmet_record_ids(workers=2)),
+                             notmet)
+        self.assertEqual((second.record_cache.hits,
+                          second.record_cache.misses), (9, 0))
+        second.destroy()
+
+    def test_03_parallel_extraction_fills_cache(self):
+        first = self.make_environment()
+        first.extract_records(workers=2)
+        self.assertEqual(len(first.record_cache.get_entries()), 9)
+        first.destroy()
+
+
+def load_tests(loader, tests, pattern):
+    tests.addTests(doctest.DocTestSuite('candyshop.cache'))
+    return tests
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import sys
+import json
+import shutil
+import doctest
+import tempfile
+import unittest
+from io import StringIO
+from contextlib import redirect_stderr, redirect_stdout
+
+from sh import git
+
+from candyshop.cli import main
+from candyshop.environment import Environment
+
+from . import make_git_repo, make_module
+
+
+class TestCheck(unittest.TestCase):
+
+    def setUp(self):
+        self.testdir = os.path.dirname(os.path.abspath(__file__))
+        self.odoo_beginners_dir = os.path.join(self.testdir, 'examples',
+                                               'odoo-beginners')
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def check(self, *args, **kwargs):
+        output = StringIO()
+        with redirect_stdout(output):
+            status = main(['check', '--no-odoo', '--include-tests',
+                           kwargs.get('bundle', self.odoo_beginners_dir)] +
+                          list(args))
+        return status, output.getvalue()
+
+    def report(self, method):
+        env = Environment(init=False)
+        env.addbundles([self.odoo_beginners_dir], False)
+        output = StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(method(env), 1)
+        env.destroy()
+        return output.getvalue()
+
+    def test_01_text(self):
+        status, output = self.check('--no-summary')
+        self.assertEqual(status, 1)
+        self.assertEqual(output, self.report(
+            Environment.get_notmet_dependencies_report) + self.report(
+            Environment.get_notmet_record_ids_report))
+
+    def test_02_ndjson(self):
+        status, output = self.check('--format', 'ndjson', '-c', 'records')
+        self.assertEqual(status, 1)
+        self.assertListEqual(
+            [json.loads(line) for line in output.splitlines()],
+            [{'check': 'records', 'bundle': 'odoo-beginners',
+              'file': 'references_absent_ids/view/test.xml',
+              'missing': ['unexistent_module']},
+             {'summary': {'records': 1}}])
+
+    def test_03_json(self):
+        status, output = self.check('--format', 'json')
+        problems = json.loads(output)
+        self.assertEqual(status, 1)
+        self.assertListEqual([p['check'] for p in problems],
+                             ['dependencies'] * 3 + ['records'])
+        self.assertDictEqual(problems[1], {
+            'check': 'dependencies', 'bundle': 'odoo-beginners',
+            'module': 'openacademy', 'missing': ['base', 'board']})
+
+    def test_04_no_problems(self):
+        bundle = os.path.join(self.tmpdir, 'bundle')
+        make_module(bundle, 'a')
+        make_module(bundle, 'b', depends=['a'])
+        self.assertEqual(self.check(bundle=bundle), (0, (
+            'All dependencies are satisfied in the environment.\n'
+            'All references are present in the environment.\n'
+            'Summary: 0 modules with missing dependencies,'
+            ' 0 XML files with missing references.\n')))
+        self.assertEqual(self.check('-f', 'json', bundle=bundle), (0, '[]\n'))
+        self.assertEqual(self.check('-f', 'ndjson', '--no-summary',
+                                    bundle=bundle), (0, ''))
+
+    def test_06_output_file(self):
+        output = os.path.join(self.tmpdir, 'candyshop.sarif')
+        self.assertEqual(self.check('-f', 'sarif', '-o', output), (1, ''))
+        with open(output) as f:
+            log = json.load(f)
+        self.assertEqual(len(log['runs'][0]['results']), 4)
+
+    def test_05_invalid_arguments(self):
+        with redirect_stderr(StringIO()):
+            self.assertRaises(SystemExit, main, ['check', '-f', 'xml', '.'])
+
+    def test_07_profile(self):
+        profile = os.path.join(self.tmpdir, 'profile.json')
+        self.assertEqual(self.check('-f', 'json', '--profile', profile)[0], 1)
+        with open(profile) as f:
+            stats = json.load(f)
+        self.assertListEqual(list(stats['phases']),
+                             ['discovery', 'manifests', 'reports', 'records'])
+        self.assertEqual(stats['phases']['records']['files'], 9)
+        errors = StringIO()
+        with redirect_stderr(errors):
+            self.check('--profile', '-')
+        self.assertIn('manifests', errors.getvalue())
+        self.assertTrue(errors.getvalue().startswith('phase'))
+
+
+class TestImpact(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.bundle_dir = os.path.join(self.tmpdir, 'bundle')
+        make_git_repo(self.bundle_dir, modules=['a', 'b', 'c', 'd'],
+                      depends={'b': ['a'], 'c': ['b', 'base'], 'd': []})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def impact(self, *args):
+        output = StringIO()
+        with redirect_stdout(output):
+            status = main(['impact', '--no-odoo', self.bundle_dir] +
+                          list(args))
+        self.assertEqual(status, 0)
+        return output.getvalue().splitlines()
+
+    def test_01_modules(self):
+        self.assertListEqual(self.impact('-m', 'a'), ['a', 'b', 'c'])
+        self.assertListEqual(self.impact('-m', 'base', '-m', 'd'), ['c', 'd'])
+        self.assertListEqual(self.impact('-m', 'unexistent'), [])
+
+    def test_02_paths(self):
+        self.assertListEqual(
+            self.impact('-p', os.path.join(self.bundle_dir, 'b', 'x.py')),
+            ['b', 'c'])
+
+    def test_03_git_diff(self):
+        self.assertListEqual(self.impact('--git-diff', 'HEAD'), [])
+        make_module(self.bundle_dir, 'e', depends=['d'])
+        git('-C', self.bundle_dir, 'add', '--all')
+        git('-C', self.bundle_dir, '-c', 'user.name=candyshop',
+            '-c', 'user.email=candyshop@example.com',
+            'commit', '--quiet', '-m', 'Add e')
+        self.assertListEqual(self.impact('--git-diff', 'HEAD~1..HEAD'), ['e'])
+
+
+class TestIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.odoo_dir = os.path.join(self.tmpdir, 'odoo')
+        make_module(os.path.join(self.odoo_dir, 'addons'), 'web',
+                    depends=['base'])
+        make_module(os.path.join(self.odoo_dir, 'odoo', 'addons'), 'base')
+        self.bundle_dir = os.path.join(self.tmpdir, 'bundle')
+        make_module(self.bundle_dir, 'a', depends=['web', 'sale'])
+        self.index = os.path.join(self.tmpdir, 'odoo.idx')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_01_index(self):
+        with redirect_stderr(StringIO()) as output:
+            self.assertEqual(main(['index', self.odoo_dir, '-o', self.index]),
+                             0)
+        self.assertEqual(output.getvalue(), 'Saved 2 modules to {0}.\n'
+                                            .format(self.index))
+        shutil.rmtree(self.odoo_dir)
+        with redirect_stdout(StringIO()) as output:
+            status = main(['check', '--index', self.index, '-f', 'ndjson',
+                           '-c', 'dependencies', self.bundle_dir])
+        self.assertEqual(status, 1)
+        self.assertEqual(json.loads(output.getvalue().splitlines()[0]),
+                         {'check': 'dependencies', 'bundle': 'bundle',
+                          'module': 'a', 'missing': ['sale']})
+
+
+def load_tests(loader, tests, pattern):
+    tests.addTests(doctest.DocTestSuite('candyshop.cli'))
+    return tests
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
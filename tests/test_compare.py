@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import sys
+import shutil
+import doctest
+import tempfile
+import unittest
+
+from sh import git
+
+from candyshop.compare import BranchComparison
+
+from . import make_git_repo, make_module
+from .test_gittree import commit
+
+
+class TestBranchComparison(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.repodir = os.path.join(self.tmpdir, 'repo')
+        make_git_repo(self.repodir, modules=['a', 'b'], branch='14.0',
+                      depends={'b': ['a', 'web']})
+        module = os.path.join(self.repodir, 'b')
+        with open(os.path.join(module, 'view.xml'), 'w') as f:
+            f.write('<odoo><record id="mail.x" model="m"/></odoo>')
+        with open(os.path.join(module, '__manifest__.py'), 'w') as f:
+            f.write(repr({'name': 'b', 'depends': ['a', 'web'],
+                          'data': ['view.xml']}))
+        commit(self.repodir, 'Add view')
+        git('-C', self.repodir, 'checkout', '--quiet', '-b', '15.0')
+        make_module(self.repodir, 'c', depends=['sale'])
+        commit(self.repodir, 'Add c')
+        git('-C', self.repodir, 'checkout', '--quiet', '-b', '16.0')
+        make_module(self.repodir, 'web')
+        commit(self.repodir, 'Add web')
+        self.comparison = BranchComparison(
+            self.repodir, ['14.0', '15.0', '16.0'], init=False)
+
+    def tearDown(self):
+        self.comparison.destroy()
+        shutil.rmtree(self.tmpdir)
+
+    def test_01_environments(self):
+        self.assertListEqual(list(self.comparison.environments),
+                             ['14.0', '15.0', '16.0'])
+        self.assertEqual(self.comparison.environments['16.0'].bundles[0].path,
+                         self.repodir + '@16.0')
+        self.assertListEqual(
+            sorted(self.comparison.environments['15.0'].modules_index),
+            ['a', 'b', 'c'])
+
+    def test_02_matrix(self):
+        self.assertListEqual(self.comparison.get_matrix(), [
+            {'check': 'dependencies', 'bundle': 'repo', 'name': 'b',
+             'dependency': 'web', 'branches': ['14.0', '15.0']},
+            {'check': 'dependencies', 'bundle': 'repo', 'name': 'c',
+             'dependency': 'sale', 'branches': ['15.0', '16.0']},
+            {'check': 'records', 'bundle': 'repo', 'name': 'b/view.xml',
+             'dependency': 'mail', 'branches': ['14.0', '15.0', '16.0']}])
+        self.assertSetEqual(self.comparison.get_common(),
+                            {('records', 'repo', 'b/view.xml', 'mail')})
+
+    def test_03_differences(self):
+        self.assertListEqual(self.comparison.get_differences('14.0', '16.0'), [
+            {'event': 'missing', 'check': 'dependencies', 'bundle': 'repo',
+             'name': 'c', 'dependency': 'sale'},
+            {'event': 'satisfied', 'check': 'dependencies', 'bundle': 'repo',
+             'name': 'b', 'dependency': 'web'}])
+        self.assertListEqual(self.comparison.get_differences('15.0', '15.0'),
+                             [])
+
+    def test_04_files_are_parsed_once(self):
+        self.comparison.get_matrix()
+        # a, b and view.xml are the same in all branches, c in 15.0 and
+        # 16.0, web only in 16.0.
+        self.assertEqual(len(self.comparison.parse_cache), 5)
+        self.assertEqual(self.comparison.parse_cache.misses, 5)
+        self.assertEqual(self.comparison.parse_cache.hits, 7)
+
+    def test_05_no_branches(self):
+        self.assertRaises(AssertionError, BranchComparison, self.repodir, [])
+
+
+def load_tests(loader, tests, pattern):
+    tests.addTests(doctest.DocTestSuite('candyshop.compare'))
+    return tests
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
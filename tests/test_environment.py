@@ -18,12 +18,19 @@
 
 import os
 import sys
+import shutil
 import doctest
+import tempfile
+import warnings
 import unittest
 from io import StringIO
 from contextlib import contextmanager
 
-from candyshop.environment import Environment
+from sh import git
+
+from candyshop.environment import Environment, get_git_changed_paths
+
+from . import make_git_repo, make_module
 
 
 @contextmanager
@@ -117,6 +124,229 @@ class TestEnvironment(unittest.TestCase):
         self.assertIn('addons-vauxoo', list(self.bundle_name_list(self.odoo)))
 
 
+class TestEnvironmentIndex(unittest.TestCase):
+
+    def setUp(self):
+
+        self.testdir = os.path.dirname(os.path.abspath(__file__))
+        self.exampledir = os.path.join(self.testdir, 'examples')
+        self.odoo_beginners_dir = os.path.join(self.exampledir,
+                                               'odoo-beginners')
+        self.odoo = Environment(init=False)
+        self.odoo.addbundles([self.odoo_beginners_dir], False)
+
+    def tearDown(self):
+        self.odoo.destroy()
+
+    def test_01_index_is_updated_by_addbundles(self):
+        self.assertCountEqual(list(self.odoo.modules_index),
+                              list(self.odoo.get_modules_slug_list()))
+        openacademy = [m for m in self.odoo.get_modules_list()
+                       if m.properties.slug == 'openacademy'][0]
+        self.assertIs(self.odoo.get_module('openacademy'), openacademy)
+        self.assertIsNone(self.odoo.get_module('unexistent_dependency'))
+
+    def test_02_notmet_dependencies_use_index(self):
+        notmet_dependencies_should_be = {
+            'missing_dependency': ['base', 'unexistent_dependency'],
+            'openacademy': ['base', 'board'],
+            'references_absent_ids': ['base']
+        }
+        notmet_dependencies = {}
+        for item in self.odoo.get_notmet_dependencies():
+            notmet_dependencies.update(item['odoo-beginners'])
+        self.assertDictEqual(notmet_dependencies,
+                             notmet_dependencies_should_be)
+
+    def test_03_destroy_clears_index(self):
+        self.odoo.destroy()
+        self.assertDictEqual(self.odoo.modules_index, {})
+        os.makedirs(self.odoo.path)
+
+    def test_04_notmet_record_ids(self):
+        notmet_record_ids_should_be = [{
+            'odoo-beginners': {
+                'references_absent_ids/view/test.xml': ['unexistent_module']
+            }
+        }]
+        self.assertListEqual(list(self.odoo.get_notmet_record_ids()),
+                             notmet_record_ids_should_be)
+
+    def test_05_dependency_graph(self):
+        graph = self.odoo.get_dependency_graph()
+        self.assertIs(self.odoo.get_dependency_graph(), graph)
+        self.assertListEqual(graph.get_missing(),
+                             ['base', 'board', 'unexistent_dependency'])
+        self.assertListEqual(graph.get_dependents(['base']),
+                             ['missing_dependency', 'openacademy',
+                              'references_absent_ids'])
+        self.odoo.destroy()
+        self.assertEqual(len(self.odoo.get_dependency_graph()), 0)
+        os.makedirs(self.odoo.path)
+
+    def test_06_impacted_modules(self):
+        self.assertListEqual(self.odoo.get_impacted_modules(['base']),
+                             ['missing_dependency', 'openacademy',
+                              'references_absent_ids'])
+        xmlfile = os.path.join(self.odoo_beginners_dir, 'openacademy', 'view',
+                               'partner_view.xml')
+        self.assertListEqual(self.odoo.get_impacted_modules(paths=[xmlfile]),
+                             ['openacademy'])
+        self.assertListEqual(self.odoo.get_impacted_modules(
+            paths=[self.odoo_beginners_dir]), [])
+
+    def test_07_parallel_notmet_record_ids(self):
+        serial = Environment(init=False)
+        serial.addbundles([self.odoo_beginners_dir], False)
+        self.assertListEqual(list(self.odoo.get_notmet_record_ids(workers=2)),
+                             list(serial.get_notmet_record_ids()))
+        for module in self.odoo.get_modules_list():
+            self.assertListEqual(list(module.get_pending_datafiles()), [])
+        serial.destroy()
+
+
+class TestEnvironmentDeptree(unittest.TestCase):
+
+    def setUp(self):
+
+        self.repodir = tempfile.mkdtemp()
+        self.remote = {}
+        for name, deps in [('dep-c', []),
+                           ('dep-b', ['dep-c']),
+                           ('dep-d', ['dep-c']),
+                           ('main', ['dep-b', 'dep-d'])]:
+            oca = ['{0} {1} main'.format(d, self.remote[d]) for d in deps]
+            self.remote[name] = make_git_repo(
+                os.path.join(self.repodir, name),
+                modules=[name.replace('-', '_')], oca_dependencies=oca)
+        self.odoo = Environment(init=False, clone_workers=2)
+
+    def tearDown(self):
+        self.odoo.destroy()
+        shutil.rmtree(self.repodir)
+
+    def test_01_clone_dependency_tree(self):
+        self.odoo.addbundles([os.path.join(self.repodir, 'main')])
+        self.assertListEqual([b.name for b in self.odoo.bundles],
+                             ['main', 'dep-b', 'dep-d', 'dep-c'])
+        self.assertListEqual(sorted(os.listdir(self.odoo.path)),
+                             ['dep-b', 'dep-c', 'dep-d'])
+        self.assertListEqual(list(self.odoo.get_notmet_dependencies()), [])
+
+    def test_02_sparse_clone(self):
+        for name in self.remote:
+            git('-C', os.path.join(self.repodir, name), 'config',
+                'uploadpack.allowFilter', 'true')
+        self.odoo.sparse = True
+        self.odoo.addbundles([os.path.join(self.repodir, 'main')])
+        self.assertListEqual([b.name for b in self.odoo.bundles],
+                             ['main', 'dep-b', 'dep-d', 'dep-c'])
+        self.assertEqual(str(git('-C', os.path.join(self.odoo.path, 'dep-c'),
+                                 'config', 'core.sparseCheckout')).strip(),
+                         'true')
+        self.assertListEqual(list(self.odoo.get_notmet_dependencies()), [])
+
+    def test_03_conflicting_dependencies(self):
+        url = self.remote['dep-c']
+        make_git_repo(os.path.join(self.repodir, 'conflict'),
+                      modules=['conflict'],
+                      oca_dependencies=['dep-c {0} main'.format(url),
+                                        'dep-c {0} main'.format(url),
+                                        'dep-c {0} other'.format(url)])
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.odoo.addbundles([os.path.join(self.repodir, 'conflict')])
+        self.assertEqual(len(caught), 1)
+        self.assertIn('dep-c is declared as {0} main and as {0} other'
+                      .format(url), str(caught[0].message))
+        self.assertListEqual([b.name for b in self.odoo.bundles],
+                             ['conflict', 'dep-c'])
+
+
+class TestEnvironmentRefresh(unittest.TestCase):
+
+    def setUp(self):
+
+        self.testdir = os.path.dirname(os.path.abspath(__file__))
+        self.tmpdir = tempfile.mkdtemp()
+        self.bundle_dir = os.path.join(self.tmpdir, 'odoo-beginners')
+        shutil.copytree(os.path.join(self.testdir, 'examples',
+                                     'odoo-beginners'), self.bundle_dir)
+        self.odoo = Environment(init=False)
+        self.odoo.addbundles([self.bundle_dir], False)
+        self.odoo.addbundles([make_git_repo(
+            os.path.join(self.tmpdir, 'base'), modules=['base', 'board']
+        ).replace('file://', '')])
+
+    def tearDown(self):
+        self.odoo.destroy()
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, content, *path):
+        path = os.path.join(self.bundle_dir, *path)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def notmet(self, method):
+        result = {}
+        for item in method():
+            result.update(item['odoo-beginners'])
+        return result
+
+    def test_01_modified_manifest(self):
+        openacademy = self.odoo.get_module('openacademy')
+        manifest = self.write(repr({'name': 'Missing dependency',
+                                    'depends': ['base']}),
+                              'missing_dependency', '__manifest__.py')
+        affected = self.odoo.refresh([manifest])
+        self.assertListEqual([m.properties.slug for m in affected],
+                             ['missing_dependency'])
+        self.assertDictEqual(self.notmet(self.odoo.get_notmet_dependencies),
+                             {})
+        self.assertIs(self.odoo.get_module('openacademy'), openacademy)
+
+    def test_02_modified_xml(self):
+        self.assertIn('references_absent_ids/view/test.xml',
+                      self.notmet(self.odoo.get_notmet_record_ids))
+        xmlfile = self.write('<odoo><record id="base.x" model="y"/></odoo>',
+                             'references_absent_ids', 'view', 'test.xml')
+        self.odoo.refresh([xmlfile])
+        self.assertDictEqual(self.notmet(self.odoo.get_notmet_record_ids), {})
+
+    def test_03_new_module(self):
+        graph = self.odoo.get_dependency_graph()
+        make_module(self.bundle_dir, 'new_module', depends=['sale'])
+        self.odoo.refresh([os.path.join(self.bundle_dir, 'new_module',
+                                        '__manifest__.py')])
+        self.assertIsNotNone(self.odoo.get_module('new_module'))
+        self.assertListEqual(
+            self.notmet(self.odoo.get_notmet_dependencies)['new_module'],
+            ['sale'])
+        self.assertIsNot(self.odoo.get_dependency_graph(), graph)
+        self.assertListEqual(self.odoo.get_dependency_graph().get_missing(),
+                             ['sale', 'unexistent_dependency'])
+
+    def test_04_removed_module(self):
+        shutil.rmtree(os.path.join(self.bundle_dir, 'openacademy'))
+        self.odoo.refresh([os.path.join(self.bundle_dir, 'openacademy',
+                                        '__manifest__.py')])
+        self.assertIsNone(self.odoo.get_module('openacademy'))
+
+    def test_05_git_changed_paths(self):
+        repo = os.path.join(self.tmpdir, 'base')
+        manifest = os.path.join(repo, 'base', '__manifest__.py')
+        with open(manifest, 'a') as f:
+            f.write('\n')
+        self.assertListEqual(get_git_changed_paths(repo), [manifest])
+        git('-C', repo, '-c', 'user.name=candyshop',
+            '-c', 'user.email=candyshop@example.com',
+            'commit', '--quiet', '-am', 'Change')
+        self.assertListEqual(get_git_changed_paths(repo), [])
+        self.assertListEqual(get_git_changed_paths(repo, 'HEAD~1..HEAD'),
+                             [manifest])
+
+
 def load_tests(loader, tests, pattern):
     tests.addTests(doctest.DocTestSuite('candyshop.environment'))
     return tests
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import sys
+import shutil
+import doctest
+import tempfile
+import unittest
+
+from sh import git
+
+from candyshop.bundle import Bundle
+from candyshop.environment import Environment
+from candyshop.gittree import GitBundle, GitModule, GitTree
+
+from . import make_git_repo, make_module
+
+
+def commit(repo, message):
+    git('-C', repo, 'add', '--all')
+    git('-C', repo, '-c', 'user.name=candyshop',
+        '-c', 'user.email=candyshop@example.com',
+        'commit', '--quiet', '-m', message)
+
+
+class TestGitTree(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.repodir = os.path.join(self.tmpdir, 'repo')
+        make_git_repo(self.repodir, modules=['addons/a', 'addons/b'],
+                      branch='15.0', depends={'b': ['a', 'base']})
+        with open(os.path.join(self.repodir, 'addons', 'b', 'view.xml'),
+                  'w') as f:
+            f.write('<odoo><record id="c.x" model="m"/></odoo>')
+        with open(os.path.join(self.repodir, 'addons', 'b',
+                               '__manifest__.py'), 'w') as f:
+            f.write(repr({'name': 'b', 'depends': ['a', 'base'],
+                          'data': ['view.xml']}))
+        make_module(os.path.join(self.repodir, 'addons', 'a', 'tests'), 't')
+        os.makedirs(os.path.join(self.repodir, 'addons', 'not_package'))
+        with open(os.path.join(self.repodir, 'addons', 'not_package',
+                               '__manifest__.py'), 'w') as f:
+            f.write('{}')
+        with open(os.path.join(self.repodir, 'addons',
+                               'oca_dependencies.txt'), 'w') as f:
+            f.write('web file:///unexistent 15.0\n')
+        commit(self.repodir, 'Add records')
+        git('-C', self.repodir, 'checkout', '--quiet', '-b', '16.0')
+        shutil.rmtree(os.path.join(self.repodir, 'addons', 'a'))
+        commit(self.repodir, 'Remove a')
+        self.mirror = os.path.join(self.tmpdir, 'mirror.git')
+        git.clone('--quiet', '--mirror', self.repodir, self.mirror)
+        self.tree = GitTree(self.mirror, '15.0')
+
+    def tearDown(self):
+        self.tree.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_01_tree(self):
+        self.assertEqual(self.tree.path, self.mirror + '@15.0')
+        self.assertTrue(self.tree.isfile('addons/a/__init__.py'))
+        self.assertEqual(self.tree.read('addons/b/view.xml'),
+                         b'<odoo><record id="c.x" model="m"/></odoo>')
+        self.assertRaises(IOError, self.tree.read, 'unexistent')
+        self.assertListEqual(self.tree.scan_modules('addons'),
+                             ['addons/a', 'addons/b', 'addons/not_package'])
+        self.assertListEqual(self.tree.scan_modules('', False),
+                             ['addons/a', 'addons/b', 'addons/not_package'])
+        self.tree.close()
+        self.assertTrue(self.tree.read('addons/a/__init__.py') == b'')
+
+    def test_02_bundle(self):
+        bundle = GitBundle(self.tree, 'addons')
+        self.assertEqual(bundle.name, 'addons')
+        self.assertEqual(bundle.path, self.mirror + '@15.0/addons')
+        self.assertListEqual([m.slug for m in bundle.modules], ['a', 'b'])
+        self.assertIsInstance(bundle.modules[1], GitModule)
+        self.assertListEqual(bundle.modules[1].properties.depends,
+                             ['a', 'base'])
+        self.assertListEqual(bundle.oca_dependencies,
+                             [['web', 'file:///unexistent', '15.0']])
+        self.assertEqual(GitBundle(self.tree).name, 'mirror')
+
+    def test_03_records(self):
+        module = GitBundle(self.tree, 'addons', lazy=True).modules[1]
+        xmlfile = os.path.join(module.path, 'view.xml')
+        self.assertListEqual(list(module.get_pending_datafiles()), [xmlfile])
+        self.assertEqual(module.extract_records_fromfile(xmlfile),
+                         (('c', 'x', 'm', '0', xmlfile, 1),))
+        self.assertListEqual(list(module.get_pending_datafiles()), [])
+        self.assertRaises(AssertionError, module.extract_records_fromfile,
+                          os.path.join(module.path, 'other.xml'))
+        self.assertListEqual(list(module.get_record_ids_module_references()),
+                             [{'view.xml': ['c']}])
+
+    def test_04_same_as_checkout(self):
+        checkout = os.path.join(self.tmpdir, 'checkout')
+        git.clone('--quiet', '--branch', '15.0', self.mirror, checkout)
+        bundle = Bundle(os.path.join(checkout, 'addons'))
+        gitbundle = GitBundle(self.tree, 'addons')
+        self.assertListEqual(
+            [vars(m.properties) for m in bundle.modules],
+            [vars(m.properties) for m in gitbundle.modules])
+        self.assertLessEqual(set(vars(bundle)), set(vars(gitbundle)))
+        self.assertLessEqual(set(vars(bundle.modules[0])),
+                             set(vars(gitbundle.modules[0])))
+
+    def test_05_environment(self):
+        with open(os.path.join(self.repodir, 'addons',
+                               'oca_dependencies.txt'), 'w') as f:
+            f.write('')
+        commit(self.repodir, 'Remove dependencies')
+        git('-C', self.mirror, 'fetch', '--quiet')
+        env = Environment(init=False)
+        try:
+            env.addbundles_fromgit(self.mirror, '16.0', ['addons'])
+            self.assertListEqual(env.addbundles_fromgit(self.mirror, '16.0',
+                                                        ['addons']), [])
+            self.assertListEqual(list(env.get_notmet_dependencies()), [
+                {'addons': {'b': ['a', 'base']}}])
+            self.assertListEqual(list(env.get_notmet_record_ids(workers=2)),
+                                 [{'addons': {'b/view.xml': ['c']}}])
+        finally:
+            env.destroy()
+
+
+def load_tests(loader, tests, pattern):
+    tests.addTests(doctest.DocTestSuite('candyshop.gittree'))
+    return tests
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
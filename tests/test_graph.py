@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import sys
+import doctest
+import unittest
+
+from candyshop.graph import DependencyGraph
+
+
+class TestDependencyGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = DependencyGraph([
+            ('base', []),
+            ('web', ['base']),
+            ('mail', ['base', 'web']),
+            ('account', ['mail', 'web', 'base']),
+            ('sale', ['account', 'unexistent']),
+            ('stock', ['mail']),
+        ])
+
+    def test_01_nodes(self):
+        self.assertEqual(len(self.graph), 7)
+        self.assertIn('sale', self.graph)
+        self.assertNotIn('unexistent', self.graph)
+        self.assertNotIn('nothing', self.graph)
+        self.assertListEqual(self.graph.get_missing(), ['unexistent'])
+
+    def test_02_dependencies(self):
+        self.assertListEqual(self.graph.get_dependencies(['sale'], False),
+                             ['account', 'unexistent'])
+        self.assertListEqual(self.graph.get_dependencies(['sale']),
+                             ['account', 'base', 'mail', 'unexistent', 'web'])
+        self.assertListEqual(self.graph.get_dependencies(['base']), [])
+        self.assertListEqual(self.graph.get_dependencies(['nothing']), [])
+
+    def test_03_dependents(self):
+        self.assertListEqual(self.graph.get_dependents(['mail'], False),
+                             ['account', 'stock'])
+        self.assertListEqual(self.graph.get_dependents(['mail']),
+                             ['account', 'sale', 'stock'])
+        self.assertListEqual(self.graph.get_dependents(['web', 'mail']),
+                             ['account', 'sale', 'stock'])
+        self.assertListEqual(self.graph.get_dependents(['unexistent']),
+                             ['sale'])
+
+    def test_04_install_order(self):
+        order = self.graph.get_install_order()
+        self.assertCountEqual(order, ['base', 'web', 'mail', 'account',
+                                      'sale', 'stock'])
+        for slug in order:
+            for dep in self.graph.get_dependencies([slug]):
+                if dep in self.graph:
+                    self.assertLess(order.index(dep), order.index(slug))
+        self.assertListEqual(self.graph.get_install_order(['stock']),
+                             ['base', 'web', 'mail', 'stock'])
+
+    def test_05_cycles(self):
+        self.assertListEqual(self.graph.get_cycles(), [])
+        graph = DependencyGraph([('a', ['b']), ('b', ['c']), ('c', ['a']),
+                                 ('d', ['d']), ('e', ['a'])])
+        self.assertListEqual(graph.get_cycles(), [['a', 'b', 'c'], ['d']])
+        self.assertRaisesRegex(
+            AssertionError, 'There are dependency cycles between: a, b, c, e',
+            graph.get_install_order, ['e'])
+
+
+def load_tests(loader, tests, pattern):
+    tests.addTests(doctest.DocTestSuite('candyshop.graph'))
+    return tests
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
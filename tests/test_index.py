@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import sys
+import shutil
+import doctest
+import tempfile
+import unittest
+
+from sh import git
+
+from candyshop.environment import Environment
+from candyshop.index import Index, IndexedBundle, IndexedModule
+
+from . import make_git_repo, make_module
+
+
+def get_notmet(env):
+    return (list(env.get_notmet_dependencies()),
+            list(env.get_notmet_record_ids()))
+
+
+class TestIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.bundledir = os.path.join(self.tempdir, 'bundle')
+        shutil.copytree(os.path.join(os.path.dirname(__file__), 'examples',
+                                     'odoo-beginners'), self.bundledir)
+        self.index = os.path.join(self.tempdir, 'bundle.idx')
+        self.odoo = Environment(init=False)
+        self.odoo.addbundles([self.bundledir])
+        self.loaded = None
+
+    def tearDown(self):
+        self.odoo.destroy()
+        if self.loaded:
+            self.loaded.destroy()
+        shutil.rmtree(self.tempdir)
+
+    def load(self, **kwargs):
+        self.odoo.save(self.index)
+        self.loaded = Environment.load(self.index, **kwargs)
+        return self.loaded
+
+    def test_01_round_trip(self):
+        loaded = self.load()
+        self.assertEqual(len(loaded.bundles), 1)
+        self.assertIsInstance(loaded.bundles[0], IndexedBundle)
+        self.assertEqual(loaded.bundles[0].name, 'bundle')
+        self.assertCountEqual(loaded.get_modules_slug_list(),
+                              self.odoo.get_modules_slug_list())
+        self.assertEqual(get_notmet(loaded), get_notmet(self.odoo))
+
+    def test_02_modules(self):
+        loaded = self.load()
+        for module in self.odoo.get_modules_list():
+            indexed = loaded.get_module(module.slug)
+            self.assertIsInstance(indexed, IndexedModule)
+            self.assertEqual(indexed.path, module.path)
+            self.assertEqual(indexed.manifest, module.manifest)
+            self.assertEqual(vars(indexed.properties),
+                             vars(module.properties))
+            self.assertEqual(list(indexed.get_xml_datafiles()),
+                             list(module.get_xml_datafiles()))
+            for _, datafile in module.get_xml_datafiles():
+                if os.path.isfile(datafile):
+                    self.assertEqual(
+                        indexed.extract_records_fromfile(datafile),
+                        module.extract_records_fromfile(datafile))
+
+    def test_03_does_not_read_bundles(self):
+        self.odoo.save(self.index)
+        shutil.rmtree(self.bundledir)
+        loaded = self.loaded = Environment.load(self.index)
+        self.assertIn('openacademy', loaded.modules_index)
+        self.assertEqual(loaded.get_dependency_graph().get_dependencies(
+            ['openacademy']), ['base', 'board'])
+        self.assertEqual(loaded.refresh([os.path.join(
+            self.bundledir, 'openacademy', '__manifest__.py')]), [])
+
+    def test_04_oca_dependencies(self):
+        url = make_git_repo(os.path.join(self.tempdir, 'web'), ['web_extra'],
+                            branch='15.0')
+        with open(os.path.join(self.bundledir, 'oca_dependencies.txt'),
+                  'w') as f:
+            f.write('web {0} 15.0\n'.format(url))
+        self.odoo.refresh([f.name])
+        loaded = self.load()
+        self.assertEqual([b.name for b in loaded.bundles], ['bundle', 'web'])
+        self.assertEqual(loaded.bundles[0].oca_dependencies,
+                         [['web', url, '15.0']])
+        self.assertIn('web_extra', loaded.modules_index)
+
+    def test_05_strings_are_shared(self):
+        make_module(self.bundledir, 'extra',
+                    depends=['openacademy'])
+        self.odoo.refresh([os.path.join(self.bundledir, 'extra')])
+        self.odoo.save(self.index)
+        index = Index(self.index)
+        slugs = index.get_strings('module.slug')
+        self.assertIn('extra', slugs)
+        position = slugs.index('openacademy')
+        self.assertIn(index.sections['module.slug'][position],
+                      index.sections['depend.values'])
+
+    def test_06_skips_known_bundles(self):
+        self.odoo.save(self.index)
+        self.loaded = Environment.load(self.index)
+        self.loaded._Environment__add_index(self.index)
+        self.assertEqual(len(self.loaded.bundles), 1)
+
+    def test_07_init_from_index(self):
+        self.odoo.save(self.index)
+        self.loaded = Environment(init_from_index=self.index,
+                                  url='file:///unexistent')
+        self.assertCountEqual(self.loaded.get_modules_slug_list(),
+                              self.odoo.get_modules_slug_list())
+
+    def test_08_invalid_file(self):
+        with open(self.index, 'wb') as f:
+            f.write(b'\0' * 64)
+        self.assertRaisesRegex(AssertionError, 'is not a candyshop index',
+                               Index, self.index)
+
+    def test_09_attributes(self):
+        loaded = self.load()
+        bundle = self.odoo.bundles[0]
+        self.assertLessEqual(set(vars(bundle)), set(vars(loaded.bundles[0])))
+        for module in bundle.modules:
+            indexed = loaded.get_module(module.slug)
+            self.assertLessEqual(set(vars(module)), set(vars(indexed)))
+            self.assertIs(indexed.properties, indexed._Module__properties)
+
+    def test_10_save_loaded_index(self):
+        expected = get_notmet(self.load())
+        self.assertNotEqual(expected[1], [])
+        shutil.rmtree(self.bundledir)
+        index = os.path.join(self.tempdir, 'resaved.idx')
+        self.loaded.save(index)
+        resaved = Environment.load(index)
+        self.assertEqual(get_notmet(resaved), expected)
+        resaved.destroy()
+
+    def test_11_save_git_bundles(self):
+        git.init('--quiet', '--initial-branch', 'main', self.bundledir)
+        git('-C', self.bundledir, 'add', '--all')
+        git('-C', self.bundledir, '-c', 'user.name=candyshop',
+            '-c', 'user.email=candyshop@example.com',
+            'commit', '--quiet', '-m', 'Initial commit')
+        env = Environment(init=False)
+        env.addbundles_fromgit(self.bundledir, 'main')
+        expected = get_notmet(env)
+        self.assertNotEqual(expected[1], [])
+        env.save(self.index)
+        env.destroy()
+        self.loaded = Environment.load(self.index)
+        self.assertEqual(get_notmet(self.loaded), expected)
+
+
+def load_tests(loader, tests, pattern):
+    tests.addTests(doctest.DocTestSuite('candyshop.index'))
+    return tests
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import sys
+import json
+import time
+import shutil
+import doctest
+import tempfile
+import unittest
+from io import StringIO
+from unittest import mock
+
+from candyshop.environment import Environment
+from candyshop.metrics import METRICS, Metrics, get_path_stats, timed
+
+from . import make_git_repo
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics()
+        self.metrics.enable()
+
+    def test_01_phases(self):
+        with self.metrics.phase('outer'):
+            time.sleep(0.02)
+            with self.metrics.phase('inner'):
+                time.sleep(0.05)
+                self.metrics.count(files=2, bytes=10)
+            self.metrics.count(hits=1)
+        with self.metrics.phase('inner'):
+            pass
+        phases = self.metrics.get_stats()['phases']
+        self.assertListEqual(list(phases), ['outer', 'inner'])
+        self.assertEqual(phases['inner']['calls'], 2)
+        self.assertEqual(phases['inner']['files'], 2)
+        self.assertEqual(phases['outer']['hits'], 1)
+        self.assertGreaterEqual(phases['inner']['seconds'], 0.05)
+        self.assertLess(phases['outer']['seconds'], 0.05)
+
+    def test_02_disabled(self):
+        self.metrics.disable()
+        with self.metrics.phase('phase'):
+            self.metrics.count(files=1)
+        self.metrics.count('phase', files=1)
+        self.assertEqual(self.metrics.get_stats()['phases'], {})
+
+    def test_03_count(self):
+        self.metrics.count(files=1)
+        self.metrics.count('phase', misses=3)
+        self.metrics.reset()
+        self.metrics.count('phase', misses=1)
+        self.assertEqual(self.metrics.get_stats()['phases']['phase'],
+                         {'calls': 0, 'seconds': 0, 'files': 0, 'bytes': 0,
+                          'hits': 0, 'misses': 1})
+
+    def test_04_write(self):
+        with self.metrics.phase('phase'):
+            pass
+        output = StringIO()
+        self.metrics.write_json(output)
+        self.assertListEqual(list(json.loads(output.getvalue())['phases']),
+                             ['phase'])
+        output = StringIO()
+        self.metrics.write_text(output)
+        self.assertEqual(len(output.getvalue().splitlines()), 3)
+
+    def test_05_path_stats(self):
+        tmpdir = tempfile.mkdtemp()
+        with open(os.path.join(tmpdir, 'file'), 'w') as f:
+            f.write('12345')
+        os.symlink(os.path.join(tmpdir, 'file'),
+                   os.path.join(tmpdir, 'link'))
+        self.assertEqual(get_path_stats(tmpdir), (1, 5))
+        self.assertEqual(get_path_stats(os.path.join(tmpdir, 'file')),
+                         (1, 5))
+        shutil.rmtree(tmpdir)
+
+
+class TestMetricsEnvironment(unittest.TestCase):
+
+    def setUp(self):
+        self.testdir = os.path.dirname(os.path.abspath(__file__))
+        self.odoo_beginners_dir = os.path.join(self.testdir, 'examples',
+                                               'odoo-beginners')
+        METRICS.reset()
+        METRICS.enable()
+
+    def tearDown(self):
+        METRICS.disable()
+        METRICS.reset()
+
+    def test_01_environment(self):
+        env = Environment(init=False)
+        env.addbundles([self.odoo_beginners_dir], False)
+        list(env.get_notmet_dependencies())
+        list(env.get_notmet_record_ids())
+        module = env.get_module('references_absent_ids')
+        for _, datafile in module.get_xml_datafiles():
+            module.get_records_fromfile(datafile)
+        env.destroy()
+        phases = METRICS.get_stats()['phases']
+        self.assertListEqual(list(phases), ['discovery', 'manifests',
+                                            'records', 'xpath', 'parse_xml'])
+        self.assertEqual(phases['manifests']['files'],
+                         phases['discovery']['files'])
+        self.assertEqual(phases['records']['files'], 9)
+        self.assertGreater(phases['records']['bytes'], 0)
+        self.assertEqual(phases['xpath']['calls'],
+                         phases['parse_xml']['calls'])
+
+    def test_02_clone(self):
+        def slow_path_stats(path):
+            time.sleep(0.5)
+            return get_path_stats(path)
+        repodir = tempfile.mkdtemp()
+        url = make_git_repo(os.path.join(repodir, 'dep'), modules=['dep'])
+        make_git_repo(os.path.join(repodir, 'main'), modules=['main'],
+                      oca_dependencies=['dep {0} main'.format(url)])
+        env = Environment(init=False)
+        with mock.patch('candyshop.metrics.get_path_stats',
+                        side_effect=slow_path_stats):
+            env.addbundles([os.path.join(repodir, 'main')])
+        env.destroy()
+        shutil.rmtree(repodir)
+        phases = METRICS.get_stats()['phases']
+        self.assertEqual(phases['clone']['calls'], 1)
+        self.assertGreater(phases['clone']['files'], 0)
+        self.assertLess(phases['clone']['seconds'], 0.5)
+        self.assertNotIn('find_files', phases)
+
+    def test_03_timed(self):
+        @timed('custom')
+        def function(value):
+            return value * 2
+        self.assertEqual(function(2), 4)
+        self.assertEqual(METRICS.get_stats()['phases']['custom']['calls'], 1)
+
+
+def load_tests(loader, tests, pattern):
+    tests.addTests(doctest.DocTestSuite('candyshop.metrics'))
+    return tests
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
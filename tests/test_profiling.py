@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import sys
+import json
+import pstats
+import shutil
+import doctest
+import tempfile
+import unittest
+from unittest import mock
+
+from candyshop import profiling
+from candyshop.environment import Environment
+from candyshop.profiling import (PROFILE_VARIABLE, PROFILER_VARIABLE,
+                                 Profile, is_profiling)
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.testdir = os.path.dirname(os.path.abspath(__file__))
+        self.odoo_beginners_dir = os.path.join(self.testdir, 'examples',
+                                               'odoo-beginners')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def get_functions(self, path):
+        return [name for _, _, name in pstats.Stats(path).stats]
+
+    def check_environment(self):
+        env = Environment(init=False)
+        env.addbundles([self.odoo_beginners_dir], False)
+        notmet = list(env.get_notmet_dependencies())
+        list(env.get_notmet_record_ids())
+        env.destroy()
+        return notmet
+
+    def test_01_context_manager(self):
+        path = os.path.join(self.tmpdir, 'profiles', 'check.prof')
+        with Profile(path) as profile:
+            self.assertTrue(is_profiling())
+            self.check_environment()
+        self.assertFalse(is_profiling())
+        self.assertEqual(profile.path, path)
+        self.assertIn('addbundles', self.get_functions(path))
+
+    def test_02_disabled(self):
+        with mock.patch.dict(os.environ, {PROFILE_VARIABLE: ''}):
+            self.check_environment()
+        self.assertListEqual(os.listdir(self.tmpdir), [])
+
+    def test_03_environment_variable(self):
+        with mock.patch.dict(os.environ, {PROFILE_VARIABLE: self.tmpdir}):
+            notmet = self.check_environment()
+        self.assertEqual(len(notmet), 3)
+        files = sorted(os.listdir(self.tmpdir))
+        self.assertListEqual([name.split('-')[1] for name in files],
+                             ['addbundles', 'get_notmet_dependencies',
+                              'get_notmet_record_ids'])
+        for name in files:
+            self.assertTrue(name.endswith('.prof'))
+        path = os.path.join(self.tmpdir, [name for name in files
+                                          if 'record_ids' in name][0])
+        self.assertIn('extract_records_fromfile', self.get_functions(path))
+
+    def test_04_nested(self):
+        path = os.path.join(self.tmpdir, 'check.prof')
+        with mock.patch.dict(os.environ, {PROFILE_VARIABLE: self.tmpdir}):
+            with Profile(path):
+                self.check_environment()
+        self.assertListEqual(os.listdir(self.tmpdir), ['check.prof'])
+
+    def test_05_invalid_profiler(self):
+        self.assertRaises(AssertionError, Profile, 'file.prof', 'unknown')
+        with mock.patch.dict(os.environ, {PROFILE_VARIABLE: self.tmpdir,
+                                          PROFILER_VARIABLE: 'unknown'}):
+            env = Environment(init=False)
+            self.assertRaises(AssertionError, env.addbundles,
+                              [self.odoo_beginners_dir])
+            env.destroy()
+
+    @unittest.skipIf(profiling.Profiler is None,
+                     'pyinstrument is not installed')
+    def test_06_pyinstrument(self):
+        with mock.patch.dict(os.environ, {PROFILE_VARIABLE: self.tmpdir,
+                                          PROFILER_VARIABLE: 'pyinstrument'}):
+            self.check_environment()
+        for name in os.listdir(self.tmpdir):
+            self.assertTrue(name.endswith('.speedscope.json'))
+            with open(os.path.join(self.tmpdir, name)) as f:
+                self.assertIn('profiles', json.load(f))
+
+
+def load_tests(loader, tests, pattern):
+    tests.addTests(doctest.DocTestSuite('candyshop.profiling'))
+    return tests
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import sys
+import json
+import doctest
+import unittest
+from io import StringIO
+from xml.etree import ElementTree
+
+from candyshop.report import (JSONLinesReport, JSONReport, JUnitReport,
+                              SARIFReport, TextReport, iter_problems)
+
+
+class TestReports(unittest.TestCase):
+
+    def setUp(self):
+        self.dependencies = [
+            {'addons': {'sale': ['account', 'stock']}},
+            {'addons': {'purchase': ['account']}},
+        ]
+        self.records = [{'addons': {'sale/views/sale.xml': ['<mail>']}}]
+
+    def write(self, cls, dependencies=True, records=True, **kwargs):
+        stream = StringIO()
+        checks = []
+        if dependencies is not None:
+            checks.append(('dependencies', iter_problems(
+                'dependencies', self.dependencies if dependencies else [])))
+        if records is not None:
+            checks.append(('records', iter_problems(
+                'records', self.records if records else [])))
+        status = cls(stream, **kwargs).write(checks)
+        return status, stream.getvalue()
+
+    def test_01_problems_are_consumed_lazily(self):
+        written = []
+
+        class Stream(StringIO):
+            def flush(self):
+                written.append(self.getvalue())
+
+        def problems():
+            yield {'check': 'records', 'bundle': 'addons', 'file': 'a.xml',
+                   'missing': ['sale']}
+            self.assertIn('a.xml', written[-1])
+            yield {'check': 'records', 'bundle': 'addons', 'file': 'b.xml',
+                   'missing': ['sale']}
+
+        report = JSONLinesReport(Stream())
+        self.assertEqual(report.write([('records', problems())]), 1)
+        self.assertDictEqual(report.counts, {'records': 2})
+
+    def test_02_text(self):
+        status, output = self.write(TextReport, records=None)
+        self.assertEqual(status, 1)
+        self.assertMultiLineEqual(output, (
+            'The following module dependencies are not found in the'
+            ' environment:\n\n'
+            '    Bundle: addons\n'
+            '    Module: sale\n'
+            '    Missing dependencies:\n'
+            '        - account\n'
+            '        - stock\n\n'
+            '    Bundle: addons\n'
+            '    Module: purchase\n'
+            '    Missing dependencies:\n'
+            '        - account\n\n'
+            'Summary: 2 modules with missing dependencies.\n'))
+        status, output = self.write(TextReport, False, False, summary=False)
+        self.assertEqual(status, 0)
+        self.assertMultiLineEqual(output, (
+            'All dependencies are satisfied in the environment.\n'
+            'All references are present in the environment.\n'))
+
+    def test_03_json(self):
+        status, output = self.write(JSONReport)
+        self.assertListEqual([p['check'] for p in json.loads(output)],
+                             ['dependencies', 'dependencies', 'records'])
+        status, output = self.write(JSONReport, True, False)
+        self.assertEqual(len(json.loads(output)), 2)
+        self.assertEqual(self.write(JSONReport, False, False), (0, '[]\n'))
+
+    def test_04_json_lines(self):
+        status, output = self.write(JSONLinesReport)
+        lines = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual(status, 1)
+        self.assertDictEqual(lines[2], {
+            'check': 'records', 'bundle': 'addons',
+            'file': 'sale/views/sale.xml', 'missing': ['<mail>']})
+        self.assertDictEqual(lines[3], {
+            'summary': {'dependencies': 2, 'records': 1}})
+
+    def test_05_junit(self):
+        status, output = self.write(JUnitReport, records=False)
+        root = ElementTree.fromstring(output)
+        suites = root.findall('testsuite')
+        self.assertEqual(status, 1)
+        self.assertListEqual([s.get('name') for s in suites],
+                             ['dependencies', 'records'])
+        failures = suites[0].findall('testcase/failure')
+        self.assertEqual(failures[0].text, 'account\nstock')
+        self.assertEqual(failures[1].get('type'), 'missing-dependency')
+        self.assertListEqual([c.get('name') for c in suites[1]
+                              if c.tag == 'testcase'], ['records'])
+        self.assertEqual(suites[1].find('system-out').text,
+                         '0 XML files with missing references')
+
+    def test_06_sarif(self):
+        status, output = self.write(SARIFReport)
+        run = json.loads(output)['runs'][0]
+        self.assertEqual(status, 1)
+        self.assertListEqual([r['id'] for r in run['tool']['driver']['rules']],
+                             ['missing-dependency', 'missing-reference'])
+        self.assertListEqual([r['ruleId'] for r in run['results']],
+                             ['missing-dependency'] * 2 +
+                             ['missing-reference'])
+        self.assertDictEqual(
+            run['results'][2]['locations'][0]['physicalLocation'],
+            {'artifactLocation': {'uri': 'sale/views/sale.xml',
+                                  'uriBaseId': 'addons'}})
+        self.assertDictEqual(run['properties'],
+                             {'summary': {'dependencies': 2, 'records': 1}})
+        status, output = self.write(SARIFReport, False, False)
+        self.assertListEqual(json.loads(output)['runs'][0]['results'], [])
+
+
+def load_tests(loader, tests, pattern):
+    tests.addTests(doctest.DocTestSuite('candyshop.report'))
+    return tests
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import sys
+import json
+import socket
+import shutil
+import tempfile
+import unittest
+import threading
+from http.client import HTTPConnection
+
+from candyshop.environment import Environment
+from candyshop.server import EnvironmentServer
+
+from . import make_module
+
+
+class UnixHTTPConnection(HTTPConnection):
+
+    def __init__(self, path):
+        super().__init__('localhost')
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+class TestEnvironmentServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.bundle_dir = os.path.join(self.tmpdir, 'bundle')
+        make_module(self.bundle_dir, 'a')
+        make_module(self.bundle_dir, 'b', depends=['a', 'c'])
+        self.env = Environment(init=False)
+        self.env.addbundles([self.bundle_dir])
+        self.server = EnvironmentServer(self.env, [self.bundle_dir],
+                                        interval=60, verbose=False,
+                                        backend='polling')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.env.destroy()
+        shutil.rmtree(self.tmpdir)
+
+    def start(self, address):
+        address = self.server.bind(address)
+        self.thread = threading.Thread(target=self.server.serve)
+        self.thread.start()
+        return address
+
+    def get(self, connection, url):
+        connection.request('GET', url)
+        response = connection.getresponse()
+        body = response.read().decode('utf-8')
+        connection.close()
+        return response.status, body
+
+    def test_01_tcp(self):
+        host, port = self.start(('127.0.0.1', 0))
+        connection = HTTPConnection(host, port)
+        status, body = self.get(connection, '/check?check=dependencies')
+        self.assertEqual(status, 200)
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertListEqual(lines, [
+            {'check': 'dependencies', 'bundle': 'bundle', 'module': 'b',
+             'missing': ['c']},
+            {'summary': {'dependencies': 1}}])
+        self.assertEqual(self.get(connection, '/impact?module=a'),
+                         (200, json.dumps({'modules': ['a', 'b']})))
+        self.assertEqual(self.get(connection, '/check?format=xml')[0], 400)
+        self.assertEqual(self.get(connection, '/unknown')[0], 404)
+
+    def test_02_unix_socket_and_refresh(self):
+        path = os.path.join(self.tmpdir, 'candyshop.sock')
+        self.start(path)
+        connection = UnixHTTPConnection(path)
+        self.assertEqual(json.loads(self.get(connection, '/status')[1]),
+                         {'bundles': [self.bundle_dir], 'modules': 2})
+        make_module(self.bundle_dir, 'c')
+        status, body = self.get(connection, '/check?format=text&summary=0')
+        self.assertEqual(body, (
+            'All dependencies are satisfied in the environment.\n'
+            'All references are present in the environment.\n'))
+        self.assertEqual(json.loads(self.get(connection, '/status')[1]),
+                         {'bundles': [self.bundle_dir], 'modules': 3})
+
+    def test_03_concurrent_refresh(self):
+        self.start(('127.0.0.1', 0))
+        poll = self.server.watcher.poll
+        polling = threading.Event()
+        resume = threading.Event()
+
+        def slow_poll():
+            changes = poll()
+            polling.set()
+            resume.wait(10)
+            return changes
+
+        make_module(self.bundle_dir, 'c')
+        self.server.watcher.poll = slow_poll
+        refresh = threading.Thread(target=self.server.refresh)
+        refresh.start()
+        polling.wait(10)
+        self.server.watcher.poll = poll
+        threading.Timer(0.2, resume.set).start()
+        self.assertEqual(self.server.get_status()['modules'], 3)
+        refresh.join()
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -16,10 +16,62 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import os
 import sys
+import shutil
 import doctest
+import tempfile
 import unittest
 
+from candyshop.utils import ModuleEntry, scan_modules
+
+
+class TestScanModules(unittest.TestCase):
+
+    def setUp(self):
+        self.testdir = os.path.dirname(os.path.abspath(__file__))
+        self.exampledir = os.path.join(self.testdir, 'examples')
+        self.odoo_beginners_dir = os.path.join(self.exampledir,
+                                               'odoo-beginners')
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def touch(self, *path):
+        path = os.path.join(self.tmpdir, *path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write('{}')
+
+    def test_01_finds_module_roots(self):
+        openacademy_dir = os.path.join(self.odoo_beginners_dir, 'openacademy')
+        entries = list(scan_modules(self.odoo_beginners_dir))
+        self.assertListEqual([os.path.basename(e.path) for e in entries],
+                             ['missing_dependency', 'openacademy',
+                              'references_absent_ids'])
+        self.assertEqual(entries[1], ModuleEntry(
+            openacademy_dir,
+            os.path.join(openacademy_dir, '__manifest__.py'), True))
+
+    def test_02_stops_at_module_roots(self):
+        self.touch('mod_a', '__manifest__.py')
+        self.touch('mod_a', 'nested', '__manifest__.py')
+        self.touch('group', 'mod_b', '__init__.py')
+        self.touch('group', 'mod_b', '__manifest__.py')
+        entries = list(scan_modules(self.tmpdir))
+        self.assertListEqual([(os.path.relpath(e.path, self.tmpdir),
+                               e.is_package) for e in entries],
+                             [(os.path.join('group', 'mod_b'), True),
+                              ('mod_a', False)])
+
+    def test_03_exclude_tests(self):
+        self.touch('mod_a', 'tests', 'mod_c', '__manifest__.py')
+        self.touch('tests', 'mod_d', '__manifest__.py')
+        self.assertEqual(len(list(scan_modules(self.tmpdir))), 2)
+        self.assertListEqual(list(scan_modules(self.tmpdir,
+                                               exclude_tests=True)), [])
+
 
 def load_tests(loader, tests, pattern):
     tests.addTests(doctest.DocTestSuite('candyshop.utils'))
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+#
+# Please refer to AUTHORS.rst for a complete list of Copyright holders.
+# Copyright (C) 2016-2022, Candyshop Developers.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import sys
+import shutil
+import doctest
+import tempfile
+import unittest
+import threading
+
+from candyshop import watch
+from candyshop.environment import Environment
+from candyshop.watch import (EnvironmentWatcher, PollingWatcher,
+                             WatchdogWatcher, get_watcher)
+
+from . import make_module
+
+
+class TestPollingWatcher(unittest.TestCase):
+
+    watcher_class = PollingWatcher
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        make_module(self.tmpdir, 'a')
+        self.watcher = self.watcher_class([self.tmpdir], interval=0.01)
+
+    def tearDown(self):
+        self.watcher.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def wait_poll(self, count):
+        changes = []
+        for _ in range(500):
+            changes.extend(self.watcher.poll())
+            if len(set(changes)) >= count:
+                break
+            threading.Event().wait(0.01)
+        return sorted(set(changes))
+
+    def test_01_poll(self):
+        self.assertListEqual(self.watcher.poll(), [])
+        manifest = os.path.join(self.tmpdir, 'a', '__manifest__.py')
+        with open(manifest, 'a') as f:
+            f.write('\n')
+        with open(os.path.join(self.tmpdir, 'a', 'models.py'), 'w') as f:
+            f.write('\n')
+        module = make_module(self.tmpdir, 'b')
+        self.assertListEqual(self.wait_poll(3), [
+            manifest, os.path.join(module, '__init__.py'),
+            os.path.join(module, '__manifest__.py')])
+        shutil.rmtree(module)
+        self.assertIn(os.path.join(module, '__manifest__.py'),
+                      self.wait_poll(1))
+
+    def test_02_watch(self):
+        changes = []
+
+        def callback(paths):
+            changes.extend(paths)
+            self.watcher.stop()
+
+        thread = threading.Thread(target=self.watcher.watch,
+                                  args=(callback,))
+        thread.start()
+        module = make_module(self.tmpdir, 'b')
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(changes[0].startswith(module))
+
+
+@unittest.skipIf(watch.Observer is None, 'watchdog is not installed')
+class TestWatchdogWatcher(TestPollingWatcher):
+
+    watcher_class = WatchdogWatcher
+
+    def test_03_moved_module(self):
+        module = os.path.join(self.tmpdir, 'c')
+        os.rename(os.path.join(self.tmpdir, 'a'), module)
+        self.assertIn(os.path.join(module, '__manifest__.py'),
+                      self.wait_poll(2))
+
+
+class TestGetWatcher(unittest.TestCase):
+
+    def test_01_backends(self):
+        watcher = get_watcher(['.'], backend='polling')
+        self.assertIsInstance(watcher, PollingWatcher)
+        self.assertRaisesRegex(AssertionError, 'Unknown watcher backend',
+                               get_watcher, ['.'], backend='inotify')
+        watcher = get_watcher(['.'])
+        self.assertIsInstance(watcher, PollingWatcher if watch.Observer is None
+                              else WatchdogWatcher)
+        watcher.stop()
+
+
+class TestEnvironmentWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.bundle_dir = os.path.join(self.tmpdir, 'bundle')
+        make_module(self.bundle_dir, 'a', depends=['b'])
+        make_module(self.bundle_dir, 'c', depends=['a'])
+        self.env = Environment(init=False)
+        self.env.addbundles([self.bundle_dir])
+        self.watcher = EnvironmentWatcher(self.env, [self.bundle_dir],
+                                          ['dependencies'], backend='polling')
+
+    def tearDown(self):
+        self.watcher.stop()
+        self.env.destroy()
+        shutil.rmtree(self.tmpdir)
+
+    def test_01_deltas(self):
+        self.assertSetEqual(self.watcher.state,
+                            {('dependencies', 'bundle', 'a', 'b')})
+        module = make_module(self.bundle_dir, 'b')
+        self.assertListEqual(self.watcher.update(self.watcher.watcher.poll()),
+                             [{'event': 'satisfied', 'check': 'dependencies',
+                               'bundle': 'bundle', 'name': 'a',
+                               'dependency': 'b'}])
+        shutil.rmtree(os.path.join(self.bundle_dir, 'a'))
+        shutil.rmtree(module)
+        self.assertListEqual(
+            [(d['event'], d['name'], d['dependency'])
+             for d in self.watcher.update(self.watcher.watcher.poll())],
+            [('missing', 'c', 'a')])
+        self.assertListEqual(self.watcher.update([]), [])
+
+    def test_02_watch(self):
+        deltas = []
+
+        def callback(delta):
+            deltas.extend(delta)
+            self.watcher.stop()
+
+        self.watcher.watcher.interval = 0.01
+        thread = threading.Thread(target=self.watcher.watch,
+                                  args=(callback,))
+        thread.start()
+        make_module(self.bundle_dir, 'b')
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(deltas[0]['event'], 'satisfied')
+
+
+def load_tests(loader, tests, pattern):
+    tests.addTests(doctest.DocTestSuite('candyshop.watch'))
+    return tests
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())